@@ -0,0 +1,208 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+
+class Rejected(Exception):
+    """A search was turned away; the client may retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class RateLimited(Rejected):
+    pass
+
+
+class Overloaded(Rejected):
+    pass
+
+
+class TokenBucket:
+    """`burst` tokens, refilled at `rate` tokens per second."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self, cost: float = 1.0) -> float:
+        """Seconds until `cost` tokens (at most a full bucket) will be there."""
+        self._refill()
+        return max(0.0, min(cost, self.burst) - self.tokens) / self.rate
+
+    def take(self, cost: float = 1.0) -> float:
+        """Take `cost` tokens and return 0, or return the seconds until they will be there."""
+        self._refill()
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def take_up_to(self, count: int) -> int:
+        """Take one token for each of up to `count` items; returns how many were taken."""
+        self._refill()
+        taken = min(count, int(self.tokens))
+        self.tokens -= taken
+        return taken
+
+
+class RateLimiter:
+    """
+    One token bucket per client (API key or IP): `per_minute` scrapes per
+    minute on average, bursts of up to `burst`. At most `max_clients` buckets
+    are kept; the least recently seen are forgotten (and start full again).
+    """
+
+    def __init__(self, per_minute: float = 30, burst: int = 10, max_clients: int = 10000):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.limited = 0
+
+    def _bucket(self, client: str) -> TokenBucket:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket
+
+    def _limited(self, wait: float) -> RateLimited:
+        self.limited += 1
+        return RateLimited(f"Rate limit of {self.rate * 60:g} searches/minute exceeded", wait)
+
+    def check(self, client: str, cost: float = 1.0):
+        """
+        Charge `client` for `cost` scrapes or raise RateLimited. A cost over
+        the burst can never be paid at once; see check_up_to for those.
+        """
+        wait = self._bucket(client).take(cost)
+        if wait:
+            raise self._limited(wait)
+
+    def check_up_to(self, client: str, count: int) -> int:
+        """
+        Charge `client` for as many of `count` scrapes as it has tokens for
+        and return that number, or raise RateLimited when it has none.
+        """
+        bucket = self._bucket(client)
+        taken = bucket.take_up_to(count)
+        if not taken:
+            raise self._limited(bucket.wait())
+        return taken
+
+    def retry_after(self, client: str, count: int) -> float:
+        """Seconds until `client` could pay for `count` scrapes (at most a full burst)."""
+        return self._bucket(client).wait(count)
+
+    def stats(self) -> Dict:
+        return {"per_minute": self.rate * 60, "burst": self.burst,
+                "clients": len(self._buckets), "limited": self.limited}
+
+
+class ScrapeGate:
+    """
+    Global cap of `max_in_flight` scrapes. Up to `max_waiting` more wait at
+    most `max_wait` seconds for a slot; beyond that slot() raises Overloaded
+    at once, with a Retry-After estimated from recent scrape durations.
+    """
+
+    def __init__(self, max_in_flight: int = 8, max_waiting: int = 16, max_wait: float = 30.0):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.avg_seconds = 10.0
+
+    def retry_after(self) -> float:
+        """Rough time until a slot frees up for a newcomer."""
+        return self.avg_seconds * (self.waiting + 1) / self.max_in_flight
+
+    def check(self):
+        """Raise Overloaded now if a new scrape would find the waiting room full."""
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise Overloaded("Too many searches in progress", self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self, patient: bool = False):
+        """
+        Hold one scrape slot for the block. `patient` callers (background
+        jobs, which have their own bounded queue) wait as long as it takes.
+        """
+        if not patient:
+            self.check()
+
+        if self._semaphore.locked():
+            self.waiting += 1
+            try:
+                if patient:
+                    await self._semaphore.acquire()
+                else:
+                    await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise Overloaded(f"No scrape slot freed up within {self.max_wait:g}s",
+                                 self.retry_after()) from None
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()  # free slot: returns without suspending
+
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * (time.monotonic() - started)
+
+    def stats(self) -> Dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_scrape_seconds": round(self.avg_seconds, 2),
+        }
+
+
+def rate_limiter_from_env() -> Optional[RateLimiter]:
+    """RateLimiter from RATE_LIMIT_PER_MINUTE (0 disables it) and RATE_LIMIT_BURST."""
+    per_minute = float(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+    if per_minute <= 0:
+        return None
+    return RateLimiter(per_minute=per_minute, burst=int(os.getenv("RATE_LIMIT_BURST", "10")))
+
+
+def scrape_gate_from_env() -> ScrapeGate:
+    """ScrapeGate from MAX_INFLIGHT_SCRAPES, MAX_WAITING_SCRAPES and SCRAPE_SLOT_WAIT_SECONDS."""
+    return ScrapeGate(max_in_flight=int(os.getenv("MAX_INFLIGHT_SCRAPES", "8")),
+                      max_waiting=int(os.getenv("MAX_WAITING_SCRAPES", "16")),
+                      max_wait=float(os.getenv("SCRAPE_SLOT_WAIT_SECONDS", "30")))
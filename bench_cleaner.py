@@ -0,0 +1,168 @@
+"""
+Benchmark the HTML cleaner backends of sol3 (html_cleaners) and check that
+they produce identical text.
+
+Each page of the corpus is cleaned by every backend; the report shows the
+median time per page, the peak RSS growth while cleaning it (measured in a
+fresh process per page and backend, so libxml2's allocations count too) and
+whether the output matches the original bs4 cleaner. Exits 1 on any
+difference, except on the pages of known_differences(), which are reported
+to show where the lxml backends still differ.
+
+Usage:
+    python bench_cleaner.py                       # built-in fixture corpus
+    python bench_cleaner.py saved_page.html [more.html ...]
+    python bench_cleaner.py --paragraphs 5000     # size of the largest synthetic article
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+
+from html_cleaners import CLEANERS
+
+
+CHROME = """
+  <header><p>Jump to content</p><nav><ul><li><a href="/">Main page</a></li><li>Contents</li></ul></nav></header>
+  <aside class="sidebar"><p>Donate</p><p>Create account</p></aside>
+"""
+
+
+def sample_article_html(paragraphs: int) -> str:
+    """A Wikipedia-like article: chrome to drop, inline markup, references, entities."""
+    parts = [
+        "<!DOCTYPE html><html lang='en'><head><meta charset='utf-8'><title>Sample article</title>",
+        "<style>p { margin: 0 }</style><script>var config = {'wgTitle': 'Sample'};</script></head><body>",
+        CHROME,
+        "<main><h1>Sample article</h1>",
+        "<table class='infobox'><tr><th>Field</th><td>Computer science</td></tr></table>",
+    ]
+    for i in range(paragraphs):
+        parts.append(
+            f"<p>Paragraph {i} of the <b>article</b> about <a href='/wiki/Topic_{i}'>topic {i}</a>"
+            f"<sup class='reference'><a href='#cite-{i}'>[{i + 1}]</a></sup>, "
+            f"covering history &amp; methods&nbsp;&#8211; with <i>emphasis</i>,"
+            f" a <code>snippet()</code><!-- editor note {i} --> and unicode: café, 東京.\n  "
+            f"Second line\tafter a tab.<script>track({i});</script></p>"
+        )
+        if i % 10 == 9:
+            parts.append(f"<h2>Section {i // 10}</h2><ul><li>List item {i}</li></ul>")
+    parts.append("</main><footer><p>Text is available under a licence.</p></footer></body></html>")
+    return "".join(parts)
+
+
+def fixture_corpus(largest: int) -> List[Tuple[str, str]]:
+    """Named pages covering the cleaner's cases, plus articles of growing size."""
+    fixtures = [
+        ("no <p>, with <body>",
+         "<html><head><title>T</title></head><body><div>Only <b>div</b> text</div>"
+         "<nav>menu</nav><span>and a span</span></body></html>"),
+        ("no <p>, no <body>", "<title>Bare</title><div>Bare div text</div><script>x()</script>"),
+        ("<p> only in chrome", "<body><nav><p>nav text</p></nav><div>body text</div><footer><p>f</p></footer></body>"),
+        ("text after dropped tags", "<body><p>before<script>x()</script>after <style>.a{}</style>end</p></body>"),
+        ("whitespace and entities", "<p>  a&nbsp;&nbsp;b \n\t c &lt;tag&gt; &#169; </p><p></p><p>   </p>"),
+        ("xhtml with xml declaration",
+         "<?xml version='1.0' encoding='utf-8'?><html xmlns='http://www.w3.org/1999/xhtml'><body>"
+         "<p>XHTML paragraph</p></body></html>"),
+        ("empty page", ""),
+        ("paragraphs after </html>", "<html><body><p>a</p></body></html><p>late</p>"),
+    ]
+    sizes = sorted({10, 200, largest})
+    return fixtures + [(f"article ({n} paragraphs)", sample_article_html(n)) for n in sizes]
+
+
+def known_differences() -> List[Tuple[str, str]]:
+    """Valid pages html.parser and libxml2 parse into different trees, so the lxml backends differ."""
+    return [
+        ("<template>", "<body><p>a</p><template><p>t</p></template></body>"),
+        ("<textarea>", "<body><p>a</p><textarea><p>x</p></textarea></body>"),
+        ("CDATA", "<body><p>a<![CDATA[ c ]]>b</p></body>"),
+        ("<div> in an open <p>", "<body><p>a<div>d</div>b</p></body>"),
+        ("unclosed <p>", "<body><p>one<p>two</body>"),
+    ]
+
+
+def _status_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise OSError(f"{field} not in /proc/self/status")
+
+
+def _peak_rss_growth_mb(backend: str, html: str) -> float:
+    """Run in a fresh process: peak RSS growth (MB) while cleaning one page."""
+    try:
+        # Reset the high-water mark (VmHWM) to the current RSS, Linux only
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        before = _status_kb("VmRSS")
+        peak = lambda: _status_kb("VmHWM")
+    except OSError:
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with contextlib.redirect_stdout(io.StringIO()):
+        CLEANERS[backend](html)
+    return (peak() - before) / 1024
+
+
+def time_backend(backend: str, html: str, repeat: int) -> Tuple[str, List[float]]:
+    samples = []
+    text = ""
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            text = CLEANERS[backend](html)
+            samples.append((time.perf_counter() - start) * 1000)
+    return text, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="saved HTML pages to add to the corpus")
+    parser.add_argument("--paragraphs", type=int, default=3000, help="paragraphs in the largest synthetic article")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-memory", action="store_true", help="skip the per-process peak RSS measurement")
+    args = parser.parse_args()
+
+    corpus = [(name, html, False) for name, html in fixture_corpus(args.paragraphs)]
+    corpus += [(path, open(path, encoding="utf-8", errors="replace").read(), False) for path in args.pages]
+    corpus += [(f"{name} (known difference)", html, True) for name, html in known_differences()]
+    backends = list(CLEANERS)
+    if len(backends) < 2:
+        print("Only the bs4 cleaner is available (install lxml to compare)")
+
+    mismatches = 0
+    memory = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                 max_tasks_per_child=1)
+    with memory:
+        for name, html, known in corpus:
+            print(f"\n{name}: {len(html) / 1024:.0f} KB")
+            reference, _ = time_backend("bs4", html, 1)
+            medians = {}
+            for backend in backends:
+                text, samples = time_backend(backend, html, args.repeat)
+                medians[backend] = statistics.median(samples)
+                line = f"  {backend:<5} median {medians[backend]:8.2f} ms"
+                if not args.no_memory:
+                    line += f"   peak RSS +{memory.submit(_peak_rss_growth_mb, backend, html).result():6.1f} MB"
+                identical = text == reference
+                mismatches += not (identical or known)
+                print(f"{line}   identical output: {identical}")
+            if "lxml" in medians:
+                print(f"  speedup: {medians['bs4'] / max(medians['lxml'], 1e-6):.1f}x")
+
+    if mismatches:
+        print(f"\nFAIL: {mismatches} output(s) differ from the bs4 cleaner")
+        sys.exit(1)
+    print("\nOK: all backends produce identical output (apart from the known differences)")
+
+
+if __name__ == "__main__":
+    main()
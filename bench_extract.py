@@ -0,0 +1,62 @@
+"""
+Benchmark the bulk (single page.evaluate) flight extraction against the
+per-locator path.
+
+Usage:
+    python bench_extract.py saved_results.html [more.html ...]
+    python bench_extract.py --cards 60
+
+Saved result pages are loaded with page.set_content; without any, a synthetic
+results page with --cards cards is generated.
+"""
+import argparse
+import statistics
+import time
+
+from playwright.sync_api import sync_playwright
+
+from mock_site import sample_results_html
+from sol2 import extract_flight_data
+
+
+def time_mode(page, mode: str, repeat: int):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = extract_flight_data(page, mode=mode)
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="saved result page HTML files")
+    parser.add_argument("--cards", type=int, default=60, help="cards in the synthetic page")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sources = [(path, open(path, encoding="utf-8").read()) for path in args.pages]
+    if not sources:
+        sources = [(f"synthetic ({args.cards} cards)", sample_results_html(args.cards))]
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+
+        for name, html in sources:
+            page.set_content(html)
+            locator_flights, locator_ms = time_mode(page, "locators", args.repeat)
+            bulk_flights, bulk_ms = time_mode(page, "bulk", args.repeat)
+
+            print(f"\n{name}: {len(bulk_flights)} flight(s)")
+            print(f"  locators: median {statistics.median(locator_ms):8.1f} ms")
+            print(f"  bulk:     median {statistics.median(bulk_ms):8.1f} ms")
+            print(f"  speedup:  {statistics.median(locator_ms) / max(statistics.median(bulk_ms), 1e-6):.1f}x")
+            print(f"  identical output: {bulk_flights == locator_flights}")
+
+        browser.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Offline benchmark for the flight scraper against the local mock site.
+
+Reports p50/p95 latency of select_city, select_date, the results wait and
+extract_flight_data, of whole scrape_flights calls (fresh browser vs pooled),
+and throughput of the async engine at a given concurrency, together with
+Playwright round trips and browser-tree RSS per search.
+
+Usage:
+    python bench_scraper.py --searches 10 --concurrency 4 --cards 60
+    python bench_scraper.py --max-p95-ms 5000     # exit 1 when slower (for CI)
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+from playwright._impl import _connection
+from playwright.sync_api import sync_playwright
+
+import sol2
+from browser_pool import AsyncBrowserPool, BrowserPool
+from mock_site import MockSite
+
+
+class RoundTrips:
+    """Counts messages sent to the Playwright driver while active."""
+
+    def __init__(self):
+        self.count = 0
+        self._original = None
+
+    def __enter__(self):
+        self._original = _connection.Connection._send_message_to_server
+        original = self._original
+        counter = self
+
+        def counting_send(connection, *args, **kwargs):
+            counter.count += 1
+            return original(connection, *args, **kwargs)
+
+        _connection.Connection._send_message_to_server = counting_send
+        return self
+
+    def __exit__(self, *exc):
+        _connection.Connection._send_message_to_server = self._original
+
+
+def tree_rss_mb(root_pid: Optional[int] = None) -> Optional[float]:
+    """RSS of this process and all its descendants (the browsers), Linux only."""
+    root_pid = root_pid or os.getpid()
+    try:
+        children: Dict[int, List[int]] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+
+        total_kb = 0
+        stack = [root_pid]
+        while stack:
+            pid = stack.pop()
+            stack.extend(children.get(pid, []))
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            total_kb += int(line.split()[1])
+            except OSError:
+                continue
+        return total_kb / 1024
+    except OSError:
+        return None
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name: str, samples_ms: List[float], round_trips: Optional[float] = None):
+    line = (f"  {name:<28} p50 {percentile(samples_ms, 0.5):8.1f} ms   "
+            f"p95 {percentile(samples_ms, 0.95):8.1f} ms")
+    if round_trips is not None:
+        line += f"   {round_trips:7.1f} round trips"
+    print(line)
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool):
+    """Silence the scraper's progress prints unless --verbose."""
+    if enabled:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    else:
+        yield
+
+
+def bench_stages(repeat: int, quiet_output: bool):
+    """Time each stage of the search flow on one long-lived browser."""
+    stages = ["select_city (origin)", "select_city (destination)", "select_date",
+              "wait_for_results", "extract (bulk)", "extract (locators)"]
+    timings = {stage: [] for stage in stages}
+    trips = {stage: [] for stage in stages}
+    journey_date = time.strftime("%Y-%m-%d")
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        for _ in range(repeat):
+            page = browser.new_page()
+            page.goto(sol2.SEARCH_URL, wait_until="domcontentloaded")
+            steps = [
+                lambda: sol2.select_city(page, sol2.ORIGIN_SELECTOR, "Bangalore", "Origin"),
+                lambda: sol2.select_city(page, sol2.DESTINATION_SELECTOR, "Delhi", "Destination"),
+                lambda: sol2.select_date(page, journey_date),
+                lambda: (page.locator(sol2.SEARCH_BUTTON_SELECTOR).click(), sol2.wait_for_results(page)),
+                lambda: sol2.extract_flight_data(page, mode="bulk"),
+                lambda: sol2.extract_flight_data(page, mode="locators"),
+            ]
+            for stage, step in zip(stages, steps):
+                with quiet(quiet_output), RoundTrips() as counter:
+                    start = time.perf_counter()
+                    step()
+                    timings[stage].append((time.perf_counter() - start) * 1000)
+                trips[stage].append(counter.count)
+            page.close()
+        browser.close()
+
+    print("\nStages (one warm browser):")
+    for stage in stages:
+        report(stage, timings[stage], statistics.mean(trips[stage]))
+
+
+def bench_scrape_flights(repeat: int, quiet_output: bool) -> List[float]:
+    """Whole sync searches, launching a browser per call vs on a BrowserPool."""
+    journey_date = time.strftime("%Y-%m-%d")
+    cold, pooled = [], []
+
+    for _ in range(repeat):
+        with quiet(quiet_output):
+            start = time.perf_counter()
+            sol2.scrape_flights("Bangalore", "Delhi", journey_date)
+            cold.append((time.perf_counter() - start) * 1000)
+
+    pool = BrowserPool(size=1)
+    pool.start()
+    try:
+        for _ in range(repeat):
+            with quiet(quiet_output):
+                start = time.perf_counter()
+                sol2.scrape_flights("Bangalore", "Delhi", journey_date, pool=pool)
+                pooled.append((time.perf_counter() - start) * 1000)
+    finally:
+        pool.close()
+
+    print("\nscrape_flights (sync):")
+    report("fresh browser per call", cold)
+    report("BrowserPool", pooled)
+    return pooled
+
+
+async def bench_throughput(searches: int, concurrency: int, quiet_output: bool) -> List[float]:
+    """Async engine on an AsyncBrowserPool with `concurrency` searches in flight."""
+    journey_date = time.strftime("%Y-%m-%d")
+    pool = AsyncBrowserPool(size=max(1, concurrency // 4), contexts_per_browser=min(concurrency, 4))
+    await pool.start()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    rss_peak = 0.0
+
+    async def one():
+        nonlocal rss_peak
+        async with semaphore:
+            start = time.perf_counter()
+            await sol2.scrape_flights_async("Bangalore", "Delhi", journey_date, pool=pool)
+            latencies.append((time.perf_counter() - start) * 1000)
+            rss_peak = max(rss_peak, tree_rss_mb() or 0.0)
+
+    try:
+        with quiet(quiet_output), RoundTrips() as counter:
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(searches)))
+            elapsed = time.perf_counter() - start
+    finally:
+        await pool.close()
+
+    print(f"\nAsync engine, {searches} searches at concurrency {concurrency}:")
+    report("search latency", latencies, counter.count / searches)
+    print(f"  throughput                   {searches / elapsed:8.2f} searches/s")
+    if rss_peak:
+        print(f"  peak RSS (with browsers)     {rss_peak:8.1f} MB "
+              f"({rss_peak / min(concurrency, searches):.1f} MB per concurrent search)")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the flight scraper against the mock site")
+    parser.add_argument("--searches", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--cards", type=int, default=60)
+    parser.add_argument("--autocomplete-ms", type=int, default=150)
+    parser.add_argument("--results-ms", type=int, default=800)
+    parser.add_argument("--max-p95-ms", type=float, help="fail if async search p95 exceeds this")
+    parser.add_argument("--verbose", action="store_true", help="show the scraper's own output")
+    args = parser.parse_args()
+
+    site = MockSite(cards=args.cards, autocomplete_ms=args.autocomplete_ms, results_ms=args.results_ms)
+    with site:
+        sol2.SEARCH_URL = site.url
+        print(f"Mock site at {site.url}: {args.cards} cards, "
+              f"{args.autocomplete_ms} ms autocomplete, {args.results_ms} ms results")
+
+        quiet_output = not args.verbose
+        bench_stages(max(1, args.searches // 2), quiet_output)
+        bench_scrape_flights(max(1, args.searches // 2), quiet_output)
+        latencies = asyncio.run(bench_throughput(args.searches, args.concurrency, quiet_output))
+
+    if args.max_p95_ms is not None:
+        p95 = percentile(latencies, 0.95)
+        if p95 > args.max_p95_ms:
+            print(f"\nFAIL: search p95 {p95:.1f} ms exceeds {args.max_p95_ms:.1f} ms")
+            sys.exit(1)
+        print(f"\nOK: search p95 {p95:.1f} ms within {args.max_p95_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
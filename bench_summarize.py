@@ -0,0 +1,67 @@
+"""
+Offline latency check of sol3's summarization on a long page, using the
+fake model client: one call with the whole page vs chunked map-reduce.
+
+The fake model's latency grows with prompt size, so a single call on a long
+page is slow; map-reduce runs the chunk calls in parallel and ends with one
+short reduce call.
+
+Usage:
+    python bench_summarize.py --paragraphs 3000 --latency 0.5 --per-1k-tokens 0.05
+    python bench_summarize.py --chunk-tokens 4000 --concurrency 8
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+import sol3
+from bench_cleaner import sample_article_html
+from fake_model import FakeModelClient
+from text_chunks import chunk_text, estimate_tokens
+
+
+async def timed(label: str, client: FakeModelClient, call):
+    start = time.perf_counter()
+    try:
+        summary = await call
+        outcome = f"{len(summary.splitlines())} line(s)"
+    except Exception as e:
+        outcome = f"failed: {e}"
+    elapsed = time.perf_counter() - start
+    stats = client.stats()
+    print(f"  {label:<12} {elapsed:7.2f} s   {stats['calls']:4d} call(s)   "
+          f"{stats['input_tokens']:8d} input tokens   peak {stats['peak_in_flight']} in flight   {outcome}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paragraphs", type=int, default=3000, help="paragraphs in the synthetic article")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake model seconds per call")
+    parser.add_argument("--per-1k-tokens", type=float, default=0.05, help="fake model seconds per 1k prompt tokens")
+    parser.add_argument("--max-input-tokens", type=int, default=1_000_000)
+    parser.add_argument("--chunk-tokens", type=int, default=sol3.CHUNK_TOKENS)
+    parser.add_argument("--concurrency", type=int, default=sol3.MAP_CONCURRENCY)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        content = sol3.clean_html(sample_article_html(args.paragraphs))
+    sol3.CHUNK_TOKENS = args.chunk_tokens
+    sol3.SINGLE_CALL_TOKENS = min(sol3.SINGLE_CALL_TOKENS, estimate_tokens(content) - 1)
+    chunks = chunk_text(content, args.chunk_tokens)
+    print(f"Page: {len(content)} characters, ~{estimate_tokens(content)} tokens, "
+          f"{len(chunks)} chunk(s) of <= {args.chunk_tokens} tokens")
+
+    def client():
+        return FakeModelClient(args.latency, args.per_1k_tokens, args.max_input_tokens)
+
+    single, chunked = client(), client()
+    asyncio.run(timed("single call", single,
+                      sol3._generate_async(single, sol3.PROMPT_TEMPLATE, content, None)))
+    asyncio.run(timed("map-reduce", chunked,
+                      sol3.summarize_async(chunked, content, concurrency=args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+import asyncio
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from playwright.async_api import async_playwright
+from playwright.sync_api import sync_playwright, Error as PlaywrightError
+
+
+class BrowserPool:
+    """
+    A bounded pool of long-lived headless Chromium browsers.
+
+    Sync Playwright objects can only be used from the thread that created them,
+    so every browser is owned by its own worker thread. Jobs are callables that
+    receive a fresh, isolated BrowserContext; the context is closed after the
+    job, and the browser is relaunched after `max_uses` jobs or when it crashes.
+    """
+
+    def __init__(self, size: int = 2, max_uses: int = 50, headless: bool = True,
+                 context_options: Optional[Dict] = None):
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.context_options = context_options or {}
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._launches = 0
+        self._recycles = 0
+        self._crashes = 0
+        self._completed = 0
+        self._started = False
+
+    def start(self):
+        """Start the worker threads. Browsers are launched lazily by each worker."""
+        if self._started:
+            return
+        self._started = True
+        for index in range(self.size):
+            worker = threading.Thread(
+                target=self._worker_loop, name=f"browser-pool-{index}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        print(f"Browser pool started with {self.size} browser(s)")
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Queue `fn(context, *args, **kwargs)` to run on a pooled browser.
+        Returns a concurrent.futures.Future with the job's result.
+        """
+        if not self._started:
+            raise RuntimeError("Browser pool is not running")
+        future: Future = Future()
+        self._jobs.put((future, fn, args, kwargs))
+        return future
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Blocking helper around submit()."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "busy": self._busy,
+                "queued": self._jobs.qsize(),
+                "launches": self._launches,
+                "recycles": self._recycles,
+                "crashes": self._crashes,
+                "completed": self._completed,
+            }
+
+    def close(self):
+        """Stop all workers and close their browsers."""
+        if not self._started:
+            return
+        for _ in self._workers:
+            self._jobs.put(None)
+        for worker in self._workers:
+            worker.join(timeout=30)
+        self._workers = []
+        self._started = False
+        print("Browser pool closed")
+
+    def _launch(self, p):
+        browser = p.chromium.launch(headless=self.headless)
+        with self._lock:
+            self._launches += 1
+        return browser
+
+    def _worker_loop(self):
+        with sync_playwright() as p:
+            browser = None
+            uses = 0
+
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    break
+                future, fn, args, kwargs = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                # Health check: relaunch if the browser died or is worn out
+                if browser is not None and (not browser.is_connected() or uses >= self.max_uses):
+                    self._close_browser(browser)
+                    browser = None
+                    with self._lock:
+                        self._recycles += 1
+                if browser is None:
+                    try:
+                        browser = self._launch(p)
+                        uses = 0
+                    except Exception as e:
+                        future.set_exception(e)
+                        continue
+
+                with self._lock:
+                    self._busy += 1
+                context = None
+                try:
+                    context = browser.new_context(**self.context_options)
+                    future.set_result(fn(context, *args, **kwargs))
+                except Exception as e:
+                    future.set_exception(e)
+                    if isinstance(e, PlaywrightError) and not browser.is_connected():
+                        print(f"Browser crashed, relaunching: {e}")
+                        with self._lock:
+                            self._crashes += 1
+                finally:
+                    if context is not None:
+                        try:
+                            context.close()
+                        except Exception:
+                            pass
+                    uses += 1
+                    with self._lock:
+                        self._busy -= 1
+                        self._completed += 1
+
+            if browser is not None:
+                self._close_browser(browser)
+
+    @staticmethod
+    def _close_browser(browser):
+        try:
+            browser.close()
+        except Exception:
+            pass
+
+
+def pool_from_env() -> BrowserPool:
+    """Build a BrowserPool configured from BROWSER_POOL_SIZE / BROWSER_MAX_USES."""
+    return BrowserPool(
+        size=int(os.getenv("BROWSER_POOL_SIZE", "2")),
+        max_uses=int(os.getenv("BROWSER_MAX_USES", "50")),
+    )
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.uses = 0
+        self.active = 0
+        self.retired = False
+
+
+class BrowserLease:
+    """A context borrowed from an AsyncBrowserPool, and the browser it lives in."""
+
+    def __init__(self, pooled: _PooledBrowser, context):
+        self.pooled = pooled
+        self.context = context
+
+
+class AsyncBrowserPool:
+    """
+    asyncio counterpart of BrowserPool for use inside the FastAPI event loop.
+
+    Async Playwright objects can be shared by any coroutine on the loop, so each
+    browser serves up to `contexts_per_browser` isolated contexts at once and the
+    pool bounds total parallelism at size * contexts_per_browser. Worn-out or
+    crashed browsers are retired and replaced; a retired browser is closed once
+    its last context is released.
+    """
+
+    def __init__(self, size: int = 2, contexts_per_browser: int = 4, max_uses: int = 50,
+                 headless: bool = True, context_options: Optional[Dict] = None):
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.max_uses = max_uses
+        self.headless = headless
+        self.context_options = context_options or {}
+        self._playwright = None
+        self._slots: List[Optional[_PooledBrowser]] = [None] * size
+        self._slot_locks: List[asyncio.Lock] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._busy = 0
+        self._waiting = 0
+        self._launches = 0
+        self._recycles = 0
+        self._crashes = 0
+        self._completed = 0
+
+    async def start(self):
+        """Start Playwright. Browsers are launched lazily on first use."""
+        if self._playwright is not None:
+            return
+        self._playwright = await async_playwright().start()
+        self._semaphore = asyncio.Semaphore(self.size * self.contexts_per_browser)
+        self._slot_locks = [asyncio.Lock() for _ in range(self.size)]
+        print(f"Async browser pool started with {self.size} browser(s) x "
+              f"{self.contexts_per_browser} context(s)")
+
+    async def acquire(self) -> "BrowserLease":
+        """
+        Borrow a fresh BrowserContext until release(). Prefer context() unless
+        the context has to outlive a single block (e.g. a parked warm page).
+        """
+        if self._playwright is None:
+            raise RuntimeError("Browser pool is not running")
+
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        pooled = None
+        try:
+            pooled = await self._checkout()
+            context = await pooled.browser.new_context(**self.context_options)
+        except BaseException:
+            if pooled is not None:
+                await self._checkin(pooled)
+            self._semaphore.release()
+            raise
+        self._busy += 1
+        return BrowserLease(pooled, context)
+
+    async def release(self, lease: "BrowserLease", error: Optional[BaseException] = None):
+        """Close a borrowed context. Pass the error that ended its use, if any."""
+        self._busy -= 1
+        self._completed += 1
+        if isinstance(error, PlaywrightError) and not lease.pooled.browser.is_connected():
+            print("Browser crashed, it will be relaunched")
+            self._crashes += 1
+        try:
+            await lease.context.close()
+        except Exception:
+            pass
+        await self._checkin(lease.pooled)
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def context(self):
+        """Borrow a fresh BrowserContext; it is closed when the block exits."""
+        lease = await self.acquire()
+        error = None
+        try:
+            yield lease.context
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            await self.release(lease, error)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Await `fn(context, *args, **kwargs)` on a pooled browser context."""
+        async with self.context() as context:
+            return await fn(context, *args, **kwargs)
+
+    def stats(self) -> Dict:
+        return {
+            "size": self.size,
+            "capacity": self.size * self.contexts_per_browser,
+            "busy": self._busy,
+            "queued": self._waiting,
+            "launches": self._launches,
+            "recycles": self._recycles,
+            "crashes": self._crashes,
+            "completed": self._completed,
+        }
+
+    async def close(self):
+        """Close all browsers and stop Playwright."""
+        if self._playwright is None:
+            return
+        for index, pooled in enumerate(self._slots):
+            if pooled is not None:
+                await self._close_browser(pooled)
+                self._slots[index] = None
+        await self._playwright.stop()
+        self._playwright = None
+        print("Async browser pool closed")
+
+    async def _checkout(self) -> _PooledBrowser:
+        # Least-loaded slot first
+        index = min(range(self.size),
+                    key=lambda i: self._slots[i].active if self._slots[i] else 0)
+        async with self._slot_locks[index]:
+            pooled = self._slots[index]
+            if pooled is not None and (not pooled.browser.is_connected()
+                                       or pooled.uses >= self.max_uses):
+                pooled.retired = True
+                self._recycles += 1
+                if pooled.active == 0:
+                    await self._close_browser(pooled)
+                pooled = None
+            if pooled is None:
+                browser = await self._playwright.chromium.launch(headless=self.headless)
+                self._launches += 1
+                pooled = _PooledBrowser(browser)
+                self._slots[index] = pooled
+            pooled.uses += 1
+            pooled.active += 1
+            return pooled
+
+    async def _checkin(self, pooled: _PooledBrowser):
+        pooled.active -= 1
+        if pooled.retired and pooled.active == 0:
+            await self._close_browser(pooled)
+
+    @staticmethod
+    async def _close_browser(pooled: _PooledBrowser):
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+
+
+def async_pool_from_env() -> AsyncBrowserPool:
+    """Build an AsyncBrowserPool configured from the BROWSER_* environment variables."""
+    return AsyncBrowserPool(
+        size=int(os.getenv("BROWSER_POOL_SIZE", "2")),
+        contexts_per_browser=int(os.getenv("BROWSER_CONTEXTS_PER_BROWSER", "4")),
+        max_uses=int(os.getenv("BROWSER_MAX_USES", "50")),
+    )
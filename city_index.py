@@ -0,0 +1,178 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # POSIX only; elsewhere saves are only serialized within a process
+    fcntl = None
+
+
+_CODE_IN_PARENS = re.compile(r"\(([A-Z]{3})\)")
+_CODE = re.compile(r"\b([A-Z]{3})\b")
+
+
+def parse_suggestion(text: str) -> Dict[str, str]:
+    """
+    "Bangalore (BLR)" -> {"label": "Bangalore (BLR)", "city": "Bangalore",
+    "code": "BLR"}. Missing parts are empty strings.
+    """
+    label = " ".join((text or "").split())
+    match = _CODE_IN_PARENS.search(label) or _CODE.search(label)
+    code = match.group(1) if match else ""
+    city = re.split(r"[(,\-]", label, maxsplit=1)[0].strip()
+    return {"label": label, "city": city, "code": code}
+
+
+def _normalize(name: str) -> str:
+    return " ".join((name or "").lower().split())
+
+
+def _read_entries(path: str) -> Dict[str, Dict[str, str]]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable city index {path}: {e}")
+        return {}
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock on `path` across processes (where flock exists)."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class CityIndex:
+    """
+    City name / airport code -> autocomplete suggestion, learned from the
+    suggestions the site shows and persisted as JSON at `path` (None keeps it
+    in memory only).
+
+    `choose` picks the suggestion that actually matches what was asked for
+    (known label, exact code, exact city, then prefix) instead of always the
+    first row, and `lookup` tells the scraper which row to wait for.
+
+    Several processes (e.g. fleet workers) may share `path`: a save locks
+    the file, merges in what the others saved and replaces it atomically.
+    Async callers pass save=False and run save() in a thread when `unsaved`.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, str]] = _read_entries(path) if path else {}
+        self.unsaved = False
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, name: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            entry = self._entries.get(_normalize(name))
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def choose(self, name: str, suggestions: List[str], save: bool = True) -> int:
+        """
+        Index of the suggestion to select for `name` (0 when nothing matches
+        better), remembering what was learned from the suggestions (and
+        saving it, if `save`).
+        """
+        if not suggestions:
+            return 0
+        parsed = [parse_suggestion(text) for text in suggestions]
+        wanted = _normalize(name)
+        with self._lock:
+            known = self._entries.get(wanted)
+
+        def first(predicate) -> Optional[int]:
+            return next((i for i, s in enumerate(parsed) if predicate(s)), None)
+
+        index = None
+        if known:
+            index = first(lambda s: s["label"] == known["label"])
+        if index is None:
+            index = first(lambda s: s["code"] and s["code"].lower() == wanted)
+        if index is None:
+            index = first(lambda s: _normalize(s["city"]) == wanted)
+        if index is None:
+            index = first(lambda s: _normalize(s["city"]).startswith(wanted))
+
+        self.learn(name, parsed[index] if index is not None else None, parsed, save=save)
+        return index or 0
+
+    def learn(self, name: str, chosen: Optional[Dict[str, str]], seen: List[Dict[str, str]] = (),
+              save: bool = True):
+        """
+        Remember `chosen` for `name` (unless None, i.e. nothing matched), and
+        every seen suggestion under its own city and code; saved right away
+        if `save`, else left `unsaved`.
+        """
+        with self._lock:
+            before = dict(self._entries)
+            for suggestion in seen:
+                for key in (suggestion["city"], suggestion["code"]):
+                    if key:
+                        self._entries.setdefault(_normalize(key), suggestion)
+            if chosen is not None:
+                self._entries[_normalize(name)] = chosen
+            changed = self._entries != before
+            self.unsaved = self.unsaved or changed
+        if changed and save:
+            self.save()
+
+    def save(self):
+        """Write the index to `path`, keeping entries other processes saved there meanwhile."""
+        if not self.path:
+            return
+        tmp_path = None
+        try:
+            with self._save_lock, _file_lock(f"{self.path}.lock"):
+                saved = _read_entries(self.path)
+                with self._lock:
+                    for key, entry in saved.items():
+                        self._entries.setdefault(key, entry)
+                    data = json.dumps(self._entries, ensure_ascii=False, indent=1, sort_keys=True)
+                    self.unsaved = False
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                                prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(data)
+                os.replace(tmp_path, self.path)
+                tmp_path = None
+        except OSError as e:
+            self.unsaved = True
+            print(f"Could not save city index {self.path}: {e}")
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def city_index_from_env() -> CityIndex:
+    """CityIndex persisted at CITY_INDEX_PATH (default city_index.json; empty to keep it in memory)."""
+    return CityIndex(os.getenv("CITY_INDEX_PATH", "city_index.json") or None)
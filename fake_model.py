@@ -0,0 +1,96 @@
+"""
+Offline stand-in for genai.Client, for testing and timing sol3's
+summarization pipeline without an API key or network.
+
+It answers client.models.generate_content and client.aio.models.generate_content
+with a deterministic reply in the format the prompt asks for, after a
+latency of `base_latency` plus `per_1k_tokens` per thousand prompt tokens,
+and rejects prompts over `max_input_tokens` the way a real model would.
+
+Usage:
+    FAKE_MODEL=1 python sol3.py
+    FAKE_MODEL=1 FAKE_MODEL_LATENCY=0.8 python summary_batch.py --urls-file urls.txt
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, List
+
+from text_chunks import estimate_tokens
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Models:
+    def __init__(self, client: "FakeModelClient"):
+        self._client = client
+
+    def generate_content(self, model: str, contents: str) -> FakeResponse:
+        time.sleep(self._client.admit(contents))
+        return FakeResponse(self._client.reply(contents))
+
+
+class _AsyncModels:
+    def __init__(self, client: "FakeModelClient"):
+        self._client = client
+
+    async def generate_content(self, model: str, contents: str) -> FakeResponse:
+        self._client.in_flight += 1
+        self._client.peak_in_flight = max(self._client.peak_in_flight, self._client.in_flight)
+        try:
+            await asyncio.sleep(self._client.admit(contents))
+            return FakeResponse(self._client.reply(contents))
+        finally:
+            self._client.in_flight -= 1
+
+
+class _Aio:
+    def __init__(self, client: "FakeModelClient"):
+        self.models = _AsyncModels(client)
+
+
+class FakeModelClient:
+    def __init__(self, base_latency: float = 0.5, per_1k_tokens: float = 0.05,
+                 max_input_tokens: int = 1_000_000):
+        self.base_latency = base_latency
+        self.per_1k_tokens = per_1k_tokens
+        self.max_input_tokens = max_input_tokens
+        self.models = _Models(self)
+        self.aio = _Aio(self)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def admit(self, contents: str) -> float:
+        """Count a call and return its simulated latency; raise if the prompt is too long."""
+        tokens = estimate_tokens(contents)
+        if tokens > self.max_input_tokens:
+            raise ValueError(f"Input of {tokens} tokens exceeds the limit of {self.max_input_tokens}")
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += tokens
+        return self.base_latency + self.per_1k_tokens * tokens / 1000
+
+    def reply(self, contents: str) -> str:
+        body = contents.split("CONTENT:", 1)[-1].rsplit("---", 1)[0]
+        lines = [line.strip(" •-\t") for line in body.splitlines() if line.strip(" •-\t")]
+        if "Insight:" not in contents:  # a chunk prompt: bullet points only
+            return "\n".join(f"• {line[:80]}" for line in lines[:4])
+        points: List[str] = [f"• {line[:80]}" for line in lines[:5]] or ["• (empty page)"]
+        return "Summary:\n" + "\n".join(points) + f"\nInsight:\nFake summary of {len(lines)} line(s)."
+
+    def stats(self) -> Dict:
+        return {"calls": self.calls, "input_tokens": self.input_tokens, "peak_in_flight": self.peak_in_flight}
+
+
+def fake_client_from_env() -> FakeModelClient:
+    """FakeModelClient from FAKE_MODEL_LATENCY, FAKE_MODEL_SECONDS_PER_1K_TOKENS and FAKE_MODEL_MAX_TOKENS."""
+    return FakeModelClient(base_latency=float(os.getenv("FAKE_MODEL_LATENCY", "0.5")),
+                           per_1k_tokens=float(os.getenv("FAKE_MODEL_SECONDS_PER_1K_TOKENS", "0.05")),
+                           max_input_tokens=int(os.getenv("FAKE_MODEL_MAX_TOKENS", "1000000")))
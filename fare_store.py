@@ -0,0 +1,170 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from flight_record import FlightRecord
+
+
+def _route(origin: str, destination: str) -> Tuple[str, str]:
+    # Same normalization as FlightCache.make_key, so warmed entries line up
+    return origin.strip().lower(), destination.strip().lower()
+
+
+class FareStore:
+    """
+    Append-only SQLite history of scrape results: one `scrapes` row per
+    search and one `fares` row per flight, indexed by route and journey date,
+    airline, and scrape time. Whole records are kept as JSON too, so recent
+    scrapes can be loaded back into the result cache.
+    """
+
+    def __init__(self, path: str = "fare_history.sqlite3"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS scrapes (
+                id INTEGER PRIMARY KEY,
+                origin TEXT NOT NULL, destination TEXT NOT NULL, journey_date TEXT NOT NULL,
+                scraped_at REAL NOT NULL, flight_count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fares (
+                scrape_id INTEGER NOT NULL REFERENCES scrapes(id),
+                origin TEXT NOT NULL, destination TEXT NOT NULL, journey_date TEXT NOT NULL,
+                scraped_at REAL NOT NULL,
+                airline TEXT, flight_number TEXT, departure TEXT, arrival TEXT,
+                duration_minutes INTEGER, stops INTEGER, price INTEGER, available_seats INTEGER,
+                record TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS scrapes_route_date ON scrapes (origin, destination, journey_date, scraped_at);
+            CREATE INDEX IF NOT EXISTS scrapes_time ON scrapes (scraped_at);
+            CREATE INDEX IF NOT EXISTS fares_scrape ON fares (scrape_id);
+            CREATE INDEX IF NOT EXISTS fares_route_date ON fares (origin, destination, journey_date, scraped_at);
+            CREATE INDEX IF NOT EXISTS fares_airline ON fares (airline, scraped_at);
+        """)
+
+    def record(self, origin: str, destination: str, journey_date: str, flights: List[FlightRecord],
+               scraped_at: Optional[float] = None) -> int:
+        """Append one scrape's flights; returns its id."""
+        origin, destination = _route(origin, destination)
+        scraped_at = scraped_at or time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                scrape_id = self._conn.execute(
+                    "INSERT INTO scrapes (origin, destination, journey_date, scraped_at, flight_count)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (origin, destination, journey_date, scraped_at, len(flights)),
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO fares (scrape_id, origin, destination, journey_date, scraped_at, airline,"
+                    " flight_number, departure, arrival, duration_minutes, stops, price, available_seats, record)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(scrape_id, origin, destination, journey_date, scraped_at, f.airline, f.flight_number,
+                      f.departure, f.arrival, f.duration_minutes, f.stops, f.price, f.available_seats,
+                      json.dumps(f.to_dict())) for f in flights],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return scrape_id
+
+    def price_history(self, origin: str, destination: str, journey_date: Optional[str] = None,
+                      airline: Optional[str] = None, flight_number: Optional[str] = None,
+                      since: Optional[float] = None, limit: int = 500) -> List[Dict]:
+        """
+        Per scrape (oldest first): lowest, highest and average price and the
+        number of flights, optionally narrowed to one journey date, airline
+        (case-insensitive) or flight number.
+        """
+        origin, destination = _route(origin, destination)
+        where = ["origin = ?", "destination = ?", "price IS NOT NULL"]
+        params: List[Any] = [origin, destination]
+        for column, value in (("journey_date", journey_date), ("flight_number", flight_number)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if airline:
+            where.append("airline = ? COLLATE NOCASE")
+            params.append(airline)
+        if since is not None:
+            where.append("scraped_at >= ?")
+            params.append(since)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM ("
+                " SELECT scrape_id, journey_date, scraped_at, MIN(price) AS min_price, MAX(price) AS max_price,"
+                " CAST(ROUND(AVG(price)) AS INTEGER) AS avg_price, COUNT(*) AS flights"
+                f" FROM fares WHERE {' AND '.join(where)}"
+                " GROUP BY scrape_id ORDER BY scraped_at DESC LIMIT ?"
+                ") ORDER BY scraped_at",
+                (*params, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def cheapest_by_day(self, origin: str, destination: str, date_from: str, date_to: str,
+                        airline: Optional[str] = None, scope: str = "latest") -> List[Dict]:
+        """
+        The cheapest flight per journey date in [date_from, date_to]: from the
+        latest scrape of each date (scope="latest") or from every scrape ever
+        recorded for it (scope="all", i.e. the historical low).
+        """
+        origin, destination = _route(origin, destination)
+        airline_filter = "AND airline = ? COLLATE NOCASE" if airline else ""
+        airline_params = [airline] if airline else []
+        if scope == "latest":
+            scrapes = ("scrape_id IN (SELECT MAX(id) FROM scrapes WHERE origin = ? AND destination = ?"
+                       " AND journey_date BETWEEN ? AND ? GROUP BY journey_date)")
+        else:
+            scrapes = "origin = ? AND destination = ? AND journey_date BETWEEN ? AND ?"
+        with self._lock:
+            # SQLite fills the bare columns from the row holding MIN(price)
+            rows = self._conn.execute(
+                "SELECT journey_date, MIN(price) AS price, airline, flight_number, departure, arrival,"
+                " stops, scraped_at FROM fares"
+                f" WHERE {scrapes} AND price IS NOT NULL {airline_filter}"
+                " GROUP BY journey_date ORDER BY journey_date",
+                (origin, destination, date_from, date_to, *airline_params),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def recent_scrapes(self, max_age: float) -> List[Tuple[str, str, str, List[FlightRecord], float]]:
+        """
+        (origin, destination, journey_date, flights, scraped_at) of the latest
+        scrape of each search made within the last `max_age` seconds.
+        """
+        with self._lock:
+            scrapes = self._conn.execute(
+                "SELECT MAX(id) AS id, origin, destination, journey_date, MAX(scraped_at) AS scraped_at"
+                " FROM scrapes WHERE scraped_at >= ? GROUP BY origin, destination, journey_date",
+                (time.time() - max_age,),
+            ).fetchall()
+            results = []
+            for scrape in scrapes:
+                records = self._conn.execute(
+                    "SELECT record FROM fares WHERE scrape_id = ? ORDER BY rowid", (scrape["id"],)
+                ).fetchall()
+                results.append((scrape["origin"], scrape["destination"], scrape["journey_date"],
+                                [FlightRecord.from_dict(json.loads(row[0])) for row in records], scrape["scraped_at"]))
+        return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            scrapes = self._conn.execute("SELECT COUNT(*) FROM scrapes").fetchone()[0]
+            fares = self._conn.execute("SELECT COUNT(*) FROM fares").fetchone()[0]
+        return {"path": self.path, "scrapes": scrapes, "fares": fares,
+                "size_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+
+def fare_store_from_env() -> Optional[FareStore]:
+    """FareStore at FARE_STORE_PATH, or None (no history kept) when it is unset."""
+    path = os.getenv("FARE_STORE_PATH")
+    if not path:
+        return None
+    return FareStore(path)
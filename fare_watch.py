@@ -0,0 +1,375 @@
+import asyncio
+import http.client
+import ipaddress
+import os
+import random
+import socket
+import ssl
+import time
+import uuid
+from collections import deque
+from datetime import date
+from typing import Any, Awaitable, Callable, Collection, Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from flight_record import FlightRecord
+
+
+class WatchLimit(Exception):
+    """Raised by WatchManager.add when no more watches can be registered."""
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """Connects to `address` rather than resolving `host` again; the Host header stays `host`."""
+
+    def __init__(self, host: str, address: str, **kwargs):
+        super().__init__(host, **kwargs)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+
+class _PinnedHTTPSConnection(_PinnedHTTPConnection):
+    """_PinnedHTTPConnection over TLS, verifying the certificate (and SNI) for `host`."""
+
+    default_port = http.client.HTTPS_PORT
+
+    def __init__(self, host: str, address: str, **kwargs):
+        super().__init__(host, address, **kwargs)
+        self.context = ssl.create_default_context()
+
+    def connect(self):
+        super().connect()
+        self.sock = self.context.wrap_socket(self.sock, server_hostname=self.host)
+
+
+def check_webhook(url: str, allowed_hosts: Collection[str] = ()) -> Optional[str]:
+    """
+    Raise ValueError unless `url` is an http(s) URL the server may POST to:
+    with `allowed_hosts`, its host must be one of them; without, every
+    address it resolves to must be public (no loopback, private, link-local
+    or cloud metadata addresses). Resolves DNS, so it blocks.
+
+    Returns the checked address to connect to (None for an allowed host), so
+    a second lookup cannot swap in another one.
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise ValueError("Webhook must be an http(s) URL")
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise ValueError(f"Webhook host {host!r} is not allowed")
+        return
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(host, parts.port, proto=socket.IPPROTO_TCP)]
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"Webhook host {host!r} does not resolve: {e}") from None
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if getattr(ip, "ipv4_mapped", None):
+            ip = ip.ipv4_mapped
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"Webhook host {host!r} resolves to a non-public address ({ip})")
+    return addresses[0]
+
+
+def post_webhook(url: str, body: bytes, address: Optional[str] = None, timeout: float = 10):
+    """
+    POST `body` as JSON to `url`, connecting to `address` when given (see
+    check_webhook). Redirects are not followed: any status from 300 up raises OSError.
+    """
+    parts = urlsplit(url)
+    connection_class = _PinnedHTTPSConnection if parts.scheme == "https" else _PinnedHTTPConnection
+    connection = connection_class(parts.hostname, address or parts.hostname, port=parts.port, timeout=timeout)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    try:
+        connection.request("POST", path, body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        response.read()
+        if response.status >= 300:
+            raise OSError(f"HTTP {response.status} {response.reason}")
+    finally:
+        connection.close()
+
+
+def flight_key(record: FlightRecord) -> str:
+    """Identity of a flight across scrapes: airline, flight number and departure."""
+    return f"{record.airline}|{record.flight_number}|{record.departure}"
+
+
+def diff_flights(old: List[FlightRecord], new: List[FlightRecord]) -> Dict[str, List]:
+    """Flights added and removed between two snapshots, and price changes of the rest."""
+    before = {flight_key(record): record for record in old}
+    after = {flight_key(record): record for record in new}
+    price_changes = []
+    for key, record in after.items():
+        previous = before.get(key)
+        if previous is not None and previous.price != record.price:
+            price_changes.append({
+                "airline": record.airline,
+                "flight_number": record.flight_number,
+                "departure": record.departure,
+                "old_price": previous.price,
+                "new_price": record.price,
+                "change": (record.price - previous.price
+                           if record.price is not None and previous.price is not None else None),
+            })
+    return {
+        "added": [record for key, record in after.items() if key not in before],
+        "removed": [record for key, record in before.items() if key not in after],
+        "price_changes": price_changes,
+    }
+
+
+class Watch:
+    """
+    One watched search. `version` counts the snapshots that differed from the
+    previous one; `changes` keeps the most recent of those diffs.
+    """
+
+    def __init__(self, origin: str, destination: str, journey_date: str,
+                 interval: float, webhook: Optional[str], history: int, client: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.client = client
+        self.origin = origin
+        self.destination = destination
+        self.journey_date = journey_date
+        self.interval = interval
+        self.webhook = webhook
+        self.created_at = time.time()
+        self.last_checked: Optional[float] = None
+        self.next_check = time.monotonic()
+        self.snapshot: Optional[List[FlightRecord]] = None
+        self.version = 0
+        self.changes: Deque[Dict] = deque(maxlen=history)
+        self.refreshes = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.changed = asyncio.Event()
+
+    @property
+    def expired(self) -> bool:
+        return date.fromisoformat(self.journey_date) < date.today()
+
+    def to_dict(self) -> Dict:
+        return {
+            "watch_id": self.id,
+            "origin": self.origin,
+            "destination": self.destination,
+            "journey_date": self.journey_date,
+            "interval_seconds": self.interval,
+            "webhook": self.webhook,
+            "created_at": self.created_at,
+            "last_checked": self.last_checked,
+            "version": self.version,
+            "total_flights": len(self.snapshot) if self.snapshot is not None else None,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def changes_since(self, version: int) -> Dict:
+        """
+        The diffs after `version`. When older ones were already dropped from
+        the history, the full snapshot is returned instead (resync).
+        """
+        events = [event for event in self.changes if event["version"] > version]
+        oldest_kept = self.changes[0]["version"] if self.changes else self.version + 1
+        if version < self.version and oldest_kept > version + 1:
+            return {"version": self.version, "resync": True, "flights": self.snapshot or [], "changes": []}
+        return {"version": self.version, "resync": False, "changes": events}
+
+
+class WatchManager:
+    """
+    Re-runs watched searches every `interval` seconds (+/- `jitter` of it, so
+    watches registered together do not refresh together), at most
+    `concurrency` at a time, through `refresh(origin, destination,
+    journey_date, max_age)`, which should share the API's cache and browsers.
+
+    Only differences from the last snapshot are kept and, for watches with a
+    webhook, POSTed there as JSON encoded with `encode`. Webhooks must pass
+    check_webhook against `webhook_hosts`, again before every POST (the DNS
+    answer may have changed), and redirects are not followed. Watches stop
+    once their journey date has passed.
+    """
+
+    def __init__(self, refresh: Callable[..., Awaitable[List[FlightRecord]]],
+                 encode: Callable[[Any], bytes], interval: float = 900, min_interval: float = 60,
+                 jitter: float = 0.2, max_watches: int = 100, concurrency: int = 2,
+                 history: int = 50, webhook_hosts: Collection[str] = (), max_per_client: int = 10):
+        self.refresh = refresh
+        self.encode = encode
+        self.interval = interval
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self.max_watches = max_watches
+        self.max_per_client = max_per_client
+        self.concurrency = concurrency
+        self.history = history
+        self.webhook_hosts = {host.lower() for host in webhook_hosts}
+        self._watches: Dict[str, Watch] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.refreshes = 0
+        self.changes = 0
+        self.webhook_failures = 0
+
+    async def start(self):
+        self._task = asyncio.create_task(self._scheduler())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def add(self, origin: str, destination: str, journey_date: str,
+            interval: Optional[float] = None, webhook: Optional[str] = None,
+            client: Optional[str] = None) -> Watch:
+        """Register a watch; `client` (e.g. the API key or IP) may hold at most `max_per_client`."""
+        if len(self._watches) >= self.max_watches:
+            raise WatchLimit(f"At most {self.max_watches} watches")
+        if client is not None and sum(1 for watch in self._watches.values()
+                                      if watch.client == client) >= self.max_per_client:
+            raise WatchLimit(f"At most {self.max_per_client} watches per client")
+        interval = max(self.min_interval, interval or self.interval)
+        watch = Watch(origin, destination, journey_date, interval, webhook, self.history, client)
+        self._watches[watch.id] = watch
+        self._wakeup.set()
+        return watch
+
+    def check_webhook(self, url: str) -> Optional[str]:
+        """check_webhook against this manager's allowed hosts; raises ValueError."""
+        return check_webhook(url, self.webhook_hosts)
+
+    def get(self, watch_id: str) -> Optional[Watch]:
+        return self._watches.get(watch_id)
+
+    def remove(self, watch_id: str) -> bool:
+        return self._watches.pop(watch_id, None) is not None
+
+    def list(self, client: Optional[str] = None) -> List[Watch]:
+        """All watches, or those `client` registered."""
+        return [watch for watch in self._watches.values() if client is None or watch.client == client]
+
+    async def wait(self, watch: Watch, since: int, timeout: float) -> Watch:
+        """Long-poll: return once the watch is past version `since` or `timeout` seconds pass."""
+        deadline = time.monotonic() + timeout
+        while watch.version <= since:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            watch.changed.clear()
+            try:
+                await asyncio.wait_for(watch.changed.wait(), left)
+            except asyncio.TimeoutError:
+                break
+        return watch
+
+    def stats(self) -> Dict:
+        return {
+            "watches": len(self._watches),
+            "max_watches": self.max_watches,
+            "max_per_client": self.max_per_client,
+            "refreshes": self.refreshes,
+            "changes": self.changes,
+            "webhook_failures": self.webhook_failures,
+        }
+
+    async def _scheduler(self):
+        slots = asyncio.Semaphore(self.concurrency)
+        running: Dict[str, asyncio.Task] = {}
+        while True:
+            now = time.monotonic()
+            for watch in list(self._watches.values()):
+                if watch.expired:
+                    print(f"Watch {watch.id} expired ({watch.journey_date} has passed)")
+                    self._watches.pop(watch.id, None)
+                elif watch.next_check <= now and watch.id not in running:
+                    # Schedule the next check now so a slow refresh does not pile up
+                    spread = watch.interval * self.jitter
+                    watch.next_check = now + watch.interval + random.uniform(-spread, spread)
+                    running[watch.id] = asyncio.create_task(self._refresh_with(slots, watch))
+                    running[watch.id].add_done_callback(lambda _, key=watch.id: running.pop(key, None))
+
+            upcoming = [watch.next_check for watch in self._watches.values()]
+            sleep = min(upcoming) - time.monotonic() if upcoming else 60
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(0.5, sleep))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _refresh_with(self, slots: asyncio.Semaphore, watch: Watch):
+        async with slots:
+            await self._refresh(watch)
+
+    async def _refresh(self, watch: Watch):
+        try:
+            # Another watcher's or client's scrape of the route is good enough
+            # if it is younger than half our interval
+            flights = await self.refresh(watch.origin, watch.destination, watch.journey_date,
+                                         watch.interval / 2)
+        except Exception as e:
+            watch.errors += 1
+            watch.last_error = str(e)
+            print(f"Watch {watch.id} refresh failed: {e}")
+            return
+        finally:
+            watch.refreshes += 1
+            self.refreshes += 1
+            watch.last_checked = time.time()
+
+        if watch.snapshot is None:
+            event = {"initial": True, "added": flights, "removed": [], "price_changes": []}
+        else:
+            event = {"initial": False, **diff_flights(watch.snapshot, flights)}
+        watch.snapshot = flights
+        if not (event["initial"] or event["added"] or event["removed"] or event["price_changes"]):
+            return
+
+        watch.version += 1
+        event = {"version": watch.version, "checked_at": watch.last_checked, **event}
+        watch.changes.append(event)
+        watch.changed.set()
+        self.changes += 1
+        if watch.webhook:
+            await self._post(watch, event)
+
+    async def _post(self, watch: Watch, event: Dict):
+        body = self.encode({"watch": watch.to_dict(), **event})
+
+        def send():
+            # Checked again at send time, and connected to the very address checked
+            post_webhook(watch.webhook, body, self.check_webhook(watch.webhook))
+
+        try:
+            await asyncio.to_thread(send)
+        except Exception as e:
+            self.webhook_failures += 1
+            print(f"Watch {watch.id} webhook failed: {e}")
+
+
+def watch_manager_from_env(refresh: Callable[..., Awaitable[List[FlightRecord]]],
+                           encode: Callable[[Any], bytes]) -> WatchManager:
+    """
+    Build a WatchManager from WATCH_INTERVAL_SECONDS, WATCH_MIN_INTERVAL_SECONDS,
+    WATCH_JITTER, WATCH_MAX, WATCH_MAX_PER_CLIENT, WATCH_CONCURRENCY,
+    WATCH_HISTORY and WATCH_WEBHOOK_HOSTS (comma-separated webhook hosts to allow; when unset,
+    any host with only public addresses).
+    """
+    return WatchManager(
+        refresh,
+        encode,
+        interval=float(os.getenv("WATCH_INTERVAL_SECONDS", "900")),
+        min_interval=float(os.getenv("WATCH_MIN_INTERVAL_SECONDS", "60")),
+        jitter=float(os.getenv("WATCH_JITTER", "0.2")),
+        max_watches=int(os.getenv("WATCH_MAX", "100")),
+        max_per_client=int(os.getenv("WATCH_MAX_PER_CLIENT", "10")),
+        concurrency=int(os.getenv("WATCH_CONCURRENCY", "2")),
+        history=int(os.getenv("WATCH_HISTORY", "50")),
+        webhook_hosts=[host.strip() for host in os.getenv("WATCH_WEBHOOK_HOSTS", "").split(",") if host.strip()],
+    )
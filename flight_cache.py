@@ -0,0 +1,267 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class MemoryBackend:
+    """In-process LRU store bounded to `max_entries`."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value: Any, stored_at: float):
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    On-disk store so several uvicorn workers on one box can share entries.
+    Values are stored as text produced by `dumps` (JSON by default); the least
+    recently used rows are evicted past `max_entries`.
+    """
+
+    # Disk I/O that can wait on other processes' writes: FlightCache's async
+    # methods call it from a worker thread
+    blocking = True
+
+    def __init__(self, path: str = "flight_cache.sqlite3", max_entries: int = 1024,
+                 dumps: Callable[[Any], str] = json.dumps, loads: Callable[[str], Any] = json.loads):
+        self.path = path
+        self.max_entries = max_entries
+        self.dumps = dumps
+        self.loads = loads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " stored_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE cache SET used_at = ? WHERE key = ?", (time.time(), key))
+        return self.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, stored_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, self.dumps(value), stored_at, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM cache WHERE key NOT IN"
+                " (SELECT key FROM cache ORDER BY used_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class NotShared(Exception):
+    """An in-flight fetch ended without a value for those waiting on it; they fetch for themselves."""
+
+
+class FlightCache:
+    """
+    TTL result cache with single-flight coalescing: concurrent lookups of the
+    same missing key share one in-flight fetch instead of each starting their own.
+    Failed fetches are not cached.
+
+    A caller that produces a value itself (e.g. while streaming it) can claim
+    the key with begin() and end the claim with finish() or fail(); meanwhile
+    get_or_fetch() and join() wait for it.
+
+    On an event loop, use the *_async methods: with a blocking backend they
+    run it in a worker thread.
+    """
+
+    def __init__(self, ttl: float = 300, backend=None):
+        self.ttl = ttl
+        self.backend = backend if backend is not None else MemoryBackend()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(origin: str, destination: str, journey_date: str) -> str:
+        return "|".join(part.strip().lower() for part in (origin, destination, journey_date))
+
+    def lookup(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, age_seconds) for a fresh entry, or None."""
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        age = time.time() - stored_at
+        if age > self.ttl:
+            self.backend.delete(key)
+            return None
+        return value, age
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """lookup() that also counts the hit or miss."""
+        cached = self.lookup(key)
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    def store(self, key: str, value: Any, stored_at: Optional[float] = None):
+        self.backend.set(key, value, stored_at or time.time())
+
+    async def _call(self, method: Callable, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def lookup_async(self, key: str) -> Optional[Tuple[Any, float]]:
+        return await self._call(self.lookup, key)
+
+    async def get_async(self, key: str) -> Optional[Tuple[Any, float]]:
+        return await self._call(self.get, key)
+
+    async def store_async(self, key: str, value: Any, stored_at: Optional[float] = None):
+        await self._call(self.store, key, value, stored_at)
+
+    async def stats_async(self) -> Dict:
+        return await self._call(self.stats)
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                           max_age: Optional[float] = None) -> Tuple[Any, float, str]:
+        """
+        Return (value, age_seconds, status) where status is "hit", "miss" or
+        "coalesced". `fetch` is only awaited on a miss; entries older than
+        `max_age` seconds (when given) count as misses.
+        """
+        cached = await self.lookup_async(key)
+        if cached is not None and (max_age is None or cached[1] <= max_age):
+            self.hits += 1
+            return cached[0], cached[1], "hit"
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            status = "coalesced"
+        else:
+            self.misses += 1
+            status = "miss"
+            task = asyncio.ensure_future(self._fetch_and_store(key, fetch))
+            self._inflight[key] = task
+
+        # Shield so one disconnecting client does not cancel the shared fetch
+        try:
+            value = await asyncio.shield(task)
+        except NotShared:
+            return await self.get_or_fetch(key, fetch, max_age)
+        return value, 0.0, status
+
+    def begin(self, key: str) -> bool:
+        """Claim the fetch of `key`; False when a fetch of it is already in flight (see join())."""
+        if key in self._inflight:
+            return False
+        self._inflight[key] = asyncio.get_running_loop().create_future()
+        return True
+
+    async def finish(self, key: str, value: Any):
+        """End a begin() claim: hand `value` to those waiting, and store it."""
+        future = self._inflight[key]
+        future.set_result(value)
+        try:
+            # Until stored, newcomers join the finished fetch rather than miss
+            await self.store_async(key, value)
+        finally:
+            self._inflight.pop(key, None)
+
+    def fail(self, key: str, error: BaseException):
+        """End a begin() claim by raising `error` in those waiting (NotShared to have them fetch for themselves)."""
+        future = self._inflight.pop(key)
+        future.set_exception(error)
+        future.exception()  # retrieved, even if nobody was waiting
+
+    async def join(self, key: str) -> Optional[Any]:
+        """
+        Wait for the fetch of `key` in flight and return its value; None when
+        there is none, or it ended with NotShared.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            return None
+        self.coalesced += 1
+        try:
+            return await asyncio.shield(task)
+        except NotShared:
+            return None
+
+    async def _fetch_and_store(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+            await self.store_async(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self.backend),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def cache_from_env(dumps: Callable[[Any], str] = json.dumps,
+                   loads: Callable[[str], Any] = json.loads) -> FlightCache:
+    """
+    Build a FlightCache from CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES and
+    CACHE_BACKEND ("memory" or "sqlite", with CACHE_SQLITE_PATH). `dumps` and
+    `loads` serialize values for the on-disk backend.
+    """
+    max_entries = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+    if os.getenv("CACHE_BACKEND", "memory") == "sqlite":
+        backend = SQLiteBackend(os.getenv("CACHE_SQLITE_PATH", "flight_cache.sqlite3"), max_entries,
+                                dumps=dumps, loads=loads)
+    else:
+        backend = MemoryBackend(max_entries)
+    return FlightCache(ttl=float(os.getenv("CACHE_TTL_SECONDS", "300")), backend=backend)
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when no more jobs can be accepted."""
+
+
+class Job:
+    def __init__(self, params: Dict):
+        self.id = uuid.uuid4().hex
+        self.params = params
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.done = asyncio.Event()
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            **self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    Bounded background queue of searches.
+
+    `run(**params)` is awaited by one of `workers` worker tasks per job. At most
+    `max_queued` jobs may wait for a worker; beyond that submit() raises
+    QueueFull so the API can answer 429. Finished jobs are kept for `ttl`
+    seconds so clients can collect them, then expire.
+    """
+
+    def __init__(self, run: Callable[..., Awaitable[Any]], workers: int = 4,
+                 max_queued: int = 100, ttl: float = 600):
+        self.run = run
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reaper()))
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, **params) -> Job:
+        job = Job(params)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFull(f"{self.max_queued} searches already queued")
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """Long-poll: return once the job finishes or `timeout` seconds pass."""
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queued": self.max_queued,
+            "jobs": len(self._jobs),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await self.run(**job.params)
+                job.status = "done"
+                self.completed += 1
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "Server shutting down"
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                self.failed += 1
+            finally:
+                job.finished_at = time.time()
+                job.done.set()
+                self._queue.task_done()
+
+    async def _reaper(self):
+        while True:
+            await asyncio.sleep(min(self.ttl, 30))
+            cutoff = time.time() - self.ttl
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+def job_queue_from_env(run: Callable[..., Awaitable[Any]]) -> JobQueue:
+    """Build a JobQueue from JOB_WORKERS, JOB_MAX_QUEUED and JOB_TTL_SECONDS."""
+    return JobQueue(
+        run,
+        workers=int(os.getenv("JOB_WORKERS", "4")),
+        max_queued=int(os.getenv("JOB_MAX_QUEUED", "100")),
+        ttl=float(os.getenv("JOB_TTL_SECONDS", "600")),
+    )
@@ -0,0 +1,230 @@
+import json
+import re
+from dataclasses import asdict, dataclass, fields
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+
+_NUMBER = re.compile(r"\d[\d,]*")
+_HOURS = re.compile(r"(\d+)\s*h", re.IGNORECASE)
+_MINUTES = re.compile(r"(\d+)\s*m", re.IGNORECASE)
+_KILOGRAMS = re.compile(r"(\d+(?:\.\d+)?)\s*kg", re.IGNORECASE)
+_CLOCK = re.compile(r"(\d{1,2})\s*:\s*(\d{2})\s*([AaPp][Mm])?")
+_DAY_MONTH = re.compile(r"(\d{1,2})\s*([A-Za-z]{3})")
+_STOP_WORDS = {"one": 1, "two": 2, "three": 3}
+
+
+@dataclass(slots=True)
+class FlightRecord:
+    """
+    One flight with its fields parsed once at extraction time: integer price,
+    duration in minutes, ISO departure/arrival datetimes, baggage in kg and a
+    stop count. Unparseable values are None.
+    """
+    airline: str
+    flight_number: str
+    origin: str
+    origin_city: str
+    origin_terminal: str
+    destination: str
+    destination_city: str
+    departure: Optional[str]
+    arrival: Optional[str]
+    duration_minutes: Optional[int]
+    stops: Optional[int]
+    layover_info: str
+    price: Optional[int]
+    promo: str
+    checkin_baggage_kg: Optional[float]
+    hand_baggage_kg: Optional[float]
+    available_seats: Optional[int]
+    next_day_arrival: bool
+
+    @classmethod
+    def from_raw(cls, raw: Dict[str, str], journey_date: str) -> "FlightRecord":
+        """Build a record from an extract_flight_data dict of the search for `journey_date`."""
+        search_day = datetime.strptime(journey_date, "%Y-%m-%d").date()
+        next_day = bool(raw.get("next_day_arrival"))
+
+        departure_day = parse_day(raw.get("departure_date", ""), search_day) or search_day
+        arrival_day = parse_day(raw.get("arrival_date", ""), departure_day)
+        if arrival_day is None:
+            arrival_day = departure_day + timedelta(days=1) if next_day else departure_day
+
+        return cls(
+            airline=raw.get("airline", ""),
+            flight_number=raw.get("flight_number", ""),
+            origin=raw.get("origin", ""),
+            origin_city=raw.get("origin_city", ""),
+            origin_terminal=raw.get("origin_terminal", ""),
+            destination=raw.get("destination", ""),
+            destination_city=raw.get("destination_city", ""),
+            departure=combine(departure_day, raw.get("departure_time", "")),
+            arrival=combine(arrival_day, raw.get("arrival_time", "")),
+            duration_minutes=parse_duration(raw.get("duration", "")),
+            stops=parse_stops(raw.get("stops", "")),
+            layover_info=raw.get("layover_info", ""),
+            price=parse_int(raw.get("price", "")),
+            promo=raw.get("promo", ""),
+            checkin_baggage_kg=parse_kilograms(raw.get("checkin_baggage", "")),
+            hand_baggage_kg=parse_kilograms(raw.get("hand_baggage", "")),
+            available_seats=parse_int(raw.get("available_seats", "")),
+            next_day_arrival=next_day,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FlightRecord":
+        return cls(**{f.name: data.get(f.name) for f in fields(cls)})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def parse_int(text: str) -> Optional[int]:
+    """First number in the text, ignoring thousands separators ("₹ 5,432" -> 5432)."""
+    match = _NUMBER.search(text or "")
+    return int(match.group().replace(",", "")) if match else None
+
+
+def parse_duration(text: str) -> Optional[int]:
+    """"2h 15m" -> 135; None when neither hours nor minutes are present."""
+    hours = _HOURS.search(text or "")
+    minutes = _MINUTES.search(text or "")
+    if not hours and not minutes:
+        return None
+    return (int(hours.group(1)) if hours else 0) * 60 + (int(minutes.group(1)) if minutes else 0)
+
+
+def parse_stops(text: str) -> Optional[int]:
+    """"Non-stop" -> 0, "1 Stop" -> 1, "Two Stops" -> 2."""
+    text = (text or "").strip().lower()
+    if not text or text.replace("-", "").replace(" ", "") == "nonstop":
+        return 0
+    number = parse_int(text)
+    if number is not None:
+        return number
+    for word, count in _STOP_WORDS.items():
+        if word in text:
+            return count
+    return None
+
+
+def parse_kilograms(text: str) -> Optional[float]:
+    """"15 Kgs" -> 15 (ints stay ints so JSON shows 15, not 15.0)."""
+    match = _KILOGRAMS.search(text or "")
+    if not match:
+        return None
+    value = float(match.group(1))
+    return int(value) if value.is_integer() else value
+
+
+def parse_day(text: str, near: date) -> Optional[date]:
+    """
+    "Sat, 18 Oct" -> a date. The site omits the year, so pick the one that
+    puts the day closest to `near` (handles searches across New Year).
+    """
+    match = _DAY_MONTH.search(text or "")
+    if not match:
+        return None
+    try:
+        candidates = [datetime.strptime(f"{match.group(1)} {match.group(2).title()} {year}", "%d %b %Y").date()
+                      for year in (near.year - 1, near.year, near.year + 1)]
+    except ValueError:
+        return None
+    return min(candidates, key=lambda day: abs((day - near).days))
+
+
+def combine(day: date, clock: str) -> Optional[str]:
+    """Date plus "06:15" / "6:15 PM" -> "2025-10-18T06:15"."""
+    match = _CLOCK.search(clock or "")
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    meridiem = (match.group(3) or "").lower()
+    if meridiem == "pm" and hour < 12:
+        hour += 12
+    elif meridiem == "am" and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return None
+    return datetime(day.year, day.month, day.day, hour, minute).isoformat(timespec="minutes")
+
+
+def records_from_raw(raw_flights: List[Dict[str, str]], journey_date: str) -> List[FlightRecord]:
+    return [FlightRecord.from_raw(raw, journey_date) for raw in raw_flights]
+
+
+def _default(obj):
+    if isinstance(obj, FlightRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON-encode payloads holding FlightRecords (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_default, ensure_ascii=False).encode("utf-8")
+
+
+def records_to_json(records: List[FlightRecord]) -> str:
+    return dumps(records).decode("utf-8")
+
+
+def records_from_json(text: str) -> List[FlightRecord]:
+    return [FlightRecord.from_dict(item) for item in json.loads(text)]
+
+
+SORT_KEYS = {
+    "price": lambda record: record.price,
+    "duration": lambda record: record.duration_minutes,
+    "departure": lambda record: record.departure,
+}
+
+
+def filter_records(records: List[FlightRecord], max_price: Optional[int] = None,
+                   max_stops: Optional[int] = None, airlines: Optional[List[str]] = None,
+                   departure_after: Optional[str] = None,
+                   departure_before: Optional[str] = None) -> List[FlightRecord]:
+    """
+    Records matching every given criterion. `airlines` match case-insensitively
+    as substrings; the departure window bounds are inclusive "HH:MM" strings.
+    Records missing a field that is filtered on are left out.
+    """
+    wanted = [name.strip().lower() for name in airlines or [] if name.strip()]
+
+    def matches(record: FlightRecord) -> bool:
+        if max_price is not None and (record.price is None or record.price > max_price):
+            return False
+        if max_stops is not None and (record.stops is None or record.stops > max_stops):
+            return False
+        if wanted and not any(name in record.airline.lower() for name in wanted):
+            return False
+        if departure_after or departure_before:
+            if record.departure is None:
+                return False
+            clock = record.departure[11:16]
+            if departure_after and clock < departure_after:
+                return False
+            if departure_before and clock > departure_before:
+                return False
+        return True
+
+    return [record for record in records if matches(record)]
+
+
+def sort_records(records: List[FlightRecord], sort: str) -> List[FlightRecord]:
+    """
+    Sort by "price", "duration" or "departure"; prefix with "-" for descending.
+    Records without the value always sort last.
+    """
+    descending = sort.startswith("-")
+    key = SORT_KEYS[sort.lstrip("-")]
+    present = [record for record in records if key(record) is not None]
+    missing = [record for record in records if key(record) is None]
+    return sorted(present, key=key, reverse=descending) + missing
@@ -0,0 +1,221 @@
+"""
+Backends for sol3.clean_html. Each turns a page into the text of its <p>
+tags (or of the whole body when there are none) with scripts, styles and
+page chrome removed, one paragraph per line with whitespace collapsed, and
+produces the same text for the same page.
+
+"bs4" is the original BeautifulSoup/html.parser cleaner and the default.
+"lxml" parses with libxml2 and reads the text straight off the tree: several
+times faster and much lighter on large pages, but the two parsers build
+different trees for some valid pages (a <template>, a <textarea>, CDATA, a
+<div> inside an open <p>, an unclosed <p>), so the same page can give
+different text. bench_cleaner lists these cases; choose lxml with
+HTML_CLEANER=lxml where that is acceptable.
+
+The streaming cleaners take the page piece by piece while it downloads.
+LxmlStreamingCleaner parses incrementally and can report that enough text
+has been collected, so the download can stop early.
+"""
+import os
+import re
+from typing import Callable, Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # optional: the bs4 cleaner does not need it
+    lxml_html = None
+
+
+DROP_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside']
+
+_BODY_TAG = re.compile(r"<body[\s>/]", re.IGNORECASE)
+_HTML_END_TAG = re.compile(r"</html\s*>", re.IGNORECASE)
+_BODY_OR_HTML_END_TAG = re.compile(r"</(?:body|html)\s*>", re.IGNORECASE)
+
+
+def join_paragraphs(paragraphs) -> str:
+    """One line per non-empty paragraph, whitespace collapsed."""
+    return '\n'.join(line for line in (' '.join(p.split()) for p in paragraphs) if line)
+
+
+def clean_bs4(html: str) -> str:
+    soup = BeautifulSoup(html, 'html.parser')
+
+    for tag in soup(DROP_TAGS):
+        tag.decompose()
+
+    paragraphs = soup.find_all('p')
+
+    if not paragraphs:
+        print("Warning: No <p> tags found. Falling back to all text.")
+        return join_paragraphs([(soup.body or soup).get_text(separator=' ', strip=True)])
+
+    return join_paragraphs(p.get_text(strip=True) for p in paragraphs)
+
+
+def _lxml_tree(html: str):
+    root = lxml_html.document_fromstring(html.encode('utf-8'),
+                                         parser=lxml_html.HTMLParser(encoding='utf-8'))
+    # Emptied rather than removed: removing would merge the text around the
+    # element into one string, which strips differently than bs4's two
+    for element in list(root.iter(*DROP_TAGS)):
+        element.clear(keep_tail=True)
+    return root
+
+
+def clean_lxml(html: str) -> str:
+    # libxml2 leaves whatever follows </html> out of the tree, html.parser
+    # keeps the paragraphs there: without the closing tags libxml2 does too
+    end = _HTML_END_TAG.search(html)
+    late = end is not None and bool(html[end.end():].strip())
+    try:
+        root = _lxml_tree(_BODY_OR_HTML_END_TAG.sub('', html) if late else html)
+    except etree.ParserError:  # nothing but whitespace
+        return ''
+
+    # get_text(strip=True) joins the stripped strings without a separator
+    paragraphs = [''.join(text.strip() for text in p.itertext()) for p in root.iter('p')]
+
+    if not paragraphs:
+        print("Warning: No <p> tags found. Falling back to all text.")
+        if late:  # the fallback reads only the body, as written
+            root = _lxml_tree(html)
+        # html.parser has no <body> to offer when the page did not write one
+        scope = root.body if _BODY_TAG.search(html) else root
+        return join_paragraphs([' '.join(scope.itertext())])
+
+    return join_paragraphs(paragraphs)
+
+
+class BufferedCleaner:
+    """
+    Streaming interface to a whole-page cleaner: cleans everything fed at
+    close(), keeping paragraphs until `max_chars` of text are in.
+    """
+
+    def __init__(self, clean: Callable[[str], str], max_chars: Optional[int] = None):
+        self._clean = clean
+        self.max_chars = max_chars
+        self._parts: List[str] = []
+
+    def feed(self, html: str) -> bool:
+        self._parts.append(html)
+        return False
+
+    def close(self) -> str:
+        text = self._clean(''.join(self._parts))
+        if self.max_chars is None:
+            return text
+        lines, chars = [], 0
+        for line in text.split('\n'):
+            if chars >= self.max_chars:
+                break
+            lines.append(line)
+            chars += len(line)
+        return '\n'.join(lines)
+
+
+class LxmlStreamingCleaner:
+    """
+    clean_lxml over HTML fed as it arrives. A paragraph's text is taken as
+    soon as it closes and its subtree is freed. feed() returns True once
+    `max_chars` of paragraph text have been collected (later paragraphs are
+    ignored), at which point the caller can stop downloading. Fed a whole
+    page without a limit, it returns what clean_lxml does.
+    """
+
+    def __init__(self, max_chars: Optional[int] = None):
+        self.max_chars = max_chars
+        self._parser = etree.HTMLPullParser(events=('start', 'end'), encoding='utf-8')
+        self._paragraphs: List[str] = []
+        self._chars = 0
+        self._dropping = 0
+        self._in_paragraph = 0
+        self._saw_body = False
+        self._last = ''
+
+    def feed(self, html: str) -> bool:
+        # The <body check spans pieces: a tag can be split between two
+        self._saw_body = self._saw_body or bool(_BODY_TAG.search(self._last + html))
+        self._last = html[-8:]
+        self._parser.feed(html.encode('utf-8'))
+        self._collect()
+        return self.enough
+
+    @property
+    def enough(self) -> bool:
+        return self.max_chars is not None and self._chars >= self.max_chars
+
+    def _collect(self):
+        for event, element in self._parser.read_events():
+            if element.tag in DROP_TAGS:
+                if event == 'start':
+                    self._dropping += 1
+                else:
+                    self._dropping -= 1
+                    element.clear(keep_tail=True)
+            elif element.tag == 'p' and event == 'start':
+                self._in_paragraph += 1
+            elif element.tag == 'p':
+                self._in_paragraph -= 1
+                if not (self._dropping or self.enough):
+                    text = ''.join(text.strip() for text in element.itertext())
+                    self._paragraphs.append(text)
+                    self._chars += len(text)
+                element.clear(keep_tail=True)
+            elif event == 'end' and self._paragraphs and not self._in_paragraph:
+                # Outside paragraphs, and with no fallback to the whole body
+                # any more, nothing else is needed
+                element.clear(keep_tail=True)
+
+    def close(self) -> str:
+        try:
+            root = self._parser.close()
+        except etree.XMLSyntaxError:  # nothing but whitespace
+            return ''
+        if root is None:  # nothing but end tags
+            return ''
+        self._collect()
+
+        if not self._paragraphs:
+            print("Warning: No <p> tags found. Falling back to all text.")
+            scope = root.find('body') if self._saw_body else root
+            return join_paragraphs([' '.join(scope.itertext())])[:self.max_chars]
+
+        return join_paragraphs(self._paragraphs)
+
+
+def clean_lxml_streaming(html: str, piece: int = 65536) -> str:
+    """LxmlStreamingCleaner over `html` in `piece`-sized slices, as a download would feed it."""
+    cleaner = LxmlStreamingCleaner()
+    for start in range(0, len(html), piece):
+        cleaner.feed(html[start:start + piece])
+    return cleaner.close()
+
+
+CLEANERS: Dict[str, Callable[[str], str]] = {"bs4": clean_bs4}
+if lxml_html is not None:
+    CLEANERS["lxml"] = clean_lxml
+    CLEANERS["lxml-stream"] = clean_lxml_streaming
+
+
+def cleaner_from_env() -> Callable[[str], str]:
+    """The HTML_CLEANER backend ("bs4", the default, "lxml" or "lxml-stream")."""
+    name = os.getenv("HTML_CLEANER") or "bs4"
+    if name not in CLEANERS:
+        raise ValueError(f"Unknown or unavailable HTML_CLEANER {name!r}; choose from {sorted(CLEANERS)}")
+    return CLEANERS[name]
+
+
+def streaming_cleaner_from_env(max_chars: Optional[int] = None):
+    """
+    A cleaner to feed() while downloading: incremental (and able to stop at
+    `max_chars`) for the lxml backends, buffered for bs4.
+    """
+    clean = cleaner_from_env()
+    if clean in (clean_lxml, clean_lxml_streaming):
+        return LxmlStreamingCleaner(max_chars)
+    return BufferedCleaner(clean, max_chars)
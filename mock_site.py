@@ -0,0 +1,263 @@
+"""
+Local stand-in for budgetticket.in, for benchmarking the scraper offline.
+
+It serves the pieces of the site the scraper touches, with the same selectors:
+the home form with origin/destination autocomplete (suggestions fetched from
+/api/cities), the journey date calendar, and a results page whose cards arrive
+in batches over /api/cards. Card count and latencies are configurable.
+
+Usage:
+    python mock_site.py --cards 60 --port 8765
+    FLIGHT_SITE_URL=http://127.0.0.1:8765 uvicorn sol2:app
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+CITIES = [
+    ("Bangalore", "BLR"), ("Delhi", "DEL"), ("Mumbai", "BOM"), ("Chennai", "MAA"),
+    ("Kolkata", "CCU"), ("Hyderabad", "HYD"), ("Goa", "GOI"), ("Pune", "PNQ"),
+    ("Ahmedabad", "AMD"), ("Jaipur", "JAI"), ("Kochi", "COK"), ("Lucknow", "LKO"),
+]
+
+
+def sample_card_html(index: int) -> str:
+    """One result card using the same markup the extractor targets."""
+    stops = ('<span class="onechangecolor font-weight-bold responsive-dblock" '
+             'data-balloon="Layover at BOM 1h 10m">1 Stop</span>' if index % 3 == 0 else '')
+    next_day = '<span class="text-danger">+1 Day</span>' if index % 4 == 0 else ''
+    promo = '<p class="lbl-PromoFare mb-0">Promo fare</p>' if index % 5 == 0 else ''
+    hour = 5 + index % 18
+    return f"""
+    <div class="card-body">
+      <p class="h6 responsive-bold mb-0">Airline {index % 6}</p>
+      <p class="mb-0 d-inline d-lg-block">AI-{100 + index}</p>
+      <p class="text-extra-dark font-weight-600 mb-0 text-nowrap">BLR</p>
+      <span class="text-mild-dark d-block h4">{hour:02d}:15</span>
+      <p class="hide-on-small-and-down mb-0 d-block">Sat, 18 Oct</p>
+      <p class="font-weight-normal small mb-0 text-nowrap text-light-dark">Bangalore</p>
+      <p class="font-weight-normal small text-light-dark">Terminal 1</p>
+      <span class="responsive-dblock text-extra-dark font-weight-bold">2h {index % 60}m</span>
+      {stops}
+      <p class="text-extra-dark font-weight-600 mb-0 text-nowrap">DEL</p>
+      <span class="text-mild-dark d-block h4">{(hour + 2) % 24:02d}:{index % 60:02d}</span>
+      <p class="hide-on-small-and-down mb-0 d-block">Sat, 18 Oct</p>
+      <p class="font-weight-normal small mb-0 text-nowrap text-light-dark">Delhi</p>
+      {next_day}
+      <p class="text-gray roboto_font mb-0 text-primary h4">&#8377; {4000 + 37 * index:,}</p>
+      {promo}
+      <div class="action-bar">
+        <span class="text">15 Kgs / 7 Kgs</span>
+        <span class="text ng-binding">{1 + index % 9} Seat(s) left</span>
+      </div>
+    </div>"""
+
+
+def sample_results_html(cards: int) -> str:
+    return "<html><body>" + "".join(sample_card_html(i) for i in range(cards)) + "</body></html>"
+
+
+HOME_HTML = """<!doctype html>
+<html><head><title>Mock BudgetTicket</title>
+<style>.angucomplete-dropdown, .calendar { display: none; }</style>
+</head><body>
+<form onsubmit="return false">
+  <div class="angucomplete-holder">
+    <input id="anguScroll_value" placeholder="Select Origin City" autocomplete="off">
+    <div class="angucomplete-dropdown"></div>
+  </div>
+  <div class="angucomplete-holder">
+    <input id="destination_value" placeholder="Select Destination City" autocomplete="off">
+    <div class="angucomplete-dropdown"></div>
+  </div>
+  <input placeholder="Select Journey Date" readonly>
+  <table class="calendar"><tbody>
+    <tr>__DAYS__</tr>
+  </tbody></table>
+  <input type="submit" ng-click="Search(false)" value="Search">
+</form>
+<script>
+function attachAutocomplete(input) {
+  const dropdown = input.nextElementSibling;
+  let selected = -1;
+  let timer = null;
+  input.addEventListener('input', () => {
+    clearTimeout(timer);
+    delete input.dataset.code;
+    timer = setTimeout(() => {
+      fetch('/api/cities?q=' + encodeURIComponent(input.value))
+        .then((r) => r.json())
+        .then((cities) => {
+          dropdown.innerHTML = cities.map((c) =>
+            '<div class="angucomplete-row" data-code="' + c.code + '">' + c.name + ' (' + c.code + ')</div>'
+          ).join('');
+          dropdown.style.display = cities.length ? 'block' : 'none';
+          selected = -1;
+        });
+    }, 30);
+  });
+  input.addEventListener('keydown', (e) => {
+    const rows = dropdown.querySelectorAll('.angucomplete-row');
+    if (e.key === 'ArrowDown' && rows.length) {
+      selected = Math.min(selected + 1, rows.length - 1);
+      rows.forEach((row, i) => row.classList.toggle('angucomplete-selected-row', i === selected));
+      e.preventDefault();
+    } else if (e.key === 'Enter' && selected >= 0) {
+      input.value = rows[selected].textContent;
+      input.dataset.code = rows[selected].dataset.code;
+      dropdown.innerHTML = '';
+      dropdown.style.display = 'none';
+      e.preventDefault();
+    }
+  });
+}
+document.querySelectorAll('.angucomplete-holder input').forEach(attachAutocomplete);
+
+const dateInput = document.querySelector("input[placeholder='Select Journey Date']");
+const calendar = document.querySelector('.calendar');
+dateInput.addEventListener('click', () => { calendar.style.display = 'table'; });
+calendar.querySelectorAll('td[data-day]').forEach((cell) => {
+  cell.addEventListener('click', () => {
+    const now = new Date();
+    const day = String(cell.dataset.day).padStart(2, '0');
+    const month = String(now.getMonth() + 1).padStart(2, '0');
+    dateInput.value = now.getFullYear() + '-' + month + '-' + day;
+    calendar.style.display = 'none';
+  });
+});
+
+document.querySelector("input[ng-click='Search(false)']").addEventListener('click', () => {
+  const origin = document.querySelector('#anguScroll_value').dataset.code;
+  const destination = document.querySelector('#destination_value').dataset.code;
+  if (!origin || !destination || !dateInput.value) return;
+  location.href = '/results?from=' + origin + '&to=' + destination + '&date=' + dateInput.value;
+});
+</script>
+</body></html>
+""".replace("__DAYS__", "".join(f'<td data-day="{day}">{day}</td>' for day in range(1, 32)))
+
+RESULTS_HTML = """<!doctype html>
+<html><head><title>Mock results</title></head><body>
+<div id="results"></div>
+<script>
+const results = document.getElementById('results');
+const batches = __BATCHES__;
+if (batches === 0) {
+  setTimeout(() => { results.innerHTML = '<p>No flights found for this route</p>'; }, __EMPTY_MS__);
+}
+for (let i = 0; i < batches; i++) {
+  fetch('/api/cards' + location.search + '&batch=' + i)
+    .then((r) => r.text())
+    .then((html) => results.insertAdjacentHTML('beforeend', html));
+}
+</script>
+</body></html>
+"""
+
+
+class MockSite:
+    """
+    Threaded HTTP server for the mock site.
+
+    cards: result cards per search, delivered in `batches` responses
+    autocomplete_ms: latency of each /api/cities suggestion request
+    results_ms: latency until the last card batch arrives (earlier batches
+                arrive proportionally sooner)
+    """
+
+    def __init__(self, cards: int = 60, batches: int = 3, autocomplete_ms: int = 150,
+                 results_ms: int = 800, host: str = "127.0.0.1", port: int = 0):
+        self.cards = cards
+        self.batches = batches if cards else 0
+        self.autocomplete_ms = autocomplete_ms
+        self.results_ms = results_ms
+        self.city_requests = 0
+        self.searches = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockSite":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, body: str, content_type: str = "text/html; charset=utf-8"):
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = parse_qs(parts.query)
+
+                if parts.path == "/":
+                    self._send(HOME_HTML)
+                elif parts.path == "/api/cities":
+                    site.city_requests += 1
+                    time.sleep(site.autocomplete_ms / 1000)
+                    q = query.get("q", [""])[0].strip().lower()
+                    matches = [{"name": name, "code": code} for name, code in CITIES
+                               if q and (name.lower().startswith(q) or code.lower() == q)]
+                    self._send(json.dumps(matches), "application/json")
+                elif parts.path == "/results":
+                    site.searches += 1
+                    self._send(RESULTS_HTML.replace("__BATCHES__", str(site.batches))
+                               .replace("__EMPTY_MS__", str(site.results_ms)))
+                elif parts.path == "/api/cards":
+                    batch = int(query.get("batch", ["0"])[0])
+                    time.sleep(site.results_ms * (batch + 1) / site.batches / 1000)
+                    per_batch = -(-site.cards // site.batches)
+                    indexes = range(batch * per_batch, min((batch + 1) * per_batch, site.cards))
+                    self._send("".join(sample_card_html(i) for i in indexes))
+                else:
+                    self.send_error(404)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the mock flight search site")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cards", type=int, default=60)
+    parser.add_argument("--batches", type=int, default=3)
+    parser.add_argument("--autocomplete-ms", type=int, default=150)
+    parser.add_argument("--results-ms", type=int, default=800)
+    args = parser.parse_args()
+
+    site = MockSite(cards=args.cards, batches=args.batches, autocomplete_ms=args.autocomplete_ms,
+                    results_ms=args.results_ms, port=args.port)
+    print(f"Mock site running at {site.url}")
+    try:
+        site._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,160 @@
+import os
+import threading
+from typing import Dict, Iterable
+from urllib.parse import urlsplit
+
+
+# Third-party hosts the search flow never needs
+DEFAULT_BLOCK_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "adservice.google.com",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "clarity.ms",
+)
+
+# Stylesheets stay allowed: the waits rely on elements being visible
+DEFAULT_BLOCK_TYPES = ("image", "font", "media")
+
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class RequestStats:
+    """Request and byte counters for one browser context."""
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked = 0
+        self.bytes = 0
+        self.blocked_by_type: Dict[str, int] = {}
+
+    def to_dict(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "blocked": self.blocked,
+            "bytes": self.bytes,
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
+
+    def __str__(self):
+        return (f"{self.requests} request(s), {self.blocked} blocked, "
+                f"{self.bytes / 1024:.0f} KiB received")
+
+
+class ResourcePolicy:
+    """
+    Decides which requests a scraping context may make, by resource type and
+    domain. An allowed domain always wins over the deny lists.
+
+    install()/install_async() route every request of a context through the
+    policy and return a RequestStats for that context. Bytes are taken from
+    Content-Length, so chunked responses without one are not counted.
+    """
+
+    def __init__(self, block_types: Iterable[str] = DEFAULT_BLOCK_TYPES,
+                 block_domains: Iterable[str] = DEFAULT_BLOCK_DOMAINS,
+                 allow_domains: Iterable[str] = ()):
+        self.block_types = frozenset(block_types)
+        self.block_domains = tuple(block_domains)
+        self.allow_domains = tuple(allow_domains)
+        self._lock = threading.Lock()
+        self.totals = RequestStats()
+        self.searches = 0
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        host = (urlsplit(url).hostname or "").lower()
+        if _host_matches(host, self.allow_domains):
+            return False
+        return resource_type in self.block_types or _host_matches(host, self.block_domains)
+
+    def install(self, context) -> RequestStats:
+        """Apply the policy to a sync BrowserContext."""
+        stats = RequestStats()
+
+        def handle(route):
+            if self._decide(stats, route.request):
+                route.abort()
+            else:
+                route.continue_()
+
+        context.route("**/*", handle)
+        context.on("response", lambda response: self._count_bytes(stats, response))
+        return stats
+
+    async def install_async(self, context) -> RequestStats:
+        """Apply the policy to an async BrowserContext."""
+        stats = RequestStats()
+
+        async def handle(route):
+            if self._decide(stats, route.request):
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await context.route("**/*", handle)
+        context.on("response", lambda response: self._count_bytes(stats, response))
+        return stats
+
+    def record(self, stats: RequestStats):
+        """Fold one finished search's counters into the totals."""
+        with self._lock:
+            self.searches += 1
+            self.totals.requests += stats.requests
+            self.totals.blocked += stats.blocked
+            self.totals.bytes += stats.bytes
+            for resource_type, count in stats.blocked_by_type.items():
+                self.totals.blocked_by_type[resource_type] = (
+                    self.totals.blocked_by_type.get(resource_type, 0) + count
+                )
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "searches": self.searches,
+                "block_types": sorted(self.block_types),
+                "block_domains": list(self.block_domains),
+                "allow_domains": list(self.allow_domains),
+                **self.totals.to_dict(),
+            }
+
+    def _decide(self, stats: RequestStats, request) -> bool:
+        stats.requests += 1
+        blocked = self.should_block(request.url, request.resource_type)
+        if blocked:
+            stats.blocked += 1
+            stats.blocked_by_type[request.resource_type] = (
+                stats.blocked_by_type.get(request.resource_type, 0) + 1
+            )
+        return blocked
+
+    @staticmethod
+    def _count_bytes(stats: RequestStats, response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            stats.bytes += int(length)
+
+
+def _env_list(name: str, default: Iterable[str]) -> Iterable[str]:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
+
+
+def policy_from_env() -> ResourcePolicy:
+    """
+    Build a ResourcePolicy from BLOCK_RESOURCE_TYPES, BLOCK_DOMAINS and
+    ALLOW_DOMAINS (comma-separated; set a list to "" to disable it).
+    """
+    return ResourcePolicy(
+        block_types=_env_list("BLOCK_RESOURCE_TYPES", DEFAULT_BLOCK_TYPES),
+        block_domains=_env_list("BLOCK_DOMAINS", DEFAULT_BLOCK_DOMAINS),
+        allow_domains=_env_list("ALLOW_DOMAINS", ()),
+    )
@@ -0,0 +1,215 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out."""
+
+
+class InvalidSearch(Exception):
+    """The search cannot succeed as asked (e.g. an unknown city), whatever the state of the site."""
+
+
+class CircuitOpen(Exception):
+    """The upstream site is failing; searches fail fast until `retry_after` seconds pass."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Flight site unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+# time.monotonic() by which the current request must finish, if it has a deadline
+_current_deadline: ContextVar[Optional[float]] = ContextVar("search_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Give the block (and tasks it starts) `seconds` to finish. Nested deadlines
+    can only shorten the outer one.
+    """
+    until = time.monotonic() + seconds
+    outer = _current_deadline.get()
+    token = _current_deadline.set(until if outer is None else min(outer, until))
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (None when there is none)."""
+    until = _current_deadline.get()
+    return None if until is None else until - time.monotonic()
+
+
+class RetryPolicy:
+    """
+    Retry one step of a search up to `attempts` times in total, sleeping a
+    jittered exponential backoff (base_delay * 2**n, capped at max_delay)
+    between tries. Never sleeps or retries past the current deadline.
+
+    `should_retry(error)` decides whether an error is worth another try on the
+    same page (e.g. not when the page itself crashed).
+    """
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.25, max_delay: float = 2.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.exhausted = 0
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _next_delay(self, name: str, attempt: int, error: Exception,
+                    should_retry: Optional[Callable[[Exception], bool]]) -> Optional[float]:
+        """Delay before the next attempt, or None to give up and re-raise."""
+        if attempt + 1 >= self.attempts or (should_retry and not should_retry(error)):
+            self.exhausted += 1
+            return None
+        delay = self.backoff(attempt)
+        left = remaining()
+        if left is not None and left <= delay:
+            self.exhausted += 1
+            return None
+        self.retries += 1
+        print(f"{name} failed ({error}), retrying in {delay * 1000:.0f} ms "
+              f"(attempt {attempt + 2}/{self.attempts})")
+        return delay
+
+    async def run_async(self, name: str, step: Callable[[], Awaitable[Any]],
+                        should_retry: Optional[Callable[[Exception], bool]] = None) -> Any:
+        for attempt in range(self.attempts):
+            try:
+                return await step()
+            except Exception as e:
+                delay = self._next_delay(name, attempt, e, should_retry)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+    def run(self, name: str, step: Callable[[], Any],
+            should_retry: Optional[Callable[[Exception], bool]] = None) -> Any:
+        """Blocking version of run_async for the sync engine."""
+        for attempt in range(self.attempts):
+            try:
+                return step()
+            except Exception as e:
+                delay = self._next_delay(name, attempt, e, should_retry)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+    def stats(self) -> Dict:
+        return {"attempts": self.attempts, "retries": self.retries, "exhausted": self.exhausted}
+
+
+class CircuitBreaker:
+    """
+    Stops searching after `failures` consecutive failed searches: for the next
+    `reset_after` seconds check() raises CircuitOpen. Then one trial search is
+    let through; its success closes the circuit, its failure re-opens it.
+
+    Errors of the `neutral` types say nothing about the site (a bad search,
+    or time spent waiting locally, e.g. for a browser) and count neither way.
+    """
+
+    def __init__(self, failures: int = 5, reset_after: float = 30.0,
+                 neutral: Tuple[Type[BaseException], ...] = (InvalidSearch, DeadlineExceeded)):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.neutral = neutral
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._trial_running or time.monotonic() - self._opened_at >= self.reset_after:
+            return "half-open"
+        return "open"
+
+    def check(self):
+        """Raise CircuitOpen unless a search may run now."""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited >= self.reset_after and not self._trial_running:
+                self._trial_running = True
+                return
+            self.rejected += 1
+            raise CircuitOpen(max(self.reset_after - waited, 1.0))
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._trial_running or (self._opened_at is None and self._consecutive >= self.failures):
+                self.opened += 1
+                print(f"Circuit opened after {self._consecutive} consecutive failed search(es)")
+                self._opened_at = time.monotonic()
+                self._trial_running = False
+
+    @contextmanager
+    def call(self):
+        """check(), then record the outcome of the block (awaits inside are fine)."""
+        self.check()
+        try:
+            yield
+        except self.neutral:
+            self._no_verdict()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        except BaseException:
+            # Cancelled: no verdict either
+            self._no_verdict()
+            raise
+        self.record_success()
+
+    def _no_verdict(self):
+        """Let another trial through without changing the failure count."""
+        with self._lock:
+            self._trial_running = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._consecutive,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+def retry_policy_from_env() -> RetryPolicy:
+    """RetryPolicy from STAGE_ATTEMPTS, RETRY_BASE_DELAY_MS and RETRY_MAX_DELAY_MS."""
+    return RetryPolicy(attempts=int(os.getenv("STAGE_ATTEMPTS", "3")),
+                       base_delay=int(os.getenv("RETRY_BASE_DELAY_MS", "250")) / 1000,
+                       max_delay=int(os.getenv("RETRY_MAX_DELAY_MS", "2000")) / 1000)
+
+
+def breaker_from_env() -> CircuitBreaker:
+    """CircuitBreaker from BREAKER_FAILURES and BREAKER_RESET_SECONDS."""
+    return CircuitBreaker(failures=int(os.getenv("BREAKER_FAILURES", "5")),
+                          reset_after=float(os.getenv("BREAKER_RESET_SECONDS", "30")))
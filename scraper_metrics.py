@@ -0,0 +1,182 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Optional
+
+# Seconds; searches take from well under a second (warm, cached) to a minute
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+# Per-search stage timings (ms) collected for the response, if anyone asked
+_current_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("search_timings", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.total += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+def _add_snapshot(into: Dict, snapshot: Dict):
+    """Add the counts of a ScraperMetrics.snapshot() to `into`, in place."""
+    for stage, histogram in snapshot["histograms"].items():
+        target = into["histograms"].setdefault(stage, {"counts": [0] * len(histogram["counts"]),
+                                                       "total": 0.0, "count": 0})
+        target["counts"] = [a + b for a, b in zip(target["counts"], histogram["counts"])]
+        target["total"] += histogram["total"]
+        target["count"] += histogram["count"]
+    for kind in ("in_flight", "errors"):
+        for stage, count in snapshot[kind].items():
+            into[kind][stage] = into[kind].get(stage, 0) + count
+
+
+class ScraperMetrics:
+    """
+    Stage timings, in-flight gauges and error counters for the scraper,
+    rendered in the Prometheus text format.
+
+    Wrap each stage of a search in `with metrics.stage("goto"):` (awaits inside
+    the block are fine). Inside a `with metrics.collect() as timings:` block,
+    the durations of all stages run by that task, including tasks it starts,
+    are also added to `timings` in milliseconds.
+
+    Other processes (fleet workers) send their snapshot() here through
+    set_remote(); render() reports the sum of this process and theirs.
+    """
+
+    def __init__(self, prefix: str = "flight_scraper", buckets: Iterable[float] = STAGE_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+        # Latest snapshot of each live remote process, and the final counts
+        # of departed ones (so the summed counters never go backwards)
+        self._remote: Dict[str, Dict] = {}
+        self._departed: Dict = {"histograms": {}, "in_flight": {}, "errors": {}}
+
+    @contextmanager
+    def stage(self, name: str):
+        with self._lock:
+            self._in_flight[name] = self._in_flight.get(name, 0) + 1
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                self._errors[name] = self._errors.get(name, 0) + 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight[name] -= 1
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name: str, seconds: float):
+        """Record a stage duration measured by the caller."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings[name] = round(timings.get(name, 0) + seconds * 1000, 1)
+
+    @contextmanager
+    def collect(self):
+        """Collect the stage timings of this block into the yielded dict."""
+        timings: Dict[str, float] = {}
+        token = _current_timings.set(timings)
+        try:
+            yield timings
+        finally:
+            _current_timings.reset(token)
+
+    def add_timings(self, timings: Dict[str, float]):
+        """Add stage timings (ms) measured elsewhere, e.g. by a worker, to the current collect() block."""
+        current = _current_timings.get()
+        if current is not None:
+            for name, ms in timings.items():
+                current[name] = round(current.get(name, 0) + ms, 1)
+
+    def snapshot(self) -> Dict:
+        """This process's metrics as plain data, for set_remote() in another process."""
+        with self._lock:
+            return {
+                "histograms": {stage: {"counts": list(h.counts), "total": h.total, "count": h.count}
+                               for stage, h in self._histograms.items()},
+                "in_flight": dict(self._in_flight),
+                "errors": dict(self._errors),
+            }
+
+    def set_remote(self, source: str, snapshot: Optional[Dict]):
+        """
+        Record the latest snapshot() of process `source`; None when it is
+        gone, which keeps its counts but drops its in-flight gauges.
+        """
+        with self._lock:
+            if snapshot is not None:
+                self._remote[source] = snapshot
+                return
+            last = self._remote.pop(source, None)
+            if last is not None:
+                _add_snapshot(self._departed, {**last, "in_flight": {}})
+
+    def _merged(self) -> Dict:
+        """Local, remote and departed metrics summed (caller holds the lock)."""
+        merged = {"histograms": {}, "in_flight": {}, "errors": {}}
+        _add_snapshot(merged, {
+            "histograms": {stage: {"counts": h.counts, "total": h.total, "count": h.count}
+                           for stage, h in self._histograms.items()},
+            "in_flight": self._in_flight,
+            "errors": self._errors,
+        })
+        for snapshot in [self._departed, *self._remote.values()]:
+            _add_snapshot(merged, snapshot)
+        return merged
+
+    def render(self, gauges: Optional[Dict[str, float]] = None,
+               counters: Optional[Dict[str, float]] = None) -> str:
+        """
+        Prometheus exposition of the stage metrics plus any extra gauges and
+        counters (names are prefixed; counters get a _total suffix).
+        """
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_stage_seconds Duration of scraper stages",
+            f"# TYPE {p}_stage_seconds histogram",
+        ]
+        with self._lock:
+            merged = self._merged()
+        for stage, histogram in sorted(merged["histograms"].items()):
+            for bound, count in zip(self.buckets, histogram["counts"]):
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{p}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {histogram["total"]:.6f}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+
+        lines += [f"# HELP {p}_stage_in_flight Stages currently running",
+                  f"# TYPE {p}_stage_in_flight gauge"]
+        lines += [f'{p}_stage_in_flight{{stage="{stage}"}} {count}'
+                  for stage, count in sorted(merged["in_flight"].items())]
+
+        lines += [f"# HELP {p}_stage_errors_total Stages that raised",
+                  f"# TYPE {p}_stage_errors_total counter"]
+        lines += [f'{p}_stage_errors_total{{stage="{stage}"}} {count}'
+                  for stage, count in sorted(merged["errors"].items())]
+
+        for name, value in (gauges or {}).items():
+            lines += [f"# TYPE {p}_{name} gauge", f"{p}_{name} {value}"]
+        for name, value in (counters or {}).items():
+            lines += [f"# TYPE {p}_{name}_total counter", f"{p}_{name}_total {value}"]
+        return "\n".join(lines) + "\n"
@@ -1,20 +1,187 @@
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from playwright.sync_api import sync_playwright, TimeoutError
+from playwright.async_api import async_playwright, TimeoutError as AsyncTimeoutError
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from contextlib import AsyncExitStack, asynccontextmanager
+import asyncio
+import math
+import os
+import re
 import time
-from starlette.concurrency import run_in_threadpool
 
+from admission import RateLimiter, Rejected, ScrapeGate, rate_limiter_from_env, scrape_gate_from_env
+from browser_pool import AsyncBrowserPool, BrowserPool, async_pool_from_env
+from fare_store import FareStore, fare_store_from_env
+from flight_cache import FlightCache, NotShared, cache_from_env
+from fare_watch import WatchLimit, WatchManager, watch_manager_from_env
+from flight_jobs import JobQueue, QueueFull, job_queue_from_env
+from resource_policy import ResourcePolicy, policy_from_env
+from retry_policy import (CircuitBreaker, CircuitOpen, DeadlineExceeded, InvalidSearch, RetryPolicy,
+                          breaker_from_env, deadline, remaining, retry_policy_from_env)
+from scraper_metrics import ScraperMetrics
+from city_index import CityIndex, city_index_from_env
+from warm_pages import WarmPagePool, warm_pages_from_env
+from worker_fleet import WorkerFleet, fleet_from_env
+from flight_record import (FlightRecord, dumps, filter_records, records_from_json, records_from_raw,
+                           records_to_json, sort_records)
 
-app = FastAPI(title="Flight Scraper API", version="1.0.0")
 
-def set_input_value_and_dispatch(page, selector, value):
-    """
-    Set the value of an input via JS and dispatch input/change events so Angular hears it.
-    Returns True if selector exists and script ran.
-    """
-    script = f"""
+# Long-lived browsers shared by all requests, started in the app lifespan.
+# The API drives them with the async engine; the sync functions below remain
+# for scripts (optionally on a sync BrowserPool).
+browser_pool: Optional[AsyncBrowserPool] = None
+
+# Recent search results, so repeated searches skip the browser entirely
+flight_cache: FlightCache = cache_from_env(dumps=records_to_json, loads=records_from_json)
+
+# Every scrape's flights, kept for price history (None unless FARE_STORE_PATH is set)
+fare_store: Optional[FareStore] = fare_store_from_env()
+
+# Per-stage timings, in-flight gauges and error counters for /metrics
+scraper_metrics = ScraperMetrics()
+
+# Autocomplete suggestions learned per city name, so the right row is picked
+city_index: CityIndex = city_index_from_env()
+
+# Images, fonts, analytics and ads the scraping contexts never fetch
+resource_policy: ResourcePolicy = policy_from_env()
+
+# Retries of a failed step on the same page, and fail-fast when the site is down
+stage_retry: RetryPolicy = retry_policy_from_env()
+site_breaker: CircuitBreaker = breaker_from_env()
+
+# Per-client scrape rate limits (None when RATE_LIMIT_PER_MINUTE=0) and the
+# global cap on scrapes in flight
+rate_limiter: Optional[RateLimiter] = rate_limiter_from_env()
+scrape_gate: ScrapeGate = scrape_gate_from_env()
+# X-API-Key values that get a rate limit of their own (comma-separated
+# API_KEYS); any other key is ignored and the client is limited by IP
+API_KEYS = frozenset(key.strip() for key in os.getenv("API_KEYS", "").split(",") if key.strip())
+
+# Background searches for the job API
+job_queue: Optional[JobQueue] = None
+
+# Pages parked on the search form between searches (None when WARM_PAGES=0)
+warm_pages: Optional[WarmPagePool] = None
+
+# Worker processes that run cached searches (None when FLEET_WORKERS=0)
+fleet: Optional[WorkerFleet] = None
+
+# Saved searches re-checked in the background for fare changes
+watches: Optional[WatchManager] = None
+
+
+def _record_request_stats(request_stats):
+    resource_policy.record(request_stats)
+    print(f"Network: {request_stats}")
+
+
+async def record_fares(origin: str, destination: str, journey_date: str, flights: List[FlightRecord]):
+    """Append a fresh scrape to the fare history, when one is kept (off the event loop)."""
+    if fare_store is None:
+        return
+    try:
+        await asyncio.to_thread(fare_store.record, origin, destination, journey_date, flights)
+    except Exception as e:
+        print(f"Could not record fares: {e}")
+
+
+async def warm_cache_from_fare_store():
+    """Load scrapes still within the cache TTL from the fare history into the cache."""
+    if fare_store is None:
+        return
+    loaded = 0
+    scrapes = await asyncio.to_thread(fare_store.recent_scrapes, flight_cache.ttl)
+    for origin, destination, journey_date, flights, scraped_at in scrapes:
+        key = FlightCache.make_key(origin, destination, journey_date)
+        if await flight_cache.lookup_async(key) is None:
+            await flight_cache.store_async(key, flights, stored_at=scraped_at)
+            loaded += 1
+    print(f"Warmed the result cache with {loaded} search(es) from {fare_store.path}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global browser_pool, job_queue, warm_pages, fleet, watches
+    await warm_cache_from_fare_store()
+    browser_pool = async_pool_from_env()
+    await browser_pool.start()
+    warm_pages = warm_pages_from_env(browser_pool, setup=resource_policy.install_async,
+                                     teardown=_record_request_stats)
+    fleet = fleet_from_env("sol2:fleet_worker_engine", on_report=scraper_metrics.set_remote)
+    if fleet is not None:
+        await fleet.start()
+    job_queue = job_queue_from_env(run_search_job)
+    await job_queue.start()
+    watches = watch_manager_from_env(refresh_watch, encode=dumps)
+    await watches.start()
+    try:
+        yield
+    finally:
+        await watches.close()
+        watches = None
+        await job_queue.close()
+        job_queue = None
+        if fleet is not None:
+            await fleet.close()
+            fleet = None
+        if warm_pages is not None:
+            await warm_pages.close()
+            warm_pages = None
+        await browser_pool.close()
+        browser_pool = None
+
+
+class FlightJSONResponse(JSONResponse):
+    """JSONResponse that encodes FlightRecords (with orjson when available)."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+app = FastAPI(title="Flight Scraper API", version="2.0.0", lifespan=lifespan,
+              default_response_class=FlightJSONResponse)
+
+# Upper bounds (ms) for the condition-based waits in the search flow. Each wait
+# returns as soon as its condition holds; these only cap a slow or stuck site.
+AUTOCOMPLETE_TIMEOUT_MS = int(os.getenv("AUTOCOMPLETE_TIMEOUT_MS", "5000"))
+SELECTION_TIMEOUT_MS = int(os.getenv("SELECTION_TIMEOUT_MS", "2000"))
+CALENDAR_TIMEOUT_MS = int(os.getenv("CALENDAR_TIMEOUT_MS", "5000"))
+RESULTS_TIMEOUT_MS = int(os.getenv("RESULTS_TIMEOUT_MS", "30000"))
+RESULTS_SETTLE_TIMEOUT_MS = int(os.getenv("RESULTS_SETTLE_TIMEOUT_MS", "5000"))
+STREAM_POLL_MS = int(os.getenv("STREAM_POLL_MS", "250"))
+# A streamed search with more flights than this is sent but not cached
+STREAM_CACHE_MAX_FLIGHTS = int(os.getenv("STREAM_CACHE_MAX_FLIGHTS", "2000"))
+
+# Limits for /flight-search/batch
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", "4"))
+
+FORM_TIMEOUT_MS = int(os.getenv("FORM_TIMEOUT_MS", "10000"))
+
+# Total time one search may take, retries and waiting for a browser included
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "90"))
+# How long past the deadline a search is cut off when its own page timeouts
+# have not fired (they are capped to the deadline and should fire first)
+DEADLINE_GRACE_SECONDS = 1.0
+
+# Page landmarks the flow and its waits key off
+SEARCH_URL = os.getenv("FLIGHT_SITE_URL", "https://www.budgetticket.in")
+ORIGIN_SELECTOR = "#anguScroll_value"
+DESTINATION_SELECTOR = "input[placeholder='Select Destination City']"
+SEARCH_BUTTON_SELECTOR = "input[type='submit'][ng-click='Search(false)']"
+AUTOCOMPLETE_ROW_SELECTOR = ".angucomplete-row >> visible=true"
+AUTOCOMPLETE_HIGHLIGHT_SELECTOR = ".angucomplete-selected-row"
+CALENDAR_DAY_SELECTOR = "td[data-day] >> visible=true"
+# A flight card (airline name rendered), not just any Bootstrap card on the page
+RESULT_CARD_SELECTOR = ".card-body:has(p.h6.responsive-bold.mb-0)"
+NO_RESULTS_PATTERN = re.compile(r"no (flights?|results?) (found|available)", re.IGNORECASE)
+
+def _input_value_script(selector, value):
+    return f"""
     (function(){{
         const el = document.querySelector("{selector}");
         if (!el) return false;
@@ -29,15 +196,106 @@ def set_input_value_and_dispatch(page, selector, value):
         return true;
     }})();
     """
+
+def set_input_value_and_dispatch(page, selector, value):
+    """
+    Set the value of an input via JS and dispatch input/change events so Angular hears it.
+    Returns True if selector exists and script ran.
+    """
     try:
-        return page.evaluate(script)
+        return page.evaluate(_input_value_script(selector, value))
     except Exception:
         return False
 
-def extract_flight_data(page) -> List[Dict]:
+# Pulls every card's fields in a single page.evaluate round trip. Mirrors the
+# per-locator extraction below field for field (first match, nth match for the
+# destination side, textContent trimmed) so both return identical dicts.
+# Cards before index `start` are skipped, which lets callers stream new cards.
+EXTRACT_FLIGHTS_SCRIPT = """
+([cardSelector, start]) => {
+    const text = (el) => el ? (el.textContent || '').trim() : '';
+    const first = (card, sel) => text(card.querySelector(sel));
+    const nth = (card, sel, n) => text(card.querySelectorAll(sel)[n]);
+    const flights = [];
+    const errors = [];
+
+    const cards = Array.from(document.querySelectorAll(cardSelector));
+
+    cards.slice(start).forEach((card, offset) => {
+        const index = start + offset;
+        try {
+            const stops = card.querySelector('.onechangecolor.font-weight-bold.responsive-dblock');
+            const layover = stops ? stops.getAttribute('data-balloon') : null;
+
+            let checkin = '';
+            let hand = '';
+            card.querySelectorAll('.action-bar .text').forEach((el) => {
+                const t = text(el);
+                if (t.includes('Kgs')) {
+                    if (t.includes('/')) checkin = t.split('/')[0].trim();
+                    else if (!checkin) checkin = t;
+                    else hand = t;
+                }
+            });
+
+            const seats = first(card, '.action-bar .text.ng-binding');
+
+            flights.push({
+                airline: first(card, 'p.h6.responsive-bold.mb-0'),
+                flight_number: first(card, 'p.mb-0.d-inline.d-lg-block'),
+                origin: first(card, '.text-extra-dark.font-weight-600.mb-0.text-nowrap'),
+                origin_city: first(card, '.font-weight-normal.small.mb-0.text-nowrap.text-light-dark'),
+                departure_time: first(card, '.text-mild-dark.d-block.h4'),
+                departure_date: first(card, '.hide-on-small-and-down.mb-0.d-block'),
+                origin_terminal: first(card, '.font-weight-normal.small.text-light-dark'),
+                destination: nth(card, '.text-extra-dark', 1),
+                destination_city: nth(card, '.font-weight-normal.small.mb-0.text-nowrap.text-light-dark', 1),
+                arrival_time: nth(card, '.text-mild-dark.d-block.h4', 1),
+                arrival_date: nth(card, '.hide-on-small-and-down.mb-0.d-block', 1),
+                duration: first(card, '.responsive-dblock.text-extra-dark.font-weight-bold'),
+                stops: stops ? text(stops) : 'Non-stop',
+                layover_info: layover ? layover.trim() : '',
+                price: first(card, '.text-gray.roboto_font.mb-0.text-primary.h4, .font-weight-600.text-gray.lbl-bold.roboto_font.mb-0.lbl-huge'),
+                promo: first(card, '.lbl-PromoFare.mb-0'),
+                checkin_baggage: checkin,
+                hand_baggage: hand,
+                available_seats: seats.includes('Seat') ? seats : '',
+                next_day_arrival: first(card, '.text-danger'),
+            });
+        } catch (err) {
+            errors.push([index, String(err)]);
+        }
+    });
+
+    return {flights, errors, total: cards.length};
+}
+"""
+
+MORE_CARDS_SCRIPT = "([cardSelector, seen]) => document.querySelectorAll(cardSelector).length > seen"
+
+def _bulk_result(result) -> List[Dict]:
+    for index, err in result['errors']:
+        print(f'Error extracting flight at index {index}: {err}')
+    return result['flights']
+
+def extract_flight_data(page, mode: str = "bulk") -> List[Dict]:
     """
     Extract flight information from the search results page.
     Returns a list of flight dictionaries.
+    
+    mode="bulk" reads all cards in one browser round trip; mode="locators"
+    queries each field with its own locator (slower, kept for comparison).
+    A card that fails to parse is skipped; if the round trip itself fails,
+    the bulk mode raises rather than reporting no flights.
+    """
+    if mode == "locators":
+        return extract_flight_data_locators(page)
+    
+    return _bulk_result(page.evaluate(EXTRACT_FLIGHTS_SCRIPT, ['.card-body', 0]))
+
+def extract_flight_data_locators(page) -> List[Dict]:
+    """
+    Per-locator extraction: one Playwright call per field per card.
     """
     flights = []
     
@@ -171,19 +429,40 @@ def select_city(page, selector, city_name, field_name):
             inp.fill("")
             inp.type(city_name, delay=80)
         
-        # Wait for dropdown to populate
-        page.wait_for_timeout(2200)
+        # Wait for the suggestion we already know is right, or for any row
+        rows = page.locator(AUTOCOMPLETE_ROW_SELECTOR)
+        known = city_index.lookup(city_name)
+        try:
+            if known:
+                rows.filter(has_text=known["label"]).first.wait_for(timeout=AUTOCOMPLETE_TIMEOUT_MS)
+            else:
+                rows.first.wait_for(timeout=AUTOCOMPLETE_TIMEOUT_MS)
+        except TimeoutError:
+            print(f"No {field_name} suggestions appeared, trying the keyboard anyway...")
         
-        # Select first suggestion using keyboard
-        page.keyboard.press("ArrowDown")
-        page.wait_for_timeout(250)
+        # Select the matching suggestion (not blindly the first) using keyboard
+        suggestions = rows.all_inner_texts()
+        if not suggestions:
+            raise InvalidSearch(f"No {field_name.lower()} city matches {city_name!r}")
+        index = city_index.choose(city_name, suggestions)
+        for _ in range(index + 1):
+            page.keyboard.press("ArrowDown")
+        try:
+            page.wait_for_selector(AUTOCOMPLETE_HIGHLIGHT_SELECTOR, timeout=SELECTION_TIMEOUT_MS)
+        except TimeoutError:
+            pass
         page.keyboard.press("Enter")
         
-        # Wait for selection to propagate
-        page.wait_for_timeout(1200)
+        # Wait for the dropdown to close once the selection propagates
+        try:
+            page.wait_for_selector(AUTOCOMPLETE_ROW_SELECTOR, state="detached", timeout=SELECTION_TIMEOUT_MS)
+        except TimeoutError:
+            pass
         
         return True
         
+    except InvalidSearch:
+        raise
     except TimeoutError:
         print(f"Timed out waiting for {field_name} input")
         return False
@@ -208,19 +487,20 @@ def select_date(page, date_str):
         page.wait_for_selector(date_input_selector, timeout=10000)
         page.locator(date_input_selector).click()
         
-        # Wait for calendar to appear
-        page.wait_for_timeout(1000)
-        
-        # Find and click the date
+        # Find and click the date as soon as the calendar renders it
         # The calendar uses data-date attribute or aria-label with the date
         date_selector = f"td[data-day='{day}']:not(.disabled)"
-        page.wait_for_selector(date_selector, timeout=5000)
+        page.wait_for_selector(date_selector, timeout=CALENDAR_TIMEOUT_MS)
         
         # Click the date
         date_cells = page.locator(date_selector).all()
         if date_cells:
             date_cells[0].click()
-            page.wait_for_timeout(500)
+            # Wait for the calendar to close
+            try:
+                page.wait_for_selector(CALENDAR_DAY_SELECTOR, state="detached", timeout=SELECTION_TIMEOUT_MS)
+            except TimeoutError:
+                pass
             print(f"Date {day} selected successfully")
             return True
         else:
@@ -231,7 +511,117 @@ def select_date(page, date_str):
         print(f"Error selecting date: {e}")
         return False
 
-def scrape_flights(origin: str, destination: str, journey_date: str) -> List[Dict]:
+def _is_crash(error: BaseException) -> bool:
+    """True when the page, context or browser is gone, so retrying on it is pointless."""
+    message = str(error).lower()
+    return "has been closed" in message or "target closed" in message or "crash" in message
+
+def _worth_retrying(error: BaseException) -> bool:
+    return not (_is_crash(error) or isinstance(error, InvalidSearch))
+
+def _budget_ms(timeout_ms: int) -> int:
+    """`timeout_ms` capped to what is left of the current search deadline."""
+    left = remaining()
+    if left is None:
+        return timeout_ms
+    if left <= 0:
+        raise DeadlineExceeded("Search deadline exceeded")
+    return max(1, min(timeout_ms, int(left * 1000)))
+
+def wait_for_results(page) -> bool:
+    """
+    Wait until the results page shows either flight cards or a "no flights"
+    message, then let the remaining result XHRs settle.
+    Returns False if the site explicitly reported no results.
+    """
+    cards = page.locator(RESULT_CARD_SELECTOR)
+    no_results = page.get_by_text(NO_RESULTS_PATTERN)
+    cards.first.or_(no_results.first).first.wait_for(timeout=RESULTS_TIMEOUT_MS)
+    
+    if cards.count() == 0 and no_results.count() > 0:
+        return False
+    
+    # More cards may stream in as the remaining fare requests complete
+    try:
+        page.wait_for_load_state("networkidle", timeout=RESULTS_SETTLE_TIMEOUT_MS)
+    except TimeoutError:
+        pass
+    return True
+
+def run_search(page, origin: str, destination: str, journey_date: str) -> List[FlightRecord]:
+    """
+    Run the search flow on an already-open page and return the extracted flights.
+    """
+    print(f"Searching flights: {origin} → {destination} on {journey_date}")
+    
+    # Navigate to website (a failed step is retried on the same page)
+    def goto():
+        with scraper_metrics.stage("goto"):
+            page.goto(SEARCH_URL, wait_until="domcontentloaded", timeout=_budget_ms(60000))
+    stage_retry.run("goto", goto, _worth_retrying)
+    print("Page loaded successfully")
+    
+    # Select Origin and Destination
+    for selector, city_name, field_name, stage in ((ORIGIN_SELECTOR, origin, "Origin", "select_origin"),
+                                                   (DESTINATION_SELECTOR, destination, "Destination", "select_destination")):
+        def select():
+            with scraper_metrics.stage(stage):
+                if not select_city(page, selector, city_name, field_name):
+                    raise Exception(f"Failed to select {field_name.lower()} city")
+        stage_retry.run(stage, select, _worth_retrying)
+    
+    # Select Date
+    with scraper_metrics.stage("select_date"):
+        date_success = select_date(page, journey_date)
+    
+    if not date_success:
+        print("Warning: Date selection may have failed, continuing anyway...")
+    
+    # Click Search Button
+    def submit():
+        with scraper_metrics.stage("submit"):
+            page.wait_for_selector(SEARCH_BUTTON_SELECTOR, timeout=10000)
+            page.locator(SEARCH_BUTTON_SELECTOR).click()
+    stage_retry.run("submit", submit, _worth_retrying)
+    
+    print("Search button clicked, waiting for results...")
+    
+    # Wait for results to load
+    with scraper_metrics.stage("results_wait"):
+        has_results = wait_for_results(page)
+    if not has_results:
+        print("Site reported no flights")
+        return []
+    
+    # Extract flight data
+    def extract():
+        with scraper_metrics.stage("extract"):
+            return records_from_raw(extract_flight_data(page), journey_date)
+    flights_data = stage_retry.run("extract", extract, _worth_retrying)
+    
+    print(f"Extracted {len(flights_data)} flight(s)")
+    
+    return flights_data
+
+def scrape_in_context(context, origin: str, destination: str, journey_date: str) -> List[FlightRecord]:
+    """
+    Run one search in a (pooled) browser context. The page is closed afterwards;
+    the context itself is owned by the caller.
+    """
+    request_stats = resource_policy.install(context)
+    page = context.new_page()
+    try:
+        with scraper_metrics.stage("search"), deadline(SEARCH_DEADLINE_SECONDS):
+            return run_search(page, origin, destination, journey_date)
+    except Exception as e:
+        print(f"Error during scraping: {e}")
+        raise
+    finally:
+        page.close()
+        _record_request_stats(request_stats)
+
+def scrape_flights(origin: str, destination: str, journey_date: str,
+                   pool: Optional[BrowserPool] = None) -> List[FlightRecord]:
     """
     Main scraping function that can be called from FastAPI endpoint.
     
@@ -239,133 +629,1263 @@ def scrape_flights(origin: str, destination: str, journey_date: str) -> List[Dic
         origin: Origin city name
         destination: Destination city name
         journey_date: Journey date in YYYY-MM-DD format
+        pool: Optional BrowserPool to run on; without it a browser is launched
+              for this call only (handy for one-off scripts)
     
     Returns:
-        List of flight dictionaries
+        List of FlightRecords
+    
+    Raises CircuitOpen without touching a browser while the site is failing.
     """
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
+    with site_breaker.call():
+        if pool is not None:
+            return pool.run(scrape_in_context, origin, destination, journey_date)
 
+        with sync_playwright() as p:
+            with scraper_metrics.stage("browser_launch"):
+                browser = p.chromium.launch(headless=True)
+                context = browser.new_context()
+
+            try:
+                return scrape_in_context(context, origin, destination, journey_date)
+            finally:
+                browser.close()
+
+# ---------------------------------------------------------------------------
+# Async engine (playwright.async_api) used by the API. Mirrors the sync
+# functions above so one event loop can drive many searches concurrently.
+# ---------------------------------------------------------------------------
+
+async def set_input_value_and_dispatch_async(page, selector, value):
+    """Async version of set_input_value_and_dispatch."""
+    try:
+        return await page.evaluate(_input_value_script(selector, value))
+    except Exception:
+        return False
+
+async def _first_text(locator, default=''):
+    """Stripped text of the first match of `locator`, or `default` if absent."""
+    first = locator.first
+    if await first.count() == 0:
+        return default
+    return ((await first.text_content()) or '').strip()
+
+async def _nth_text(locator, index):
+    """Stripped text of the `index`-th match of `locator`, or '' if absent."""
+    elements = await locator.all()
+    if len(elements) <= index:
+        return ''
+    return ((await elements[index].text_content()) or '').strip()
+
+async def extract_flight_data_async(page, mode: str = "bulk") -> List[Dict]:
+    """
+    Async version of extract_flight_data; returns the same flight dictionaries
+    and raises the same way.
+    """
+    if mode == "locators":
+        return await extract_flight_data_locators_async(page)
+    
+    return _bulk_result(await page.evaluate(EXTRACT_FLIGHTS_SCRIPT, ['.card-body', 0]))
+
+async def extract_flight_data_locators_async(page) -> List[Dict]:
+    """
+    Async version of extract_flight_data_locators.
+    """
+    flights = []
+    
+    try:
+        flight_cards = await page.locator('.card-body').all()
+        
+        for index, card in enumerate(flight_cards):
+            try:
+                flight = {}
+                
+                # Airline name and flight number
+                flight['airline'] = await _first_text(card.locator('p.h6.responsive-bold.mb-0'))
+                flight['flight_number'] = await _first_text(card.locator('p.mb-0.d-inline.d-lg-block'))
+                
+                # Origin details
+                flight['origin'] = await _first_text(card.locator('.text-extra-dark.font-weight-600.mb-0.text-nowrap'))
+                flight['origin_city'] = await _first_text(card.locator('.font-weight-normal.small.mb-0.text-nowrap.text-light-dark'))
+                flight['departure_time'] = await _first_text(card.locator('.text-mild-dark.d-block.h4'))
+                flight['departure_date'] = await _first_text(card.locator('.hide-on-small-and-down.mb-0.d-block'))
+                flight['origin_terminal'] = await _first_text(card.locator('.font-weight-normal.small.text-light-dark'))
+                
+                # Destination details (using nth elements)
+                flight['destination'] = await _nth_text(card.locator('.text-extra-dark'), 1)
+                flight['destination_city'] = await _nth_text(card.locator('.font-weight-normal.small.mb-0.text-nowrap.text-light-dark'), 1)
+                flight['arrival_time'] = await _nth_text(card.locator('.text-mild-dark.d-block.h4'), 1)
+                flight['arrival_date'] = await _nth_text(card.locator('.hide-on-small-and-down.mb-0.d-block'), 1)
+                
+                # Duration and stops
+                flight['duration'] = await _first_text(card.locator('.responsive-dblock.text-extra-dark.font-weight-bold'))
+                
+                stops_info = card.locator('.onechangecolor.font-weight-bold.responsive-dblock').first
+                flight['stops'] = await _first_text(stops_info, 'Non-stop')
+                
+                # Layover information
+                if await stops_info.count() > 0:
+                    layover = await stops_info.get_attribute('data-balloon')
+                    flight['layover_info'] = layover.strip() if layover else ''
+                else:
+                    flight['layover_info'] = ''
+                
+                # Price
+                flight['price'] = await _first_text(card.locator('.text-gray.roboto_font.mb-0.text-primary.h4, .font-weight-600.text-gray.lbl-bold.roboto_font.mb-0.lbl-huge'))
+                
+                # Promotional offers
+                flight['promo'] = await _first_text(card.locator('.lbl-PromoFare.mb-0'))
+                
+                # Baggage information
+                checkin_baggage = ''
+                hand_baggage = ''
+                
+                for el in await card.locator('.action-bar .text').all():
+                    text = ((await el.text_content()) or '').strip()
+                    if 'Kgs' in text:
+                        if '/' in text:
+                            checkin_baggage = text.split('/')[0].strip()
+                        elif not checkin_baggage:
+                            checkin_baggage = text
+                        else:
+                            hand_baggage = text
+                
+                flight['checkin_baggage'] = checkin_baggage
+                flight['hand_baggage'] = hand_baggage
+                
+                # Available seats
+                seats_text = await _first_text(card.locator('.action-bar .text.ng-binding'))
+                flight['available_seats'] = seats_text if 'Seat' in seats_text else ''
+                
+                # Next day arrival indicator
+                flight['next_day_arrival'] = await _first_text(card.locator('.text-danger'))
+                
+                flights.append(flight)
+                
+            except Exception as err:
+                print(f'Error extracting flight at index {index}: {err}')
+        
+        return flights
+        
+    except Exception as e:
+        print(f"Error extracting flight data: {e}")
+        return []
+
+async def select_city_async(page, selector, city_name, field_name):
+    """
+    Async version of select_city.
+    """
+    print(f"Selecting {field_name}: {city_name}")
+    
+    try:
+        await page.wait_for_selector(selector, timeout=15000)
+        
+        ok = await set_input_value_and_dispatch_async(page, selector, city_name)
+        if not ok:
+            print("JS injection fallback failed, typing manually...")
+            inp = page.locator(selector)
+            await inp.click()
+            await inp.fill("")
+            await inp.type(city_name, delay=80)
+        
+        # Wait for the suggestion we already know is right, or for any row
+        rows = page.locator(AUTOCOMPLETE_ROW_SELECTOR)
+        known = city_index.lookup(city_name)
         try:
-            print(f"Searching flights: {origin} → {destination} on {journey_date}")
-            
-            # Navigate to website
-            page.goto("https://www.budgetticket.in", wait_until="domcontentloaded", timeout=60000)
-            print("Page loaded successfully")
-            
-            # Select Origin
-            origin_selector = "#anguScroll_value"
-            origin_success = select_city(page, origin_selector, origin, "Origin")
-            
-            if not origin_success:
-                raise Exception("Failed to select origin city")
-            
-            time.sleep(0.5)
-            
-            # Select Destination
-            destination_selector = "input[placeholder='Select Destination City']"
-            destination_success = select_city(page, destination_selector, destination, "Destination")
-            
-            if not destination_success:
-                raise Exception("Failed to select destination city")
-            
-            time.sleep(0.5)
-            
-            # Select Date
-            date_success = select_date(page, journey_date)
-            
-            if not date_success:
-                print("Warning: Date selection may have failed, continuing anyway...")
-            
-            time.sleep(1)
-            
-            # Click Search Button
-            search_button_selector = "input[type='submit'][ng-click='Search(false)']"
-            page.wait_for_selector(search_button_selector, timeout=10000)
-            page.locator(search_button_selector).click()
-            
-            print("Search button clicked, waiting for results...")
-            
-            # Wait for results to load
-            time.sleep(8)
-            
-            # Extract flight data
-            flights_data = extract_flight_data(page)
-            
-            print(f"Extracted {len(flights_data)} flight(s)")
+            if known:
+                await rows.filter(has_text=known["label"]).first.wait_for(timeout=AUTOCOMPLETE_TIMEOUT_MS)
+            else:
+                await rows.first.wait_for(timeout=AUTOCOMPLETE_TIMEOUT_MS)
+        except AsyncTimeoutError:
+            print(f"No {field_name} suggestions appeared, trying the keyboard anyway...")
+        
+        # Select the matching suggestion (not blindly the first) using keyboard
+        suggestions = await rows.all_inner_texts()
+        if not suggestions:
+            raise InvalidSearch(f"No {field_name.lower()} city matches {city_name!r}")
+        # Saved in a thread: the save locks and rewrites a file shared with the fleet workers
+        index = city_index.choose(city_name, suggestions, save=False)
+        if city_index.unsaved:
+            await asyncio.to_thread(city_index.save)
+        for _ in range(index + 1):
+            await page.keyboard.press("ArrowDown")
+        try:
+            await page.wait_for_selector(AUTOCOMPLETE_HIGHLIGHT_SELECTOR, timeout=SELECTION_TIMEOUT_MS)
+        except AsyncTimeoutError:
+            pass
+        await page.keyboard.press("Enter")
+        
+        # Wait for the dropdown to close once the selection propagates
+        try:
+            await page.wait_for_selector(AUTOCOMPLETE_ROW_SELECTOR, state="detached", timeout=SELECTION_TIMEOUT_MS)
+        except AsyncTimeoutError:
+            pass
+        
+        return True
+        
+    except InvalidSearch:
+        raise
+    except AsyncTimeoutError:
+        print(f"Timed out waiting for {field_name} input")
+        return False
+    except Exception as e:
+        print(f"Unexpected error selecting {field_name}: {e}")
+        return False
+
+async def select_date_async(page, date_str):
+    """
+    Async version of select_date.
+    date_str should be in format: YYYY-MM-DD
+    """
+    print(f"Selecting date: {date_str}")
+    
+    try:
+        day = datetime.strptime(date_str, "%Y-%m-%d").day
+        
+        date_input_selector = "input[placeholder='Select Journey Date']"
+        await page.wait_for_selector(date_input_selector, timeout=10000)
+        await page.locator(date_input_selector).click()
+        
+        date_selector = f"td[data-day='{day}']:not(.disabled)"
+        await page.wait_for_selector(date_selector, timeout=CALENDAR_TIMEOUT_MS)
+        
+        date_cells = await page.locator(date_selector).all()
+        if date_cells:
+            await date_cells[0].click()
+            try:
+                await page.wait_for_selector(CALENDAR_DAY_SELECTOR, state="detached", timeout=SELECTION_TIMEOUT_MS)
+            except AsyncTimeoutError:
+                pass
+            print(f"Date {day} selected successfully")
+            return True
+        else:
+            print(f"Could not find date {day}")
+            return False
             
-            return flights_data
+    except Exception as e:
+        print(f"Error selecting date: {e}")
+        return False
+
+async def wait_for_results_async(page) -> bool:
+    """
+    Async version of wait_for_results.
+    """
+    cards = page.locator(RESULT_CARD_SELECTOR)
+    no_results = page.get_by_text(NO_RESULTS_PATTERN)
+    await cards.first.or_(no_results.first).first.wait_for(timeout=_budget_ms(RESULTS_TIMEOUT_MS))
+    
+    if await cards.count() == 0 and await no_results.count() > 0:
+        return False
+    
+    # Near the deadline, settle for the cards already rendered
+    left = remaining()
+    settle_ms = RESULTS_SETTLE_TIMEOUT_MS if left is None else min(RESULTS_SETTLE_TIMEOUT_MS, int(left * 1000) // 2)
+    if settle_ms > 0:
+        try:
+            await page.wait_for_load_state("networkidle", timeout=settle_ms)
+        except AsyncTimeoutError:
+            pass
+    return True
+
+async def iter_flight_data_async(page):
+    """
+    Yield flight dictionaries as their cards render, until the results page
+    settles (network idle or RESULTS_SETTLE_TIMEOUT_MS). Each round reads only
+    the cards not seen yet, in one round trip. Raises DeadlineExceeded if the
+    search deadline passes before the page settles.
+    """
+    settled = asyncio.ensure_future(
+        page.wait_for_load_state("networkidle", timeout=RESULTS_SETTLE_TIMEOUT_MS)
+    )
+    seen = 0
+    try:
+        while True:
+            last_round = settled.done()
+            result = await page.evaluate(EXTRACT_FLIGHTS_SCRIPT, ['.card-body', seen])
+            seen = result['total']
+            for flight in _bulk_result(result):
+                yield flight
+            if last_round:
+                break
+            try:
+                await page.wait_for_function(MORE_CARDS_SCRIPT, arg=['.card-body', seen],
+                                             timeout=_budget_ms(STREAM_POLL_MS))
+            except AsyncTimeoutError:
+                pass
+    finally:
+        settled.cancel()
+        try:
+            await settled
+        except BaseException:
+            pass
+
+async def return_to_search_form_async(page, form_state: Dict) -> bool:
+    """
+    Bring a page used for an earlier search back to a clean search form,
+    going back in history if it is showing results. Clears `form_state` when
+    the inputs no longer hold the remembered cities.
+    Returns False when the page has to be reloaded instead.
+    """
+    try:
+        if await page.locator(RESULT_CARD_SELECTOR).count() > 0:
+            await page.go_back(wait_until="domcontentloaded", timeout=FORM_TIMEOUT_MS)
+        await page.wait_for_selector(ORIGIN_SELECTOR, timeout=FORM_TIMEOUT_MS)
+        # Old results still on the page would satisfy the next results wait
+        if await page.locator(RESULT_CARD_SELECTOR).count() > 0:
+            return False
+        if not await page.input_value(ORIGIN_SELECTOR) or not await page.input_value(DESTINATION_SELECTOR):
+            form_state.clear()
+        return True
+    except Exception:
+        return False
+
+async def _select_city_retrying_async(page, selector, city_name, field_name, stage):
+    """select_city_async as a metered stage, retried on the same page; raises when it keeps failing."""
+    async def select():
+        with scraper_metrics.stage(stage):
+            if not await select_city_async(page, selector, city_name, field_name):
+                raise Exception(f"Failed to select {field_name.lower()} city")
+    await stage_retry.run_async(stage, select, _worth_retrying)
+
+async def submit_search_async(page, origin: str, destination: str, journey_date: str,
+                              form_state: Optional[Dict] = None) -> bool:
+    """
+    Fill in and submit the search form, then wait for results.
+    Returns False if the site reported no flights.
+    
+    `form_state` (see WarmPage) remembers what an earlier search on this page
+    entered; when given, the page is reused without reloading the site and
+    only the fields that differ are re-entered. It is updated in place.
+    """
+    print(f"Searching flights: {origin} → {destination} on {journey_date}")
+    
+    fields = form_state if form_state is not None else {}
+    with scraper_metrics.stage("reuse_form"):
+        reused = bool(fields) and await return_to_search_form_async(page, fields)
+    if reused:
+        print("Reusing loaded search form")
+    else:
+        fields.clear()
+        async def goto():
+            with scraper_metrics.stage("goto"):
+                await page.goto(SEARCH_URL, wait_until="domcontentloaded", timeout=_budget_ms(60000))
+        await stage_retry.run_async("goto", goto, _worth_retrying)
+        print("Page loaded successfully")
+    
+    if fields.get("origin") != origin:
+        fields.pop("origin", None)
+        await _select_city_retrying_async(page, ORIGIN_SELECTOR, origin, "Origin", "select_origin")
+        fields["origin"] = origin
+    
+    if fields.get("destination") != destination:
+        fields.pop("destination", None)
+        await _select_city_retrying_async(page, DESTINATION_SELECTOR, destination, "Destination", "select_destination")
+        fields["destination"] = destination
+    
+    if fields.get("journey_date") != journey_date:
+        fields.pop("journey_date", None)
+        with scraper_metrics.stage("select_date"):
+            date_success = await select_date_async(page, journey_date)
+        if date_success:
+            fields["journey_date"] = journey_date
+        else:
+            print("Warning: Date selection may have failed, continuing anyway...")
+    
+    async def submit():
+        with scraper_metrics.stage("submit"):
+            await page.wait_for_selector(SEARCH_BUTTON_SELECTOR, timeout=_budget_ms(10000))
+            await page.locator(SEARCH_BUTTON_SELECTOR).click()
+    await stage_retry.run_async("submit", submit, _worth_retrying)
+    
+    print("Search button clicked, waiting for results...")
+    
+    # Wait for results to load
+    with scraper_metrics.stage("results_wait"):
+        has_results = await wait_for_results_async(page)
+    if not has_results:
+        print("Site reported no flights")
+        return False
+    return True
+
+async def run_search_async(page, origin: str, destination: str, journey_date: str,
+                           form_state: Optional[Dict] = None) -> List[FlightRecord]:
+    """
+    Async version of run_search. See submit_search_async for `form_state`.
+    """
+    if not await submit_search_async(page, origin, destination, journey_date, form_state):
+        return []
+    
+    async def extract():
+        with scraper_metrics.stage("extract"):
+            return records_from_raw(await extract_flight_data_async(page), journey_date)
+    flights_data = await stage_retry.run_async("extract", extract, _worth_retrying)
+    
+    print(f"Extracted {len(flights_data)} flight(s)")
+    
+    return flights_data
 
+async def scrape_in_context_async(context, origin: str, destination: str, journey_date: str) -> List[FlightRecord]:
+    """
+    Async version of scrape_in_context.
+    """
+    request_stats = await resource_policy.install_async(context)
+    page = await context.new_page()
+    try:
+        return await run_search_async(page, origin, destination, journey_date)
+    except Exception as e:
+        print(f"Error during scraping: {e}")
+        raise
+    finally:
+        await page.close()
+        _record_request_stats(request_stats)
+
+async def scrape_flights_async(origin: str, destination: str, journey_date: str,
+                               pool: Optional[AsyncBrowserPool] = None,
+                               warm: Optional[WarmPagePool] = None) -> List[FlightRecord]:
+    """
+    Async version of scrape_flights. Runs on a parked page from `warm` or,
+    when all of those are busy, a fresh context from `pool`; with neither,
+    launches a browser for this call only.
+    
+    Failed steps are retried on the same page; if the page or browser crashes
+    the search restarts on a fresh context. Everything, waiting for a browser
+    included, must fit in SEARCH_DEADLINE_SECONDS (else DeadlineExceeded).
+    Raises CircuitOpen without touching a browser while the site is failing,
+    and InvalidSearch for a city the site does not know; neither that nor
+    DeadlineExceeded counts as a site failure for the breaker.
+    """
+    with scraper_metrics.stage("search"), site_breaker.call(), deadline(SEARCH_DEADLINE_SECONDS):
+        try:
+            # Waits on the page are budgeted to the deadline (_budget_ms) and
+            # fail as site timeouts; this catches the rest, e.g. waiting for a browser
+            async with asyncio.timeout(remaining() + DEADLINE_GRACE_SECONDS):
+                for attempt in range(stage_retry.attempts):
+                    try:
+                        return await _scrape_once_async(origin, destination, journey_date, pool, warm)
+                    except Exception as e:
+                        if attempt + 1 >= stage_retry.attempts or not _is_crash(e):
+                            raise
+                        print(f"Browser context crashed ({e}), retrying the search on a fresh one")
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Search did not finish within {SEARCH_DEADLINE_SECONDS:g}s") from None
+
+async def _scrape_once_async(origin: str, destination: str, journey_date: str,
+                             pool: Optional[AsyncBrowserPool],
+                             warm: Optional[WarmPagePool]) -> List[FlightRecord]:
+    acquire_started = time.perf_counter()
+
+    if warm is not None:
+        # Only wait for a warm page when there is no pool to fall back on:
+        # warm pages are fewer than the pool's contexts
+        try:
+            async with warm.page(origin, destination, wait=pool is None) as warm_page:
+                if warm_page is not None:
+                    scraper_metrics.observe("acquire", time.perf_counter() - acquire_started)
+                    return await run_search_async(warm_page.page, origin, destination, journey_date,
+                                                  form_state=warm_page.form_state)
         except Exception as e:
             print(f"Error during scraping: {e}")
             raise
+
+    if pool is not None:
+        async with pool.context() as context:
+            scraper_metrics.observe("acquire", time.perf_counter() - acquire_started)
+            return await scrape_in_context_async(context, origin, destination, journey_date)
+
+    async with async_playwright() as p:
+        with scraper_metrics.stage("browser_launch"):
+            browser = await p.chromium.launch(headless=True)
+            context = await browser.new_context()
+
+        try:
+            return await scrape_in_context_async(context, origin, destination, journey_date)
         finally:
-            browser.close()
+            await browser.close()
+
+@asynccontextmanager
+async def fleet_worker_engine():
+    """
+    Search engine of one fleet worker process (see worker_fleet.py): its own
+    browser pool and warm pages, configured from the same environment.
+    A search returns its flights and stage timings; the worker's metrics go
+    to the API process with each heartbeat (search.report).
+    """
+    pool = async_pool_from_env()
+    await pool.start()
+    warm = warm_pages_from_env(pool, setup=resource_policy.install_async, teardown=_record_request_stats)
+
+    async def search(origin: str, destination: str, journey_date: str) -> Tuple[List[FlightRecord], Dict]:
+        with scraper_metrics.collect() as timings:
+            flights = await scrape_flights_async(origin, destination, journey_date, pool=pool, warm=warm)
+        return flights, timings
+
+    search.report = scraper_metrics.snapshot
+
+    try:
+        yield search
+    finally:
+        if warm is not None:
+            await warm.close()
+        await pool.close()
+
+async def stream_flights_async(origin: str, destination: str, journey_date: str,
+                               pool: AsyncBrowserPool):
+    """
+    Async generator version of scrape_flights_async: yields each flight as soon
+    as its card is parsed instead of returning the full list at the end.
+
+    Up to the first flight it is bounded and retried like scrape_flights_async:
+    waiting for a context and submitting the search must fit in the deadline,
+    and a crash restarts the search on a fresh context. After that a crash
+    ends the stream with the error (a restart would send flights again), and
+    polling for more cards stops at the deadline (DeadlineExceeded).
+    """
+    with site_breaker.call(), deadline(SEARCH_DEADLINE_SECONDS):
+        for attempt in range(stage_retry.attempts):
+            sent = 0
+            try:
+                async for flight in _stream_flights_once_async(origin, destination, journey_date, pool):
+                    sent += 1
+                    yield flight
+                return
+            except Exception as e:
+                if sent or attempt + 1 >= stage_retry.attempts or not _is_crash(e):
+                    raise
+                print(f"Browser context crashed ({e}), retrying the search on a fresh one")
+
+async def _stream_flights_once_async(origin: str, destination: str, journey_date: str,
+                                     pool: AsyncBrowserPool):
+    acquire_started = time.perf_counter()
+    async with AsyncExitStack() as stack:
+        try:
+            # The timeout ends before the first yield: spanning one, it would
+            # cancel whatever the consumer is awaiting instead
+            try:
+                async with asyncio.timeout(remaining() + DEADLINE_GRACE_SECONDS):
+                    context = await stack.enter_async_context(pool.context())
+                    scraper_metrics.observe("acquire", time.perf_counter() - acquire_started)
+                    stack.callback(_record_request_stats, await resource_policy.install_async(context))
+                    page = await context.new_page()
+                    stack.push_async_callback(page.close)
+                    stack.enter_context(scraper_metrics.stage("search"))
+                    if not await submit_search_async(page, origin, destination, journey_date):
+                        return
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"Search did not start within {SEARCH_DEADLINE_SECONDS:g}s") from None
+            count = 0
+            async for flight in iter_flight_data_async(page):
+                count += 1
+                yield FlightRecord.from_raw(flight, journey_date)
+            print(f"Streamed {count} flight(s)")
+        except Exception as e:
+            print(f"Error during scraping: {e}")
+            raise
 
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
     return {
         "message": "Flight Scraper API",
-        "version": "1.0.0",
+        "version": "2.0.0",
         "endpoints": {
-            "/flight-search": "Search for flights with query parameters: origin, destination, journey_date"
+            "/flight-search": "Search for flights with query parameters: origin, destination, journey_date; optional max_price, max_stops, airline, departure_after, departure_before, sort, limit, offset",
+            "/flight-search/stream": "Same search, streamed one flight at a time (format=ndjson or sse)",
+            "POST /flight-search/batch": "Many (origin, destination, journey_date) searches in one request",
+            "/cache-stats": "Result cache hit/miss/coalesce counters",
+            "/metrics": "Prometheus metrics: stage histograms, in-flight gauges, pool utilization, errors",
+            "/warm-page-stats": "Reuse counters for pages parked on the search form",
+            "/admission-stats": "Per-client rate limits and the global in-flight scrape cap",
+            "/fare-store-stats": "Scrapes and fares kept in the fare history",
+            "/fares/history": "Recorded price history of a route (FARE_STORE_PATH); optional journey_date, airline, flight_number, since",
+            "/fares/cheapest-by-day": "Cheapest recorded fare per journey date between date_from and date_to",
+            "/city-index-stats": "Learned city autocomplete suggestions and lookup hit/miss counters",
+            "/fleet-stats": "Worker processes (FLEET_WORKERS), their load and heartbeats",
+            "POST /fleet/restart": "Rolling restart of the worker fleet with graceful draining",
+            "/resource-stats": "Requests, blocked requests and bytes across searches",
+            "POST /jobs": "Queue a search (same query parameters as /flight-search) and get a job id",
+            "/jobs/{job_id}": "Job status and result; pass wait=<seconds> to long-poll",
+            "POST /watches": "Watch a search for fare changes (optional webhook)",
+            "/watches/{watch_id}": "Changes since a version (since=<n>, wait=<seconds> to long-poll)"
         }
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics"""
+    gauges = {}
+    counters = {}
+    if browser_pool is not None:
+        pool = browser_pool.stats()
+        gauges.update({
+            "pool_capacity": pool["capacity"],
+            "pool_busy": pool["busy"],
+            "pool_queued": pool["queued"],
+            "pool_utilization": round(pool["busy"] / pool["capacity"], 3) if pool["capacity"] else 0,
+        })
+        counters.update({
+            "browser_launches": pool["launches"],
+            "browser_recycles": pool["recycles"],
+            "browser_crashes": pool["crashes"],
+        })
+    cache = await flight_cache.stats_async()
+    gauges["cache_entries"] = cache["entries"]
+    counters.update({
+        "cache_hits": cache["hits"],
+        "cache_misses": cache["misses"],
+        "cache_coalesced": cache["coalesced"],
+    })
+    if watches is not None:
+        watch_stats = watches.stats()
+        gauges["watches"] = watch_stats["watches"]
+        counters.update({"watch_refreshes": watch_stats["refreshes"], "watch_changes": watch_stats["changes"],
+                         "webhook_failures": watch_stats["webhook_failures"]})
+    gate = scrape_gate.stats()
+    gauges.update({"scrapes_in_flight": gate["in_flight"], "scrapes_waiting": gate["waiting"]})
+    counters.update({"scrapes_rejected": gate["rejected"] + gate["timed_out"],
+                     "rate_limited": rate_limiter.stats()["limited"] if rate_limiter is not None else 0})
+    retries = stage_retry.stats()
+    breaker = site_breaker.stats()
+    gauges["circuit_open"] = int(breaker["state"] != "closed")
+    counters.update({
+        "stage_retries": retries["retries"],
+        "stage_retries_exhausted": retries["exhausted"],
+        "circuit_opened": breaker["opened"],
+        "circuit_rejected": breaker["rejected"],
+    })
+    if fleet is not None:
+        workers = fleet.stats()
+        gauges["fleet_workers"] = sum(1 for worker in workers["workers"] if worker["alive"])
+        gauges["fleet_queued"] = workers["queued"]
+        counters.update({"fleet_replaced": workers["replaced"], "fleet_requeued": workers["requeued"]})
+    if job_queue is not None:
+        jobs = job_queue.stats()
+        gauges["jobs_queued"] = jobs["queued"]
+        counters["jobs_rejected"] = jobs["rejected"]
+    network = resource_policy.stats()
+    counters.update({
+        "upstream_requests": network["requests"],
+        "upstream_requests_blocked": network["blocked"],
+        "upstream_bytes": network["bytes"],
+    })
+    return PlainTextResponse(scraper_metrics.render(gauges, counters),
+                             media_type="text/plain; version=0.0.4")
+
+@app.get("/resource-stats")
+async def resource_stats():
+    """Resource blocking policy and its request/byte counters"""
+    return resource_policy.stats()
+
+@app.get("/warm-page-stats")
+async def warm_page_stats():
+    """Warm page reuse counters"""
+    return warm_pages.stats() if warm_pages is not None else {"size": 0}
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """Result cache counters"""
+    return await flight_cache.stats_async()
+
+@app.get("/fleet-stats")
+async def fleet_stats():
+    """Worker fleet processes, their load and heartbeats"""
+    return fleet.stats() if fleet is not None else {"workers": []}
+
+@app.post("/fleet/restart", status_code=202)
+async def restart_fleet():
+    """Replace the fleet's workers one by one, letting each finish its searches"""
+    if fleet is None:
+        raise HTTPException(status_code=404, detail="Worker fleet is not enabled (FLEET_WORKERS=0)")
+    asyncio.create_task(fleet.rolling_restart())
+    return {"status": "restarting", "workers": len(fleet.stats()["workers"])}
+
+@app.get("/admission-stats")
+async def admission_stats():
+    """Rate limiter and scrape concurrency cap counters"""
+    return {
+        "rate_limit": rate_limiter.stats() if rate_limiter is not None else None,
+        "scrapes": scrape_gate.stats(),
+    }
+
+@app.get("/fare-store-stats")
+async def fare_store_stats():
+    """Size of the fare history"""
+    return await asyncio.to_thread(fare_store.stats) if fare_store is not None else {"scrapes": 0}
+
+@app.get("/city-index-stats")
+async def city_index_stats():
+    """Learned autocomplete suggestions and lookup hit/miss counters"""
+    return city_index.stats()
+
+async def cached_search(origin: str, destination: str, journey_date: str, patient: bool = False,
+                        max_age: Optional[float] = None):
+    """
+    Return (flights, cache_info) for a search, scraping only on a cache miss
+    (or when the cached result is older than `max_age` seconds).
+    Concurrent identical searches share a single scrape, which runs on the
+    worker fleet when there is one.
+    
+    The scrape holds a scrape_gate slot; unless `patient`, it raises
+    Overloaded instead of waiting long for one.
+    """
+    key = FlightCache.make_key(origin, destination, journey_date)
+
+    async def fetch():
+        async with scrape_gate.slot(patient=patient):
+            if fleet is not None:
+                flights, timings = await fleet.search(origin, destination, journey_date)
+                scraper_metrics.add_timings(timings)
+            else:
+                flights = await scrape_flights_async(origin, destination, journey_date,
+                                                     pool=browser_pool, warm=warm_pages)
+        await record_fares(origin, destination, journey_date, flights)
+        return flights
+
+    flights, age, status = await flight_cache.get_or_fetch(key, fetch, max_age=max_age)
+    return flights, {"status": status, "age": int(age), "ttl": int(flight_cache.ttl)}
+
+async def refresh_watch(origin: str, destination: str, journey_date: str, max_age: float) -> List[FlightRecord]:
+    """Watch refresh: a patient cached search that accepts results up to `max_age` seconds old."""
+    flights, _ = await cached_search(origin, destination, journey_date, patient=True, max_age=max_age)
+    return flights
+
+def client_id(request: Request) -> str:
+    """Rate limit key: the X-API-Key header when it is one of API_KEYS, else the client IP."""
+    api_key = request.headers.get("x-api-key")
+    if api_key and api_key in API_KEYS:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+def admit(request: Request, cost: float = 1.0, check_gate: bool = True):
+    """
+    Charge the client's rate limit for `cost` scrapes and (unless not
+    `check_gate`) check the global waiting room, answering 429 with
+    Retry-After when either is exhausted.
+    """
+    try:
+        if rate_limiter is not None:
+            rate_limiter.check(client_id(request), cost)
+        if check_gate:
+            scrape_gate.check()
+    except Rejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": e.retry_after_header})
+
+def admit_up_to(request: Request, count: int) -> int:
+    """
+    admit() for a batch of `count` scrapes: admits as many as the client's
+    rate limit has tokens for and returns how many, answering 429 with
+    Retry-After when it has none (or the waiting room is full).
+    """
+    try:
+        admitted = rate_limiter.check_up_to(client_id(request), count) if rate_limiter is not None else count
+        scrape_gate.check()
+    except Rejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": e.retry_after_header})
+    return admitted
+
+def batch_item_key(origin: str, destination: str, journey_date: str) -> str:
+    return f"{origin}|{destination}|{journey_date}"
+
+async def search_batch(items: List[Dict], concurrency: int) -> Dict[str, Dict]:
+    """
+    Run many searches with at most `concurrency` browser contexts at a time.
+    
+    Items are sorted by route and split into `concurrency` lanes; each lane
+    runs its searches one after another on a single page, so consecutive dates
+    of the same route reuse the already-loaded site. Cached searches skip the
+    browser, and one that is being fetched already (by /flight-search, a
+    stream or another batch) is waited for ("coalesced": true).
+    Returns {"origin|destination|date": {"status": "ok"|"error", ...}}.
+    """
+    results: Dict[str, Dict] = {}
+    pending = []
+    
+    for item in sorted(items, key=lambda i: (i["origin"].lower(), i["destination"].lower(), i["journey_date"])):
+        item_key = batch_item_key(item["origin"], item["destination"], item["journey_date"])
+        if item_key in results:
+            continue
+        try:
+            datetime.strptime(item["journey_date"], "%Y-%m-%d")
+        except ValueError:
+            results[item_key] = {"status": "error", "error": "Invalid date format. Please use YYYY-MM-DD"}
+            continue
+        cached = await flight_cache.get_async(FlightCache.make_key(item["origin"], item["destination"], item["journey_date"]))
+        if cached is not None:
+            results[item_key] = {"status": "ok", "cached": True, "total_flights": len(cached[0]), "flights": cached[0]}
+            continue
+        results[item_key] = {"status": "pending"}
+        pending.append(item)
+    
+    if not pending:
+        return results
+    
+    lane_count = max(1, min(concurrency, len(pending)))
+    lane_size = -(-len(pending) // lane_count)
+    lanes = [pending[i:i + lane_size] for i in range(0, len(pending), lane_size)]
+    
+    async def run_lane(lane: List[Dict]):
+        # Patient: the batch was admitted already, so wait for a slot rather than fail the lane
+        async with scrape_gate.slot(patient=True), browser_pool.context() as context:
+            request_stats = await resource_policy.install_async(context)
+            page = await context.new_page()
+            # Consecutive items of the same route only change the date
+            form_state: Dict = {}
+            try:
+                for item in lane:
+                    item_key = batch_item_key(item["origin"], item["destination"], item["journey_date"])
+                    key = FlightCache.make_key(item["origin"], item["destination"], item["journey_date"])
+                    # A search already being fetched elsewhere is waited for, not scraped again
+                    shared = None
+                    while shared is None and not flight_cache.begin(key):
+                        try:
+                            shared = await flight_cache.join(key)
+                        except Exception:
+                            pass  # that fetch failed; try it here
+                    if shared is not None:
+                        results[item_key] = {"status": "ok", "cached": False, "coalesced": True,
+                                             "total_flights": len(shared), "flights": shared}
+                        continue
+                    try:
+                        with site_breaker.call(), deadline(SEARCH_DEADLINE_SECONDS):
+                            flights = await run_search_async(page, item["origin"], item["destination"],
+                                                             item["journey_date"], form_state=form_state)
+                    except Exception as e:
+                        flight_cache.fail(key, e)
+                        print(f"Error during scraping: {e}")
+                        form_state.clear()
+                        results[item_key] = {"status": "error", "error": str(e)}
+                        if _is_crash(e):
+                            # A fresh page for the rest of the lane; fails the lane if the context is gone too
+                            await page.close()
+                            page = await context.new_page()
+                        continue
+                    except BaseException:
+                        flight_cache.fail(key, NotShared("batch cancelled"))
+                        raise
+                    await flight_cache.finish(key, flights)
+                    await record_fares(item["origin"], item["destination"], item["journey_date"], flights)
+                    results[item_key] = {"status": "ok", "cached": False, "total_flights": len(flights), "flights": flights}
+            finally:
+                await page.close()
+                _record_request_stats(request_stats)
+    
+    lane_results = await asyncio.gather(*(run_lane(lane) for lane in lanes), return_exceptions=True)
+    
+    # A lane that could not get a browser at all fails its remaining items
+    for lane, outcome in zip(lanes, lane_results):
+        if isinstance(outcome, BaseException):
+            for item in lane:
+                item_key = batch_item_key(item["origin"], item["destination"], item["journey_date"])
+                if results[item_key]["status"] == "pending":
+                    results[item_key] = {"status": "error", "error": str(outcome)}
+    
+    return results
+
+def validate_journey_date(journey_date: str):
+    try:
+        datetime.strptime(journey_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid date format. Please use YYYY-MM-DD (e.g., 2025-10-18)"
+        )
+
+def cache_headers(cache_info: Dict) -> Dict[str, str]:
+    max_age = max(cache_info["ttl"] - cache_info["age"], 0)
+    return {
+        "Cache-Control": f"public, max-age={max_age}",
+        "Age": str(cache_info["age"]),
+        "X-Cache": cache_info["status"].upper(),
+    }
+
 @app.get("/flight-search")
 async def search_flights(
+    request: Request,
     origin: str = Query(..., description="Origin city name (e.g., Bangalore)"),
     destination: str = Query(..., description="Destination city name (e.g., Delhi)"),
-    journey_date: str = Query(..., description="Journey date in YYYY-MM-DD format (e.g., 2025-10-18)")
+    journey_date: str = Query(..., description="Journey date in YYYY-MM-DD format (e.g., 2025-10-18)"),
+    max_price: Optional[int] = Query(None, ge=0, description="Only flights at or below this price"),
+    max_stops: Optional[int] = Query(None, ge=0, description="Only flights with at most this many stops"),
+    airline: Optional[str] = Query(None, description="Airline name(s), comma-separated (e.g., IndiGo,Air India)"),
+    departure_after: Optional[str] = Query(None, pattern=r"^\d{2}:\d{2}$", description="Earliest departure, HH:MM"),
+    departure_before: Optional[str] = Query(None, pattern=r"^\d{2}:\d{2}$", description="Latest departure, HH:MM"),
+    sort: Optional[str] = Query(None, pattern="^-?(price|duration|departure)$", description="price, duration or departure; prefix - for descending"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size (default: all flights)"),
+    offset: int = Query(0, ge=0, description="Flights to skip; use next_offset from the previous page"),
+    timings: bool = Query(False, description="Include per-stage scrape timings (ms) in the response")
 ):
     """
     Search for flights between two cities on a specific date.
     Example: /flight-search?origin=Bangalore&destination=Delhi&journey_date=2025-10-18
+    
+    Filters, sorting and paging are applied to the (cached) parsed results, so
+    paging through or re-sorting the same search does not scrape again.
     """
     try:
         # Validate date format
-        try:
-            datetime.strptime(journey_date, "%Y-%m-%d")
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail="Invalid date format. Please use YYYY-MM-DD (e.g., 2025-10-18)"
-            )
+        validate_journey_date(journey_date)
 
-        # Run the blocking sync Playwright scraper in a threadpool so it doesn't block FastAPI event loop
-        flights = await run_in_threadpool(scrape_flights, origin, destination, journey_date)
+        # Only searches that will scrape count against the client's rate limit
+        if await flight_cache.lookup_async(FlightCache.make_key(origin, destination, journey_date)) is None:
+            admit(request)
+
+        # Served from the result cache when possible; otherwise drives a pooled
+        # browser with the async engine (the pool bounds parallelism)
+        with scraper_metrics.collect() as stage_timings:
+            flights, cache_info = await cached_search(origin, destination, journey_date)
+        extra = {"timings": stage_timings} if timings else {}
 
         if not flights:
-            return JSONResponse(
+            return FlightJSONResponse(
                 content={
                     "origin": origin,
                     "destination": destination,
                     "journey_date": journey_date,
                     "flights": [],
+                    "cache": cache_info,
+                    **extra,
                     "message": "No flights found for the given search criteria"
                 },
-                status_code=200
+                status_code=200,
+                headers=cache_headers(cache_info)
             )
 
-        return JSONResponse(
+        matching = filter_records(
+            flights, max_price=max_price, max_stops=max_stops,
+            airlines=airline.split(",") if airline else None,
+            departure_after=departure_after, departure_before=departure_before
+        )
+        if sort:
+            matching = sort_records(matching, sort)
+        end = offset + limit if limit is not None else len(matching)
+        page = matching[offset:end]
+
+        return FlightJSONResponse(
             content={
                 "origin": origin,
                 "destination": destination,
                 "journey_date": journey_date,
-                "total_flights": len(flights),
-                "flights": flights
+                "total_flights": len(matching),
+                "unfiltered_flights": len(flights),
+                "offset": offset,
+                "next_offset": end if end < len(matching) else None,
+                "cache": cache_info,
+                **extra,
+                "flights": page
             },
-            status_code=200
+            status_code=200,
+            headers=cache_headers(cache_info)
         )
 
+    except HTTPException:
+        raise
+    except Rejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": e.retry_after_header})
+    except CircuitOpen as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(int(e.retry_after + 0.999))})
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except InvalidSearch as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error scraping flights: {str(e)}"
         )
+
+def _stream_event(payload, event: str, fmt: str) -> str:
+    data = dumps(payload).decode("utf-8")
+    if fmt == "sse":
+        return f"event: {event}\ndata: {data}\n\n"
+    return data + "\n"
+
+@app.get("/flight-search/stream")
+async def stream_search_flights(
+    request: Request,
+    origin: str = Query(..., description="Origin city name (e.g., Bangalore)"),
+    destination: str = Query(..., description="Destination city name (e.g., Delhi)"),
+    journey_date: str = Query(..., description="Journey date in YYYY-MM-DD format (e.g., 2025-10-18)"),
+    format: str = Query("ndjson", pattern="^(ndjson|sse)$", description="ndjson (one flight per line) or sse")
+):
+    """
+    Streaming variant of /flight-search: each flight is sent as soon as its card
+    is parsed. NDJSON sends one flight object per line (plus an {"error": ...}
+    line on failure); SSE sends `flight` events followed by `done` or `error`.
+
+    A stream that finds the same search already being scraped (by another
+    stream or /flight-search) waits for that scrape and sends its result,
+    rather than scraping again. The flights of a streamed scrape are kept for
+    the cache and the fare history only up to STREAM_CACHE_MAX_FLIGHTS; past
+    that they are just sent, and identical searches scrape for themselves.
+    """
+    validate_journey_date(journey_date)
+
+    key = FlightCache.make_key(origin, destination, journey_date)
+    cached = await flight_cache.get_async(key)
+    if cached is None:
+        admit(request)
+
+    async def flights():
+        if cached is not None:
+            for flight in cached[0]:
+                yield flight
+            return
+        while not flight_cache.begin(key):
+            shared = await flight_cache.join(key)
+            if shared is not None:
+                for flight in shared:
+                    yield flight
+                return
+
+        # None once the claim on the key has ended (too many flights to keep)
+        collected: Optional[List[FlightRecord]] = []
+        try:
+            async with scrape_gate.slot():
+                async for flight in stream_flights_async(origin, destination, journey_date, browser_pool):
+                    if collected is not None:
+                        collected.append(flight)
+                        if len(collected) > STREAM_CACHE_MAX_FLIGHTS:
+                            collected = None
+                            flight_cache.fail(key, NotShared("too many flights to cache"))
+                    yield flight
+        except Exception as e:
+            if collected is not None:
+                flight_cache.fail(key, e)
+            raise
+        except BaseException:
+            # The client went away: whoever waits on this scrape runs their own
+            if collected is not None:
+                flight_cache.fail(key, NotShared("stream closed"))
+            raise
+        if collected is not None:
+            await flight_cache.finish(key, collected)
+            await record_fares(origin, destination, journey_date, collected)
+
+    async def body():
+        total = 0
+        try:
+            async for flight in flights():
+                total += 1
+                yield _stream_event(flight, "flight", format)
+        except Exception as e:
+            yield _stream_event({"error": f"Error scraping flights: {e}"}, "error", format)
+            return
+        if format == "sse":
+            yield _stream_event({"total_flights": total}, "done", format)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={
+        "Cache-Control": "no-cache",
+        "X-Cache": "HIT" if cached is not None else "MISS",
+    })
+
+class BatchSearchItem(BaseModel):
+    origin: str = Field(..., description="Origin city name (e.g., Bangalore)")
+    destination: str = Field(..., description="Destination city name (e.g., Delhi)")
+    journey_date: str = Field(..., description="Journey date in YYYY-MM-DD format (e.g., 2025-10-18)")
+
+class BatchSearchRequest(BaseModel):
+    searches: List[BatchSearchItem]
+    concurrency: int = Field(BATCH_DEFAULT_CONCURRENCY, ge=1, description="Browser contexts to use in parallel")
+
+@app.post("/flight-search/batch")
+async def batch_search_flights(request: BatchSearchRequest, http_request: Request):
+    """
+    Run many searches in one request, e.g. a 30-day fare calendar.
+    Returns one result or error per "origin|destination|journey_date" key.
+    Each uncached search costs one unit of the client's rate limit. When it
+    cannot pay for all of them, the first ones run and the rest come back as
+    "rate_limited" (with a Retry-After header); with nothing left it is 429.
+    """
+    if not request.searches:
+        raise HTTPException(status_code=400, detail="No searches given")
+    if len(request.searches) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_ITEMS} searches per batch")
+    items = [item.model_dump() for item in request.searches]
+    uncached: List[str] = []
+    for item in items:
+        item_key = batch_item_key(item["origin"], item["destination"], item["journey_date"])
+        if item_key not in uncached and await flight_cache.lookup_async(
+                FlightCache.make_key(item["origin"], item["destination"], item["journey_date"])) is None:
+            uncached.append(item_key)
+    limited = set(uncached[admit_up_to(http_request, len(uncached)):]) if uncached else set()
+    
+    concurrency = min(request.concurrency, browser_pool.stats()["capacity"])
+    results = await search_batch([item for item in items if batch_item_key(
+        item["origin"], item["destination"], item["journey_date"]) not in limited], concurrency)
+    
+    headers = {}
+    if limited:
+        retry_after = max(1, math.ceil(rate_limiter.retry_after(client_id(http_request), len(limited))))
+        headers["Retry-After"] = str(retry_after)
+        for item_key in limited:
+            results[item_key] = {"status": "rate_limited", "error": "Over the rate limit, retry later",
+                                 "retry_after": retry_after}
+    
+    return FlightJSONResponse(
+        content={
+            "total_searches": len(results),
+            "failed": sum(1 for result in results.values() if result["status"] == "error"),
+            "rate_limited": len(limited),
+            "results": results
+        },
+        status_code=200,
+        headers=headers
+    )
+
+async def run_search_job(origin: str, destination: str, journey_date: str) -> Dict:
+    """Job queue worker body: a cached search, shaped like the /flight-search payload."""
+    flights, cache_info = await cached_search(origin, destination, journey_date, patient=True)
+    return {"total_flights": len(flights), "cache": cache_info, "flights": flights}
+
+@app.post("/jobs", status_code=202)
+async def submit_search_job(
+    request: Request,
+    response: Response,
+    origin: str = Query(..., description="Origin city name (e.g., Bangalore)"),
+    destination: str = Query(..., description="Destination city name (e.g., Delhi)"),
+    journey_date: str = Query(..., description="Journey date in YYYY-MM-DD format (e.g., 2025-10-18)")
+):
+    """
+    Queue a flight search and return its job id immediately.
+    Answers 429 when the queue is full or the client is over its rate limit.
+    """
+    validate_journey_date(journey_date)
+    if await flight_cache.lookup_async(FlightCache.make_key(origin, destination, journey_date)) is None:
+        # Jobs wait their turn in the job queue rather than the scrape waiting room
+        admit(request, check_gate=False)
+    try:
+        job = job_queue.submit(origin=origin, destination=destination, journey_date=journey_date)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Too many queued searches: {e}",
+                            headers={"Retry-After": "10"})
+
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job.to_dict()
+
+@app.get("/jobs/{job_id}")
+async def get_search_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the job to finish (long-poll)")
+):
+    """
+    Job status and, once finished, its result or error.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id")
+    if wait and not job.done.is_set():
+        await job_queue.wait(job, wait)
+    return job.to_dict()
+
+@app.get("/jobs-stats")
+async def job_stats():
+    """Job queue counters"""
+    return job_queue.stats()
+
+@app.post("/watches", status_code=201)
+async def create_watch(
+    request: Request,
+    origin: str = Query(..., description="Origin city name (e.g., Bangalore)"),
+    destination: str = Query(..., description="Destination city name (e.g., Delhi)"),
+    journey_date: str = Query(..., description="Journey date in YYYY-MM-DD format (e.g., 2025-10-18)"),
+    interval_seconds: Optional[float] = Query(None, gt=0, description="Seconds between checks (default WATCH_INTERVAL_SECONDS)"),
+    webhook: Optional[str] = Query(None, pattern="^https?://", description="URL that receives each change as a JSON POST")
+):
+    """
+    Watch a search for fare changes. It is re-checked in the background; each
+    change (new or removed flights, price changes) is POSTed to `webhook` and
+    can be polled from /watches/{watch_id}. Webhooks on private or loopback
+    addresses are refused (see WATCH_WEBHOOK_HOSTS).
+    """
+    validate_journey_date(journey_date)
+    if webhook is not None:
+        try:
+            await asyncio.to_thread(watches.check_webhook, webhook)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    admit(request, check_gate=False)
+    try:
+        watch = watches.add(origin, destination, journey_date, interval=interval_seconds, webhook=webhook,
+                            client=client_id(request))
+    except WatchLimit as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return watch.to_dict()
+
+@app.get("/watches")
+async def list_watches(request: Request):
+    """The watches this client registered (their IDs are what reads and deletes them)"""
+    return {"watches": [watch.to_dict() for watch in watches.list(client_id(request))], **watches.stats()}
+
+@app.get("/watches/{watch_id}")
+async def get_watch_changes(
+    watch_id: str,
+    since: int = Query(0, ge=0, description="Last version seen; only later changes are returned"),
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for a change (long-poll)")
+):
+    """
+    Changes of a watch after version `since`. Pass the returned version back
+    as `since` next time. If those changes are no longer kept, the full
+    current flight list is returned with resync=true instead.
+    """
+    watch = watches.get(watch_id)
+    if watch is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired watch")
+    if wait:
+        await watches.wait(watch, since, wait)
+    return {**watch.to_dict(), **watch.changes_since(since)}
+
+@app.delete("/watches/{watch_id}", status_code=204)
+async def delete_watch(watch_id: str):
+    """Stop watching"""
+    if not watches.remove(watch_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired watch")
+    return Response(status_code=204)
+
+def _require_fare_store() -> FareStore:
+    if fare_store is None:
+        raise HTTPException(status_code=404, detail="Fare history is not enabled (set FARE_STORE_PATH)")
+    return fare_store
+
+@app.get("/fares/history")
+async def fare_history(
+    origin: str = Query(..., description="Origin city name (e.g., Bangalore)"),
+    destination: str = Query(..., description="Destination city name (e.g., Delhi)"),
+    journey_date: Optional[str] = Query(None, description="Only this journey date (YYYY-MM-DD)"),
+    airline: Optional[str] = Query(None, description="Only this airline"),
+    flight_number: Optional[str] = Query(None, description="Only this flight number"),
+    since: Optional[float] = Query(None, description="Only scrapes after this Unix timestamp"),
+    limit: int = Query(500, ge=1, le=5000, description="Most recent scrapes to return")
+):
+    """
+    Recorded price history, one entry per scrape (oldest first) with the
+    lowest, highest and average price found, without scraping again.
+    """
+    store = _require_fare_store()
+    if journey_date:
+        validate_journey_date(journey_date)
+    history = await asyncio.to_thread(store.price_history, origin, destination, journey_date=journey_date,
+                                      airline=airline, flight_number=flight_number, since=since, limit=limit)
+    return {"origin": origin, "destination": destination, "journey_date": journey_date, "history": history}
+
+@app.get("/fares/cheapest-by-day")
+async def cheapest_fares_by_day(
+    origin: str = Query(..., description="Origin city name (e.g., Bangalore)"),
+    destination: str = Query(..., description="Destination city name (e.g., Delhi)"),
+    date_from: str = Query(..., description="First journey date (YYYY-MM-DD)"),
+    date_to: str = Query(..., description="Last journey date (YYYY-MM-DD)"),
+    airline: Optional[str] = Query(None, description="Only this airline"),
+    scope: str = Query("latest", pattern="^(latest|all)$",
+                       description="latest: from the newest scrape of each date; all: lowest ever recorded")
+):
+    """Cheapest recorded flight for each journey date in the range"""
+    store = _require_fare_store()
+    validate_journey_date(date_from)
+    validate_journey_date(date_to)
+    days = await asyncio.to_thread(store.cheapest_by_day, origin, destination, date_from, date_to,
+                                   airline=airline, scope=scope)
+    return {"origin": origin, "destination": destination, "scope": scope, "days": days}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,56 +1,26 @@
+import asyncio
+import codecs
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
+import urllib3
 from google import genai
-from bs4 import BeautifulSoup
 from dotenv import load_dotenv
+from fake_model import fake_client_from_env
+from html_cleaners import cleaner_from_env, streaming_cleaner_from_env
+from summary_cache import SummaryCache, summary_cache_from_env
+from text_chunks import chunk_text, estimate_tokens
 load_dotenv() # Loads variables from .env file (for GEMINI_API_KEY)
 
-def fetch_and_clean_content(url: str) -> str | None:
-    """
-    Fetches the content of a webpage and cleans it to extract plain text.
-    """
-    print(f"Fetching content from: {url}...")
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-    
-    except requests.exceptions.RequestException as e:
-        print(f"Error: Unable to fetch webpage. {e}")
-        return None
-
-    print("Cleaning HTML...")
-    soup = BeautifulSoup(response.text, 'html.parser')
-
-    for tag in soup(['script', 'style', 'nav', 'footer', 'header', 'aside']):
-        tag.decompose()
-
-    paragraphs = soup.find_all('p')
-    
-    if not paragraphs:
-        print("Warning: No <p> tags found. Falling back to all text.")
-        cleaned_text = soup.body.get_text(separator=' ', strip=True)
-    else:
-        cleaned_text = ' '.join(p.get_text(strip=True) for p in paragraphs)
-
-    cleaned_text = ' '.join(cleaned_text.split())
-    
-    print(f"Cleaning complete. Content length: {len(cleaned_text)} characters.")
-    return cleaned_text
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
 
-def get_summary_from_gemini(content: str, api_key: str) -> str:
-    """
-    Sends the cleaned content to the Gemini API using the genai.Client() method.
-    """
-    if not content:
-        return "Error: Content to summarize is empty."
+MODEL = "gemini-2.5-flash"
 
-    print("Connecting to Gemini API using genai.Client()...")
-    
-    # --- Your Custom Prompt ---
-    prompt_template = f"""
+# --- Your Custom Prompt ---
+PROMPT_TEMPLATE = """
     Analyze the following webpage content and perform two tasks:
     1.  First give me 3-5 strong bullet points for the information presented. It should be structured for easy reading, understanding, and addition of value to the user
     2.  Add one short, single-line insight that helps user understand the overall context and a conclusion of the overall text.
@@ -72,34 +42,288 @@ def get_summary_from_gemini(content: str, api_key: str) -> str:
     ---
     """
 
+# Map step for long pages: each chunk becomes a few notes, and the joined
+# notes are summarized with PROMPT_TEMPLATE
+CHUNK_PROMPT_TEMPLATE = """
+    The following is one part of a long webpage. Give 3-6 short bullet points with its key facts, names and numbers.
+    Output only the bullet points.
+
+    ---
+    WEBPAGE CONTENT:
+    {content}
+    ---
+    """
+
+# Pages estimated above SINGLE_CALL_TOKENS are split into chunks of at most
+# CHUNK_TOKENS, of which MAP_CONCURRENCY are summarized at a time
+SINGLE_CALL_TOKENS = int(os.getenv("SUMMARY_SINGLE_CALL_TOKENS", "24000"))
+CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "6000"))
+MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+
+# Downloads stop at FETCH_MAX_BYTES or after FETCH_DEADLINE_SECONDS, keeping
+# what arrived, and as soon as MAX_CONTENT_CHARS of paragraph text are in
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+FETCH_DEADLINE_SECONDS = float(os.getenv("FETCH_DEADLINE_SECONDS", "30"))
+MAX_CONTENT_CHARS = int(os.getenv("MAX_CONTENT_CHARS", "400000"))
+# Longest wait for any single read of the body
+FETCH_READ_TIMEOUT_SECONDS = float(os.getenv("FETCH_READ_TIMEOUT_SECONDS", "10"))
+
+
+def clean_html(html: str, max_chars: int | None = None) -> str:
+    """
+    Plain text of a page, one line per <p> tag (or the whole body on one line
+    when there are none), without scripts, styles and page chrome. The parser
+    is picked by HTML_CLEANER (see html_cleaners); paragraphs after the first
+    `max_chars` characters are left out.
+    """
+    if max_chars is None:
+        return cleaner_from_env()(html)
+    cleaner = streaming_cleaner_from_env(max_chars)
+    cleaner.feed(html)
+    return cleaner.close()
+
+def page_encoding(content_type: str | None) -> str:
+    """The charset a Content-Type header declares, else UTF-8."""
+    for param in (content_type or '').split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            try:
+                return codecs.lookup(value.strip().strip('"\'')).name
+            except LookupError:
+                break
+    return 'utf-8'
+
+def _read_some(response, amt: int) -> bytes:
+    """
+    Whatever body bytes arrive first, at most `amt`. iter_content would block
+    until a whole chunk is in, so a server dripping bytes could hold it past
+    any deadline; this waits at most the response's read timeout.
+    """
+    read = getattr(response.raw, 'read1', response.raw.read)
+    try:
+        return read(amt, decode_content=True)
+    except urllib3.exceptions.ReadTimeoutError as e:
+        raise requests.exceptions.ReadTimeout(e)
+    except urllib3.exceptions.HTTPError as e:
+        raise requests.exceptions.ConnectionError(e)
+
+def read_and_clean(response, max_bytes: int = FETCH_MAX_BYTES, deadline_seconds: float = FETCH_DEADLINE_SECONDS,
+                   max_chars: int = MAX_CONTENT_CHARS) -> tuple[str, bool]:
+    """
+    Clean a streamed response while it downloads: decoded piece by piece
+    into an incremental cleaner. Reading stops once `max_chars` of text are
+    collected, at `max_bytes`, or after `deadline_seconds`, and the page is
+    cleaned as far as it got. Returns (text, complete), where complete is
+    False when reading stopped before the end of the body.
+
+    The deadline is checked between reads, so it can be overrun by up to the
+    read timeout the request was made with; a read timing out before the
+    deadline raises requests.exceptions.ReadTimeout.
+    """
+    decoder = codecs.getincrementaldecoder(page_encoding(response.headers.get('Content-Type')))(errors='replace')
+    cleaner = streaming_cleaner_from_env(max_chars)
+    deadline = time.monotonic() + deadline_seconds
+    received = 0
+    complete = False
+    try:
+        while True:
+            if time.monotonic() >= deadline:
+                print(f"Warning: Download took over {deadline_seconds:g}s, using only the first part.")
+                break
+            try:
+                chunk = _read_some(response, 65536)
+            except requests.exceptions.ReadTimeout:
+                if time.monotonic() < deadline:
+                    raise
+                continue
+            if not chunk:
+                cleaner.feed(decoder.decode(b'', final=True))
+                complete = True
+                break
+            received += len(chunk)
+            if cleaner.feed(decoder.decode(chunk)):
+                print(f"Collected {max_chars} characters of text after {received} bytes, stopping the download.")
+                break
+            if received >= max_bytes:
+                print(f"Warning: Page is over {max_bytes} bytes, using only the first part.")
+                break
+    finally:
+        response.close()
+    return cleaner.close(), complete
+
+def fetch_and_clean_content(url: str, cache: SummaryCache | None = None) -> str | None:
+    """
+    Fetches the content of a webpage and cleans it to extract plain text,
+    streaming the body into the cleaner (see read_and_clean).
+    With a cache, the request is conditional (ETag/Last-Modified) and an
+    unchanged page's cleaned text comes from the cache.
+    """
+    print(f"Fetching content from: {url}...")
+    headers, cached_text = cache.conditional_headers(url) if cache is not None else ({}, None)
+    try:
+        response = requests.get(url, headers={**HEADERS, **headers}, timeout=(10, FETCH_READ_TIMEOUT_SECONDS), stream=True)
+        if response.status_code == 304 and cached_text is not None:
+            response.close()
+            cache.not_modified += 1
+            print("Page not modified since the last fetch, using cached content.")
+            return cached_text
+        response.raise_for_status()
+
+        print("Cleaning HTML...")
+        cleaned_text, complete = read_and_clean(response)
+    
+    except requests.exceptions.RequestException as e:
+        print(f"Error: Unable to fetch webpage. {e}")
+        return None
+
+    # A cut-off page must not be answered from the cache while its validators still match
+    if cache is not None and complete:
+        cache.put_page(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), cleaned_text)
+    
+    print(f"Cleaning complete. Content length: {len(cleaned_text)} characters.")
+    return cleaned_text
+
+def build_prompt(content: str) -> str:
+    return PROMPT_TEMPLATE.format(content=content)
+
+def model_client(api_key: str | None):
+    """genai.Client, or the offline FakeModelClient when FAKE_MODEL is set."""
+    if os.getenv("FAKE_MODEL"):
+        return fake_client_from_env()
+    return genai.Client(api_key=api_key)
+
+def _run(coroutine):
+    """
+    asyncio.run, in a worker thread when this thread already runs an event
+    loop (a notebook, or an async caller using this sync API).
+    """
     try:
-        client = genai.Client(api_key=api_key)
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+def get_summary_from_gemini(content: str, api_key: str, cache: SummaryCache | None = None,
+                            client=None) -> str:
+    """
+    Sends the cleaned content to the Gemini API using the genai.Client() method.
+    With a cache, content already summarized with the same prompt and model
+    is answered from it. Long pages are summarized chunk by chunk (see
+    summarize_async).
+    """
+    if not content:
+        return "Error: Content to summarize is empty."
+
+    key = SummaryCache.key(content, PROMPT_TEMPLATE, MODEL)
+    if cache is not None:
+        summary = cache.get_summary(key)
+        if summary is not None:
+            print("Using cached summary (content unchanged).")
+            return summary
+
+    print("Connecting to Gemini API using genai.Client()...")
+
+    try:
+        client = client or model_client(api_key)
+
+        tokens = estimate_tokens(content)
+        if tokens > SINGLE_CALL_TOKENS:
+            print(f"Long page (~{tokens} tokens): summarizing it in chunks of {CHUNK_TOKENS} tokens...")
+            return _run(summarize_async(client, content, cache))
         
         response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt_template
+            model=MODEL,
+            contents=build_prompt(content)
         )
-        return response.text.strip()
+        summary = response.text.strip()
+        if cache is not None:
+            cache.put_summary(key, summary)
+        return summary
         
     except Exception as e:
         return f"An error during Gemini API call: {e}"
 
+async def _generate_async(client, template: str, content: str, cache: SummaryCache | None,
+                          limiter: asyncio.Semaphore | None = None) -> str:
+    key = SummaryCache.key(content, template, MODEL)
+    if cache is not None:
+        summary = cache.get_summary(key)
+        if summary is not None:
+            return summary
+    if limiter is None:
+        response = await client.aio.models.generate_content(model=MODEL, contents=template.format(content=content))
+    else:
+        async with limiter:
+            response = await client.aio.models.generate_content(model=MODEL,
+                                                                contents=template.format(content=content))
+    summary = response.text.strip()
+    if cache is not None:
+        cache.put_summary(key, summary)
+    return summary
+
+async def summarize_async(client, content: str, cache: SummaryCache | None = None,
+                          concurrency: int = MAP_CONCURRENCY, limiter: asyncio.Semaphore | None = None) -> str:
+    """
+    get_summary_from_gemini on a shared genai.Client, through its asyncio API
+    so many calls can be in flight. Raises on API errors.
+
+    Content over SINGLE_CALL_TOKENS is map-reduced: split on paragraph
+    boundaries into CHUNK_TOKENS chunks, each summarized into notes
+    (`concurrency` at a time, again if the notes are still too long), then
+    the notes are summarized in the usual Summary/Insight format. The final
+    summary is cached under the whole content, each chunk's notes under
+    the chunk.
+
+    A `limiter` shared by several concurrent calls bounds all their model
+    calls together, chunk calls included, instead of `concurrency`.
+    """
+    if not content:
+        raise ValueError("Content to summarize is empty")
+    if estimate_tokens(content) <= SINGLE_CALL_TOKENS:
+        return await _generate_async(client, PROMPT_TEMPLATE, content, cache, limiter)
+
+    key = SummaryCache.key(content, PROMPT_TEMPLATE, MODEL)
+    if cache is not None:
+        summary = cache.get_summary(key)
+        if summary is not None:
+            return summary
+
+    limiter = limiter or asyncio.Semaphore(concurrency)
+
+    async def summarize_chunk(chunk: str) -> str:
+        return await _generate_async(client, CHUNK_PROMPT_TEMPLATE, chunk, cache, limiter)
+
+    notes = content
+    while estimate_tokens(notes) > SINGLE_CALL_TOKENS:
+        chunks = chunk_text(notes, CHUNK_TOKENS)
+        shorter = "\n".join(await asyncio.gather(*(summarize_chunk(chunk) for chunk in chunks)))
+        if len(shorter) >= len(notes):
+            raise ValueError("Chunk summaries are not shorter than the chunks; raise SUMMARY_CHUNK_TOKENS")
+        notes = shorter
+
+    summary = await _generate_async(client, PROMPT_TEMPLATE, notes, cache, limiter)
+    if cache is not None:
+        cache.put_summary(key, summary)
+    return summary
+
 # --- Main execution block ---
 if __name__ == "__main__":
     # 1. Get API Key from environment variable
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-    if not GEMINI_API_KEY:
+    if not GEMINI_API_KEY and not os.getenv("FAKE_MODEL"):
         print("Error: 'GEMINI_API_KEY' environment variable not set.")
     else:
         # 2. Set the target URL
         url_to_summarize = "https://en.wikipedia.org/wiki/Artificial_intelligence"
 
-        # 3. Fetch and clean the content
-        cleaned_content = fetch_and_clean_content(url_to_summarize)
+        # 3. Fetch and clean the content (unchanged pages and summaries come from the cache)
+        summary_cache = summary_cache_from_env()
+        cleaned_content = fetch_and_clean_content(url_to_summarize, summary_cache)
 
         if cleaned_content:
             # 4. Pass to Gemini and print the result
-            summary_output = get_summary_from_gemini(cleaned_content, GEMINI_API_KEY)
+            summary_output = get_summary_from_gemini(cleaned_content, GEMINI_API_KEY, summary_cache)
             
             print("\n--- SCRIPT OUTPUT ---")
             print(summary_output)
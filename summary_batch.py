@@ -0,0 +1,228 @@
+"""
+Summarize many pages with sol3's cleaner and prompt.
+
+URLs flow through three bounded stages so no stage waits on another:
+`fetch_concurrency` downloads share one pooled httpx connection set (with at
+most `per_host` at a time to any one host), cleaning runs in a process pool,
+and at most `model_concurrency` model calls are in flight (the chunk calls
+of long pages included). A bounded queue between cleaning and the model
+calls keeps cleaned pages from piling up in memory when the model is the
+bottleneck. Each result is appended to a JSONL file as soon as it is ready.
+
+With a SummaryCache, downloads are conditional and unchanged pages skip
+cleaning and the model call. Bodies are cut off at sol3.FETCH_MAX_BYTES or
+after sol3.FETCH_DEADLINE_SECONDS, and cleaning keeps at most
+sol3.MAX_CONTENT_CHARS of text.
+
+Usage:
+    python summary_batch.py --urls-file urls.txt --output summaries.jsonl
+    python summary_batch.py https://example.com/a https://example.com/b
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+import sol3
+from summary_cache import SummaryCache, summary_cache_from_env
+
+
+class HostLimiter:
+    """At most `per_host` concurrent requests to each host."""
+
+    def __init__(self, per_host: int = 4):
+        self.per_host = per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        async with semaphore:
+            yield
+
+
+def read_urls(path: str) -> List[str]:
+    """URLs from a file, one per line; blank lines and # comments are skipped."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+async def fetch_async(client: httpx.AsyncClient, url: str, hosts: HostLimiter,
+                      headers: Optional[Dict[str, str]] = None, max_bytes: int = sol3.FETCH_MAX_BYTES,
+                      deadline_seconds: float = sol3.FETCH_DEADLINE_SECONDS) -> Tuple[httpx.Response, str, bool]:
+    """
+    The response, its decoded HTML (empty for a 304) and whether that is the
+    whole body. The body is streamed and cut off at `max_bytes` or after
+    `deadline_seconds`.
+    """
+    async with hosts.slot(url), client.stream("GET", url, headers=headers) as response:
+        if response.status_code == 304:
+            return response, "", True
+        response.raise_for_status()
+        body = bytearray()
+        complete = False
+        try:
+            async with asyncio.timeout(deadline_seconds):
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) >= max_bytes:
+                        break
+                else:
+                    complete = True
+        except TimeoutError:
+            print(f"{url}: download took over {deadline_seconds:g}s, using only the first part")
+        encoding = sol3.page_encoding(response.headers.get("Content-Type"))
+        return response, body[:max_bytes].decode(encoding, errors="replace"), complete
+
+
+class BatchSummarizer:
+    """
+    fetch_concurrency: downloads in flight (and size of the connection pool)
+    per_host: downloads in flight to a single host
+    clean_workers: processes cleaning HTML (default: CPU count)
+    model_concurrency: model calls in flight
+    cache: optional SummaryCache for conditional fetches and summaries
+    """
+
+    def __init__(self, model_client, fetch_concurrency: int = 16, per_host: int = 4,
+                 clean_workers: Optional[int] = None, model_concurrency: int = 4,
+                 timeout: float = 10.0, cache: Optional[SummaryCache] = None):
+        self.model_client = model_client
+        self.cache = cache
+        self.fetch_concurrency = fetch_concurrency
+        self.per_host = per_host
+        self.clean_workers = clean_workers or os.cpu_count() or 1
+        self.model_concurrency = model_concurrency
+        self.timeout = timeout
+        self.counts = {"ok": 0, "error": 0}
+
+    async def run(self, urls: Iterable[str], out: TextIO) -> Dict:
+        """Summarize `urls`, writing one JSON line per URL to `out`; returns counts and timing."""
+        started = time.perf_counter()
+        urls_queue: asyncio.Queue = asyncio.Queue()
+        for url in urls:
+            urls_queue.put_nowait(url)
+        cleaned: asyncio.Queue = asyncio.Queue(maxsize=self.model_concurrency * 2)
+        hosts = HostLimiter(self.per_host)
+        limits = httpx.Limits(max_connections=self.fetch_concurrency,
+                              max_keepalive_connections=self.fetch_concurrency)
+
+        with ProcessPoolExecutor(self.clean_workers) as cleaners:
+            async with httpx.AsyncClient(headers=sol3.HEADERS, timeout=self.timeout, limits=limits,
+                                         follow_redirects=True) as http:
+                fetchers = [asyncio.create_task(self._fetch_worker(http, hosts, cleaners, urls_queue, cleaned, out))
+                            for _ in range(self.fetch_concurrency)]
+                # One limiter for every model call, the chunk calls of long pages included
+                model_calls = asyncio.Semaphore(self.model_concurrency)
+                summarizers = [asyncio.create_task(self._model_worker(cleaned, out, model_calls))
+                               for _ in range(self.model_concurrency)]
+                try:
+                    await asyncio.gather(*fetchers)
+                    for _ in summarizers:
+                        await cleaned.put(None)
+                    await asyncio.gather(*summarizers)
+                finally:
+                    for task in fetchers + summarizers:
+                        task.cancel()
+
+        elapsed = time.perf_counter() - started
+        total = self.counts["ok"] + self.counts["error"]
+        return {**self.counts, "seconds": round(elapsed, 1),
+                "pages_per_minute": round(total / elapsed * 60, 1) if elapsed else None}
+
+    async def _fetch_worker(self, http, hosts, cleaners, urls_queue, cleaned, out):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                url = urls_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            result = {"url": url}
+            headers, cached_content = self.cache.conditional_headers(url) if self.cache else ({}, None)
+            try:
+                fetch_started = time.perf_counter()
+                response, html, complete = await fetch_async(http, url, hosts, headers)
+                clean_started = time.perf_counter()
+                if response.status_code == 304 and cached_content is not None:
+                    self.cache.not_modified += 1
+                    content = cached_content
+                    result["not_modified"] = True
+                else:
+                    response.raise_for_status()
+                    content = await loop.run_in_executor(cleaners, sol3.clean_html, html, sol3.MAX_CONTENT_CHARS)
+                    # A cut-off page must not be answered from the cache while its validators still match
+                    if self.cache is not None and complete:
+                        self.cache.put_page(url, response.headers.get("ETag"),
+                                            response.headers.get("Last-Modified"), content)
+                del html
+                result.update(fetch_ms=round((clean_started - fetch_started) * 1000),
+                              clean_ms=round((time.perf_counter() - clean_started) * 1000),
+                              content_chars=len(content))
+            except Exception as e:
+                self._write(out, {**result, "status": "error", "stage": "fetch", "error": str(e)})
+                continue
+            await cleaned.put((result, content))
+
+    async def _model_worker(self, cleaned, out, model_calls):
+        while True:
+            item = await cleaned.get()
+            if item is None:
+                return
+            result, content = item
+            started = time.perf_counter()
+            try:
+                summary = await sol3.summarize_async(self.model_client, content, self.cache, limiter=model_calls)
+            except Exception as e:
+                self._write(out, {**result, "status": "error", "stage": "model", "error": str(e)})
+                continue
+            self._write(out, {**result, "status": "ok",
+                              "model_ms": round((time.perf_counter() - started) * 1000), "summary": summary})
+
+    def _write(self, out: TextIO, result: Dict):
+        self.counts[result["status"]] += 1
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+        if result["status"] == "error":
+            print(f"{result['url']}: {result['stage']} failed: {result['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize many web pages into a JSONL file")
+    parser.add_argument("urls", nargs="*", help="URLs to summarize")
+    parser.add_argument("--urls-file", help="File with one URL per line")
+    parser.add_argument("--output", default="summaries.jsonl", help="JSONL file the results are appended to")
+    parser.add_argument("--fetch-concurrency", type=int, default=16)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--clean-workers", type=int, default=None)
+    parser.add_argument("--model-concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    urls = list(args.urls) + (read_urls(args.urls_file) if args.urls_file else [])
+    if not urls:
+        parser.error("no URLs given")
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key and not os.getenv("FAKE_MODEL"):
+        parser.error("'GEMINI_API_KEY' environment variable not set.")
+
+    summarizer = BatchSummarizer(sol3.model_client(api_key),
+                                 fetch_concurrency=args.fetch_concurrency, per_host=args.per_host,
+                                 clean_workers=args.clean_workers, model_concurrency=args.model_concurrency,
+                                 cache=summary_cache_from_env())
+    print(f"Summarizing {len(urls)} page(s) into {args.output}...")
+    with open(args.output, "a", encoding="utf-8") as out:
+        stats = asyncio.run(summarizer.run(urls, out))
+    print(f"Done: {stats}")
+
+
+if __name__ == "__main__":
+    main()
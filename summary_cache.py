@@ -0,0 +1,145 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class SummaryCache:
+    """
+    On-disk cache for sol3: model summaries keyed by a hash of (cleaned
+    content, prompt template, model), so an unchanged page is never sent to
+    the model twice, and each URL's ETag/Last-Modified validators with its
+    cleaned text, so an unchanged page is not downloaded again either.
+
+    Entries older than `ttl` seconds are dropped; past `max_entries` per
+    table the least recently used go first.
+    """
+
+    def __init__(self, path: str = "summary_cache.sqlite3", ttl: float = 7 * 86400,
+                 max_entries: int = 10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY, summary TEXT NOT NULL,
+                stored_at REAL NOT NULL, used_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content TEXT NOT NULL,
+                stored_at REAL NOT NULL, used_at REAL NOT NULL
+            );
+        """)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    @staticmethod
+    def key(content: str, prompt_template: str, model: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model, prompt_template, content):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _get(self, table: str, column: str, key: str, fields: str) -> Optional[Tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {fields}, stored_at FROM {table} WHERE {column} = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if time.time() - row[-1] > self.ttl:
+                self._conn.execute(f"DELETE FROM {table} WHERE {column} = ?", (key,))
+                return None
+            self._conn.execute(f"UPDATE {table} SET used_at = ? WHERE {column} = ?", (time.time(), key))
+        return row[:-1]
+
+    def _evict(self, table: str, column: str):
+        self._conn.execute(f"DELETE FROM {table} WHERE stored_at < ?", (time.time() - self.ttl,))
+        self._conn.execute(
+            f"DELETE FROM {table} WHERE {column} NOT IN"
+            f" (SELECT {column} FROM {table} ORDER BY used_at DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+
+    def get_summary(self, key: str) -> Optional[str]:
+        row = self._get("summaries", "key", key, "summary")
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put_summary(self, key: str, summary: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, stored_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, summary, now, now),
+            )
+            self._evict("summaries", "key")
+
+    def get_page(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], str]]:
+        """(etag, last_modified, cleaned content) recorded for `url`, or None."""
+        return self._get("pages", "url", url, "etag, last_modified, content")
+
+    def put_page(self, url: str, etag: Optional[str], last_modified: Optional[str], content: str):
+        """Remember a page's cleaned text; only pages with a validator are worth keeping."""
+        if not (etag or last_modified):
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, content, stored_at, used_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content, now, now),
+            )
+            self._evict("pages", "url")
+
+    def conditional_headers(self, url: str) -> Tuple[Dict[str, str], Optional[str]]:
+        """
+        Headers that make the server answer 304 when `url` is unchanged, and
+        the cleaned content to use in that case.
+        """
+        page = self.get_page(url)
+        if page is None:
+            return {}, None
+        etag, last_modified, content = page
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers, content
+
+    def stats(self) -> Dict:
+        with self._lock:
+            summaries = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "summaries": summaries,
+            "pages": pages,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def summary_cache_from_env() -> Optional[SummaryCache]:
+    """
+    SummaryCache at SUMMARY_CACHE_PATH (empty disables caching) with
+    SUMMARY_CACHE_TTL_SECONDS and SUMMARY_CACHE_MAX_ENTRIES.
+    """
+    path = os.getenv("SUMMARY_CACHE_PATH", "summary_cache.sqlite3")
+    if not path:
+        return None
+    return SummaryCache(path, ttl=float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", str(7 * 86400))),
+                        max_entries=int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "10000")))
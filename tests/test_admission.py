@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+import admission
+from admission import Overloaded, RateLimited, RateLimiter, ScrapeGate, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+
+def test_bucket_refills_up_to_burst(clock):
+    bucket = TokenBucket(rate=1, burst=2)
+    assert bucket.take() == 0
+    assert bucket.take() == 0
+    assert bucket.take() == pytest.approx(1)
+    clock.now += 100
+    assert bucket.take(2) == 0
+    assert bucket.take() == pytest.approx(1)
+
+
+def test_take_up_to_takes_whole_tokens(clock):
+    bucket = TokenBucket(rate=1, burst=5)
+    assert bucket.take_up_to(3) == 3
+    assert bucket.take_up_to(10) == 2
+    assert bucket.take_up_to(1) == 0
+    clock.now += 1.5
+    assert bucket.take_up_to(10) == 1
+
+
+def test_limiter_charges_each_client(clock):
+    limiter = RateLimiter(per_minute=60, burst=2)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(RateLimited) as raised:
+        limiter.check("a")
+    assert raised.value.retry_after_header == "1"
+    limiter.check("b")
+    assert limiter.stats()["limited"] == 1
+
+
+def test_cost_over_the_burst_is_not_capped(clock):
+    limiter = RateLimiter(per_minute=60, burst=10)
+    with pytest.raises(RateLimited):
+        limiter.check("a", cost=25)
+    # Nothing was taken by the refused charge
+    limiter.check("a", cost=10)
+
+
+def test_check_up_to_admits_what_the_bucket_holds(clock):
+    limiter = RateLimiter(per_minute=30, burst=10)
+    assert limiter.check_up_to("a", 25) == 10
+    with pytest.raises(RateLimited) as raised:
+        limiter.check_up_to("a", 1)
+    assert raised.value.retry_after == pytest.approx(2)
+    assert limiter.retry_after("a", 15) == pytest.approx(20)
+
+
+def test_least_recently_seen_clients_are_forgotten(clock):
+    limiter = RateLimiter(per_minute=60, burst=1, max_clients=2)
+    limiter.check("a")
+    limiter.check("b")
+    limiter.retry_after("a", 1)  # "a" seen again, so "b" is the oldest
+    limiter.check("c")
+    assert limiter.stats()["clients"] == 2
+    limiter.check("b")  # forgotten: a full bucket again
+    with pytest.raises(RateLimited):
+        limiter.check("c")
+
+
+def test_gate_rejects_when_the_waiting_room_is_full():
+    async def run():
+        gate = ScrapeGate(max_in_flight=1, max_waiting=0, max_wait=1)
+        async with gate.slot():
+            with pytest.raises(Overloaded):
+                gate.check()
+            with pytest.raises(Overloaded):
+                async with gate.slot():
+                    pass
+        return gate.stats()
+
+    stats = asyncio.run(run())
+    assert stats["in_flight"] == 0
+    assert stats["rejected"] >= 1
+
+
+def test_patient_slot_waits():
+    async def run():
+        gate = ScrapeGate(max_in_flight=1, max_waiting=0, max_wait=0.01)
+        order = []
+
+        async def scrape(name, delay):
+            async with gate.slot(patient=True):
+                order.append(name)
+                await asyncio.sleep(delay)
+
+        await asyncio.gather(scrape("first", 0.05), scrape("second", 0))
+        return order
+
+    assert asyncio.run(run()) == ["first", "second"]
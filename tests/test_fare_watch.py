@@ -0,0 +1,49 @@
+import pytest
+
+from fare_watch import check_webhook, diff_flights
+from flight_record import FlightRecord
+
+
+def flight(number, price, departure="2025-10-18T06:00"):
+    return FlightRecord.from_dict({"airline": "IndiGo", "flight_number": number, "departure": departure,
+                                   "price": price})
+
+
+def test_diff_flights():
+    old = [flight("6E 1", 4000), flight("6E 2", 5000), flight("6E 3", None)]
+    new = [flight("6E 1", 3500), flight("6E 3", 6000), flight("6E 4", 7000), flight("6E 2", 5000, "2025-10-18T09:00")]
+    diff = diff_flights(old, new)
+    assert [record.flight_number for record in diff["added"]] == ["6E 4", "6E 2"]
+    assert [record.flight_number for record in diff["removed"]] == ["6E 2"]
+    assert [(change["flight_number"], change["change"]) for change in diff["price_changes"]] == [
+        ("6E 1", -500), ("6E 3", None)]
+
+
+def test_diff_of_identical_snapshots_is_empty():
+    flights = [flight("6E 1", 4000)]
+    assert diff_flights(flights, list(flights)) == {"added": [], "removed": [], "price_changes": []}
+
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/hook",
+    "http:///nohost",
+    "http://127.0.0.1/hook",
+    "http://10.1.2.3/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://[::1]/hook",
+    "http://[::ffff:127.0.0.1]/hook",
+    "http://224.0.0.1/hook",
+])
+def test_check_webhook_refuses_internal_urls(url):
+    with pytest.raises(ValueError):
+        check_webhook(url)
+
+
+def test_check_webhook_returns_the_checked_address():
+    assert check_webhook("https://8.8.8.8/hook") == "8.8.8.8"
+
+
+def test_check_webhook_allowed_hosts():
+    assert check_webhook("https://hooks.internal/x", allowed_hosts=["hooks.internal"]) is None
+    with pytest.raises(ValueError):
+        check_webhook("https://8.8.8.8/x", allowed_hosts=["hooks.internal"])
@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+import flight_cache
+from flight_cache import FlightCache, MemoryBackend, NotShared, SQLiteBackend
+
+
+def test_lookup_respects_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(flight_cache.time, "time", lambda: now[0])
+    cache = FlightCache(ttl=60)
+    cache.store("k", [1])
+    now[0] += 30
+    assert cache.lookup("k") == ([1], 30)
+    now[0] += 31
+    assert cache.lookup("k") is None
+    assert len(cache.backend) == 0
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", 1, 0)
+    backend.set("b", 2, 0)
+    backend.get("a")
+    backend.set("c", 3, 0)
+    assert backend.get("b") is None
+    assert backend.get("a") == (1, 0)
+
+
+def test_sqlite_backend_round_trip_and_eviction(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    backend.set("a", [1, 2], 5.0)
+    assert backend.get("a") == ([1, 2], 5.0)
+    backend.set("b", [], 5.0)
+    backend.set("c", [3], 5.0)
+    assert len(backend) == 2
+    backend.delete("c")
+    assert backend.get("c") is None
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = FlightCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["flight"]
+
+    async def run():
+        first = await asyncio.gather(*(cache.get_or_fetch("k", fetch) for _ in range(3)))
+        return first, await cache.get_or_fetch("k", fetch)
+
+    first, later = asyncio.run(run())
+    assert len(calls) == 1
+    assert sorted(status for _, _, status in first) == ["coalesced", "coalesced", "miss"]
+    assert later[0] == ["flight"] and later[2] == "hit"
+
+
+def test_failed_fetch_is_not_cached():
+    cache = FlightCache()
+
+    async def fetch():
+        raise RuntimeError("site down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_fetch("k", fetch))
+    assert cache.lookup("k") is None
+    assert cache.stats()["inflight"] == 0
+
+
+def test_max_age_refetches_older_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(flight_cache.time, "time", lambda: now[0])
+    cache = FlightCache(ttl=300)
+    cache.store("k", "old")
+    now[0] += 100
+
+    async def fetch():
+        return "new"
+
+    assert asyncio.run(cache.get_or_fetch("k", fetch, max_age=120))[2] == "hit"
+    assert asyncio.run(cache.get_or_fetch("k", fetch, max_age=60))[:1] == ("new",)
+
+
+def test_claimed_key_is_joined_and_stored():
+    cache = FlightCache()
+
+    async def fetch():
+        raise AssertionError("should join the claim instead")
+
+    async def run():
+        assert cache.begin("k")
+        assert not cache.begin("k")
+        joined = asyncio.ensure_future(cache.join("k"))
+        shared = asyncio.ensure_future(cache.get_or_fetch("k", fetch))
+        await asyncio.sleep(0)
+        await cache.finish("k", ["flight"])
+        return await joined, await shared
+
+    joined, shared = asyncio.run(run())
+    assert joined == ["flight"]
+    assert shared == (["flight"], 0.0, "coalesced")
+    assert cache.lookup("k")[0] == ["flight"]
+
+
+def test_not_shared_claim_sends_waiters_to_fetch_for_themselves():
+    cache = FlightCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return ["own"]
+
+    async def run():
+        cache.begin("k")
+        joined = asyncio.ensure_future(cache.join("k"))
+        fetched = asyncio.ensure_future(cache.get_or_fetch("k", fetch))
+        await asyncio.sleep(0)
+        cache.fail("k", NotShared("too big"))
+        return await joined, await fetched
+
+    joined, fetched = asyncio.run(run())
+    assert joined is None
+    assert fetched == (["own"], 0.0, "miss")
+    assert calls == [1]
+
+
+def test_failed_claim_raises_in_waiters():
+    cache = FlightCache()
+
+    async def run():
+        cache.begin("k")
+        joined = asyncio.ensure_future(cache.join("k"))
+        await asyncio.sleep(0)
+        cache.fail("k", RuntimeError("site down"))
+        return await joined
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+    assert cache.lookup("k") is None
+
+
+def test_sqlite_backend_is_called_off_the_event_loop(tmp_path):
+    import threading
+    cache = FlightCache(backend=SQLiteBackend(str(tmp_path / "cache.sqlite3")))
+    threads = []
+    get = cache.backend.get
+    cache.backend.get = lambda key: threads.append(threading.get_ident()) or get(key)
+
+    async def fetch():
+        return [1]
+
+    async def run():
+        await cache.get_or_fetch("k", fetch)
+        return (await cache.lookup_async("k"))[0]
+
+    assert asyncio.run(run()) == [1]
+    assert threads and threading.get_ident() not in threads
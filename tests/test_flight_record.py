@@ -0,0 +1,79 @@
+from datetime import date
+
+import pytest
+
+from flight_record import (FlightRecord, combine, filter_records, parse_day, parse_duration, parse_int,
+                           parse_kilograms, parse_stops, records_from_json, records_to_json, sort_records)
+
+
+@pytest.mark.parametrize("text, expected", [("₹ 5,432", 5432), ("12 seats left", 12), ("", None), ("n/a", None)])
+def test_parse_int(text, expected):
+    assert parse_int(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [("2h 15m", 135), ("45m", 45), ("3 h", 180), ("", None)])
+def test_parse_duration(text, expected):
+    assert parse_duration(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [("Non-stop", 0), ("Non Stop", 0), ("1 Stop", 1), ("Two Stops", 2),
+                                            ("", 0), ("via somewhere", None)])
+def test_parse_stops(text, expected):
+    assert parse_stops(text) == expected
+
+
+def test_parse_kilograms():
+    assert parse_kilograms("15 Kgs") == 15
+    assert isinstance(parse_kilograms("15 Kgs"), int)
+    assert parse_kilograms("7.5kg") == 7.5
+    assert parse_kilograms("none") is None
+
+
+def test_parse_day_picks_the_nearest_year():
+    assert parse_day("Sat, 18 Oct", date(2025, 10, 17)) == date(2025, 10, 18)
+    assert parse_day("Thu, 1 Jan", date(2025, 12, 31)) == date(2026, 1, 1)
+    assert parse_day("31 Dec", date(2026, 1, 1)) == date(2025, 12, 31)
+    assert parse_day("soon", date(2025, 1, 1)) is None
+
+
+@pytest.mark.parametrize("clock, expected", [("06:15", "2025-10-18T06:15"), ("6:15 PM", "2025-10-18T18:15"),
+                                             ("12:05 am", "2025-10-18T00:05"), ("25:00", None), ("", None)])
+def test_combine(clock, expected):
+    assert combine(date(2025, 10, 18), clock) == expected
+
+
+def raw(**fields):
+    return {"airline": "IndiGo", "flight_number": "6E 123", "departure_time": "23:30",
+            "arrival_time": "01:10", "duration": "1h 40m", "stops": "Non-stop", "price": "₹ 4,999", **fields}
+
+
+def test_from_raw_moves_next_day_arrivals():
+    record = FlightRecord.from_raw(raw(next_day_arrival=True), "2025-10-18")
+    assert record.departure == "2025-10-18T23:30"
+    assert record.arrival == "2025-10-19T01:10"
+    assert (record.price, record.duration_minutes, record.stops) == (4999, 100, 0)
+
+
+def test_from_raw_across_new_year():
+    record = FlightRecord.from_raw(raw(departure_date="Wed, 31 Dec", arrival_date="Thu, 1 Jan"), "2025-12-31")
+    assert record.departure == "2025-12-31T23:30"
+    assert record.arrival == "2026-01-01T01:10"
+
+
+def test_json_round_trip():
+    records = [FlightRecord.from_raw(raw(), "2025-10-18"), FlightRecord.from_raw(raw(price=""), "2025-10-18")]
+    assert records_from_json(records_to_json(records)) == records
+
+
+def test_filter_and_sort():
+    cheap = FlightRecord.from_raw(raw(price="3000", departure_time="06:00"), "2025-10-18")
+    dear = FlightRecord.from_raw(raw(airline="Air India", price="9000", stops="1 Stop"), "2025-10-18")
+    unknown = FlightRecord.from_raw(raw(price=""), "2025-10-18")
+    records = [dear, unknown, cheap]
+
+    assert filter_records(records, max_price=5000) == [cheap]
+    assert filter_records(records, max_stops=0) == [unknown, cheap]
+    assert filter_records(records, airlines=["air india"]) == [dear]
+    assert filter_records(records, departure_after="05:00", departure_before="07:00") == [cheap]
+    assert sort_records(records, "price") == [cheap, dear, unknown]
+    assert sort_records(records, "-price") == [dear, cheap, unknown]
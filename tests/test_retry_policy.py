@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+import retry_policy
+from retry_policy import (CircuitBreaker, CircuitOpen, DeadlineExceeded, InvalidSearch, RetryPolicy,
+                          deadline, remaining)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(retry_policy.time, "monotonic", clock)
+    return clock
+
+
+def fail(breaker, error=RuntimeError("site down")):
+    with pytest.raises(type(error)):
+        with breaker.call():
+            raise error
+
+
+def succeed(breaker):
+    with breaker.call():
+        pass
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failures=3, reset_after=30)
+    fail(breaker)
+    fail(breaker)
+    succeed(breaker)  # resets the count
+    for _ in range(3):
+        fail(breaker)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen) as raised:
+        breaker.check()
+    assert raised.value.retry_after == 30
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_ignores_neutral_errors(clock):
+    breaker = CircuitBreaker(failures=2)
+    for _ in range(5):
+        fail(breaker, InvalidSearch("no such city"))
+        fail(breaker, DeadlineExceeded("waited for a browser"))
+    assert breaker.state == "closed"
+    assert breaker.stats()["consecutive_failures"] == 0
+
+
+def test_breaker_half_open_trial(clock):
+    breaker = CircuitBreaker(failures=1, reset_after=10)
+    fail(breaker)
+    clock.now += 10
+    assert breaker.state == "half-open"
+
+    # Only one trial at a time; its failure re-opens the circuit
+    with pytest.raises(RuntimeError):
+        with breaker.call():
+            with pytest.raises(CircuitOpen):
+                breaker.check()
+            raise RuntimeError("still down")
+    assert breaker.state == "open"
+
+    clock.now += 10
+    succeed(breaker)
+    assert breaker.state == "closed"
+
+
+def test_breaker_neutral_error_in_trial_lets_another_trial_through(clock):
+    breaker = CircuitBreaker(failures=1, reset_after=10)
+    fail(breaker)
+    clock.now += 10
+    fail(breaker, InvalidSearch("no such city"))
+    succeed(breaker)
+    assert breaker.state == "closed"
+
+
+def test_retry_runs_until_success(monkeypatch):
+    policy = RetryPolicy(attempts=3)
+    monkeypatch.setattr(policy, "backoff", lambda attempt: 0)
+    calls = []
+
+    def step():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("flaky")
+        return "ok"
+
+    assert policy.run("step", step) == "ok"
+    assert policy.stats() == {"attempts": 3, "retries": 2, "exhausted": 0}
+
+
+def test_retry_gives_up(monkeypatch):
+    policy = RetryPolicy(attempts=2)
+    monkeypatch.setattr(policy, "backoff", lambda attempt: 0)
+    calls = []
+
+    def step():
+        calls.append(1)
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        policy.run("step", step)
+    assert len(calls) == 2
+
+    calls.clear()
+    with pytest.raises(RuntimeError):
+        policy.run("step", step, should_retry=lambda error: False)
+    assert len(calls) == 1
+    assert policy.exhausted == 2
+
+
+def test_retry_does_not_sleep_past_the_deadline():
+    policy = RetryPolicy(attempts=5, base_delay=10, max_delay=10)
+    calls = []
+
+    async def step():
+        calls.append(1)
+        raise RuntimeError("down")
+
+    async def run():
+        with deadline(0.01):
+            await policy.run_async("step", step)
+
+    policy.backoff = lambda attempt: 1.0
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+    assert len(calls) == 1
+
+
+def test_nested_deadlines_only_shorten():
+    assert remaining() is None
+    with deadline(10):
+        with deadline(100):
+            assert remaining() <= 10
+        with deadline(1):
+            assert remaining() <= 1
+    assert remaining() is None
@@ -0,0 +1,33 @@
+from text_chunks import chunk_text, estimate_tokens
+
+
+def test_small_text_is_one_chunk():
+    assert chunk_text("one\ntwo\n\nthree", 100) == ["one\ntwo\nthree"]
+
+
+def test_paragraphs_are_packed_without_exceeding_the_limit():
+    paragraphs = [f"Paragraph {i} " + "word " * 20 for i in range(50)]
+    chunks = chunk_text("\n".join(paragraphs), 100)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+    # Whole paragraphs, in order
+    assert "\n".join(chunks).split("\n") == [p.strip() for p in paragraphs]
+
+
+def test_long_paragraph_is_split_at_sentences():
+    paragraph = " ".join(f"Sentence number {i} is here." for i in range(100))
+    chunks = chunk_text(paragraph, 50)
+    assert all(estimate_tokens(chunk) <= 50 for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == paragraph
+
+
+def test_sentence_longer_than_a_chunk_is_cut():
+    sentence = "x" * 1000
+    chunks = chunk_text(sentence, 10)
+    assert all(estimate_tokens(chunk) <= 10 for chunk in chunks)
+    assert "".join(chunks) == sentence
+
+
+def test_empty_text():
+    assert chunk_text("", 10) == []
+    assert chunk_text("\n \n", 10) == []
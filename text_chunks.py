@@ -0,0 +1,54 @@
+import math
+import re
+from typing import Iterator, List
+
+
+# Rough size of a token in English text; close enough to budget prompts
+# without shipping a tokenizer
+CHARS_PER_TOKEN = 4.0
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _pieces(paragraph: str, max_tokens: int) -> Iterator[str]:
+    """A paragraph that fits, or its sentences (hard-cut when a sentence alone is too long)."""
+    if estimate_tokens(paragraph) <= max_tokens:
+        yield paragraph
+        return
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    for sentence in _SENTENCE_END.split(paragraph):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            yield sentence[:cut]
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            yield sentence
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split cleaned text (one paragraph per line) into chunks of at most
+    `max_tokens` estimated tokens, packing whole paragraphs together and only
+    splitting a paragraph that is larger than a chunk on its own.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for paragraph in text.split("\n"):
+        for piece in _pieces(paragraph.strip(), max_tokens):
+            if not piece:
+                continue
+            tokens = estimate_tokens(piece) + 1  # + the joining newline
+            if current and size + tokens > max_tokens:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
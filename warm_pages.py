@@ -0,0 +1,135 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from browser_pool import AsyncBrowserPool, BrowserLease
+
+
+class WarmPage:
+    """
+    A page kept open on the search site between searches.
+
+    `form_state` records what the form currently holds ("origin",
+    "destination", "journey_date") so the next search only re-enters the
+    fields that differ.
+    """
+
+    def __init__(self, lease: BrowserLease, page, setup_result: Any = None):
+        self.lease = lease
+        self.page = page
+        self.setup_result = setup_result
+        self.form_state: Dict[str, str] = {}
+        self.uses = 0
+
+    @property
+    def route(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.form_state.get("origin"), self.form_state.get("destination")
+
+
+class WarmPagePool:
+    """
+    Up to `size` warm pages, each in its own context borrowed from the browser
+    pool for as long as the page lives (so they count against its capacity).
+
+    A search checks out an idle page, preferring one whose form already holds
+    the same route. Pages are discarded after `max_uses` searches or when a
+    search on them fails, since their state is then unknown. When all `size`
+    pages are busy, page(wait=False) yields None so the search can run on a
+    fresh context instead of queueing behind them.
+    """
+
+    def __init__(self, browser_pool: AsyncBrowserPool, size: int = 2, max_uses: int = 20,
+                 setup: Optional[Callable[[Any], Awaitable[Any]]] = None,
+                 teardown: Optional[Callable[[Any], None]] = None):
+        self.browser_pool = browser_pool
+        self.size = size
+        self.max_uses = max_uses
+        self.setup = setup
+        self.teardown = teardown
+        self._idle: List[WarmPage] = []
+        self._slots = asyncio.Semaphore(size)
+        self.created = 0
+        self.reused = 0
+        self.route_matches = 0
+        self.discarded = 0
+        self.busy = 0
+
+    @asynccontextmanager
+    async def page(self, origin: str, destination: str, wait: bool = True):
+        """Check out a warm page for one search (None if all are busy and not `wait`)."""
+        if not wait and self._slots.locked():
+            self.busy += 1
+            yield None
+            return
+        async with self._slots:
+            warm = self._take_idle(origin, destination)
+            if warm is None:
+                warm = await self._create()
+            else:
+                self.reused += 1
+
+            try:
+                yield warm
+            except BaseException as e:
+                await self._discard(warm, e)
+                raise
+
+            warm.uses += 1
+            if warm.uses >= self.max_uses:
+                await self._discard(warm)
+            else:
+                self._idle.append(warm)
+
+    async def close(self):
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+    def stats(self) -> Dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "created": self.created,
+            "reused": self.reused,
+            "route_matches": self.route_matches,
+            "discarded": self.discarded,
+            "busy": self.busy,
+        }
+
+    def _take_idle(self, origin: str, destination: str) -> Optional[WarmPage]:
+        if not self._idle:
+            return None
+        for index, warm in enumerate(self._idle):
+            if warm.route == (origin, destination):
+                self.route_matches += 1
+                return self._idle.pop(index)
+        return self._idle.pop()
+
+    async def _create(self) -> WarmPage:
+        lease = await self.browser_pool.acquire()
+        try:
+            setup_result = await self.setup(lease.context) if self.setup else None
+            page = await lease.context.new_page()
+        except BaseException as e:
+            await self.browser_pool.release(lease, e)
+            raise
+        self.created += 1
+        return WarmPage(lease, page, setup_result)
+
+    async def _discard(self, warm: WarmPage, error: Optional[BaseException] = None):
+        self.discarded += 1
+        if self.teardown:
+            self.teardown(warm.setup_result)
+        await self.browser_pool.release(warm.lease, error)
+
+
+def warm_pages_from_env(browser_pool: AsyncBrowserPool, **kwargs) -> Optional[WarmPagePool]:
+    """
+    Build a WarmPagePool from WARM_PAGES (0 disables warm pages) and
+    WARM_PAGE_MAX_USES.
+    """
+    size = int(os.getenv("WARM_PAGES", "2"))
+    if size <= 0:
+        return None
+    return WarmPagePool(browser_pool, size=size,
+                        max_uses=int(os.getenv("WARM_PAGE_MAX_USES", "20")), **kwargs)
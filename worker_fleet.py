@@ -0,0 +1,366 @@
+"""
+Run searches on a fleet of worker processes, each with its own browser pool,
+so Python-side work and browser children spread over all cores.
+
+The API process keeps the dispatcher (WorkerFleet). Searches wait in the
+dispatcher's backlog and are handed to a worker only when it has a free slot
+(at most `concurrency` searches per worker), least-loaded first, so idle
+workers take the next search instead of it queueing behind a slow one.
+Workers report a heartbeat; a worker that dies or stops reporting is
+replaced and its unfinished searches are re-queued once. Restarts drain
+workers: they get no new searches and exit once theirs are done.
+
+Each worker has its own pair of queues, so a worker killed mid-operation
+cannot leave a shared queue locked for the others.
+
+An engine's `search` may carry a `report()` function; its result (e.g. the
+worker's metrics) rides on every heartbeat and is passed to the fleet's
+`on_report(worker, report)`, with None once the worker is gone.
+"""
+import asyncio
+import importlib
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from retry_policy import CircuitOpen, DeadlineExceeded, InvalidSearch
+
+
+HEARTBEAT_SECONDS = 2.0
+
+
+def _encode_error(error: BaseException) -> Tuple[str, str, Optional[float]]:
+    return type(error).__name__, str(error), getattr(error, "retry_after", None)
+
+
+def _decode_error(kind: str, message: str, retry_after: Optional[float]) -> Exception:
+    if kind == "CircuitOpen":
+        return CircuitOpen(retry_after or 1.0)
+    if kind == "DeadlineExceeded":
+        return DeadlineExceeded(message)
+    if kind == "InvalidSearch":
+        return InvalidSearch(message)
+    return Exception(message)
+
+
+def _load(path: str):
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _worker_main(index: int, engine_path: str, concurrency: int, tasks, results):
+    # Ctrl+C reaches the whole process group; the dispatcher drains us instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_worker_loop(index, engine_path, concurrency, tasks, results))
+
+
+async def _worker_loop(index: int, engine_path: str, concurrency: int, tasks, results):
+    """
+    Run searches from `tasks` until a None per slot arrives (drain), reporting
+    results and heartbeats on `results`.
+    """
+    loop = asyncio.get_running_loop()
+    busy = 0
+
+    async def slot(search):
+        nonlocal busy
+        while True:
+            try:
+                task = await loop.run_in_executor(None, tasks.get, True, 0.5)
+            except queue.Empty:
+                continue
+            if task is None:
+                return
+            task_id, args = task
+            busy += 1
+            try:
+                results.put(("done", task_id, True, await search(*args)))
+            except Exception as e:
+                results.put(("done", task_id, False, _encode_error(e)))
+            finally:
+                busy -= 1
+
+    async with _load(engine_path)() as search:
+        report = getattr(search, "report", lambda: None)
+
+        async def heartbeat():
+            while True:
+                results.put(("heartbeat", busy, report()))
+                await asyncio.sleep(HEARTBEAT_SECONDS)
+
+        results.put(("ready", os.getpid()))
+        beats = asyncio.create_task(heartbeat())
+        try:
+            await asyncio.gather(*(slot(search) for _ in range(concurrency)))
+        finally:
+            beats.cancel()
+            results.put(("heartbeat", busy, report()))
+    results.put(("exited", None))
+
+
+class _Worker:
+    def __init__(self, index: int, process, tasks, results):
+        self.index = index
+        self.process = process
+        self.tasks = tasks
+        self.results = results
+        self.last_heartbeat = time.monotonic()
+        self.ready = False
+        self.draining = False
+        self.exited = False
+        self.assigned: set = set()
+        self.completed = 0
+        self.reader: Optional[threading.Thread] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "index": self.index,
+            "pid": self.process.pid,
+            "alive": self.process.is_alive(),
+            "ready": self.ready,
+            "draining": self.draining,
+            "in_flight": len(self.assigned),
+            "completed": self.completed,
+            "heartbeat_age": round(time.monotonic() - self.last_heartbeat, 1),
+        }
+
+
+class WorkerFleet:
+    """
+    Dispatcher for `workers` worker processes.
+
+    engine: "module:name" of an async context manager factory run in each
+            worker; it yields `search(origin, destination, journey_date)`
+    concurrency: searches a worker runs at once
+    heartbeat_timeout: seconds of silence after which a worker is replaced
+    drain_timeout: seconds a draining worker gets before it is killed
+    task_timeout: seconds a search may wait for and run on the fleet
+    on_report: called in the event loop with ("worker-<index>", report) for
+               each heartbeat carrying a report, and with None when it retires
+    """
+
+    def __init__(self, engine: str, workers: int = 2, concurrency: int = 4,
+                 heartbeat_timeout: float = 30.0, drain_timeout: float = 60.0,
+                 task_timeout: float = 180.0,
+                 on_report: Optional[Callable[[str, Optional[Any]], None]] = None):
+        self.engine = engine
+        self.on_report = on_report
+        self.size = workers
+        self.concurrency = concurrency
+        self.heartbeat_timeout = heartbeat_timeout
+        self.drain_timeout = drain_timeout
+        self.task_timeout = task_timeout
+        self._mp = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, _Worker] = {}
+        self._indexes = itertools.count()
+        self._task_ids = itertools.count()
+        # task id -> (future, args, attempts)
+        self._pending: Dict[int, Tuple[asyncio.Future, Tuple, int]] = {}
+        self._backlog: Deque[int] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._monitor: Optional[asyncio.Task] = None
+        self._accepting = False
+        self.requeued = 0
+        self.replaced = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        for _ in range(self.size):
+            self._spawn()
+        self._monitor = asyncio.create_task(self._watch())
+        self._accepting = True
+        print(f"Worker fleet started with {self.size} process(es) x {self.concurrency} search(es)")
+
+    async def search(self, origin: str, destination: str, journey_date: str) -> List[Any]:
+        """Run one search on the first worker with a free slot."""
+        if not self._accepting:
+            raise RuntimeError("Worker fleet is not accepting searches")
+        task_id = next(self._task_ids)
+        future = self._loop.create_future()
+        self._pending[task_id] = (future, (origin, destination, journey_date), 1)
+        self._backlog.append(task_id)
+        self._dispatch()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.task_timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"No worker finished the search within {self.task_timeout:g}s") from None
+        finally:
+            self._pending.pop(task_id, None)
+
+    async def rolling_restart(self):
+        """Replace the workers one at a time; each finishes its searches first."""
+        for worker in list(self._workers.values()):
+            if worker.draining:
+                continue
+            self._spawn()
+            await self._drain(worker)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": [worker.to_dict() for worker in self._workers.values()],
+            "concurrency": self.concurrency,
+            "queued": len(self._backlog),
+            "completed": self.completed,
+            "failed": self.failed,
+            "requeued": self.requeued,
+            "replaced": self.replaced,
+        }
+
+    async def close(self):
+        """Stop accepting searches, drain every worker, fail what is left."""
+        self._accepting = False
+        if self._monitor is not None:
+            self._monitor.cancel()
+        await asyncio.gather(*(self._drain(worker) for worker in list(self._workers.values())))
+        for future, _, _ in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Worker fleet closed"))
+        self._backlog.clear()
+        print("Worker fleet closed")
+
+    def _spawn(self) -> _Worker:
+        index = next(self._indexes)
+        tasks, results = self._mp.Queue(), self._mp.Queue()
+        process = self._mp.Process(
+            target=_worker_main, name=f"flight-worker-{index}", daemon=True,
+            args=(index, self.engine, self.concurrency, tasks, results),
+        )
+        process.start()
+        worker = self._workers[index] = _Worker(index, process, tasks, results)
+        worker.reader = threading.Thread(target=self._read_results, args=(worker,), daemon=True)
+        worker.reader.start()
+        return worker
+
+    def _dispatch(self):
+        """Hand backlog searches to the least-loaded workers that have free slots."""
+        while self._backlog:
+            candidates = [w for w in self._workers.values()
+                          if w.ready and not w.draining and len(w.assigned) < self.concurrency]
+            if not candidates:
+                return
+            task_id = self._backlog.popleft()
+            entry = self._pending.get(task_id)
+            if entry is None or entry[0].done():
+                continue
+            worker = min(candidates, key=lambda w: len(w.assigned))
+            worker.assigned.add(task_id)
+            worker.tasks.put((task_id, entry[1]))
+
+    async def _drain(self, worker: _Worker):
+        worker.draining = True
+        if worker.process.is_alive():
+            for _ in range(self.concurrency):
+                worker.tasks.put(None)
+            await self._loop.run_in_executor(None, worker.process.join, self.drain_timeout)
+        if worker.process.is_alive():
+            print(f"Worker {worker.index} did not drain in {self.drain_timeout:g}s, killing it")
+            worker.process.kill()
+            await self._loop.run_in_executor(None, worker.process.join, 5)
+        # Handle what it sent last (its final report) before forgetting it
+        await self._loop.run_in_executor(None, worker.reader.join, 5)
+        self._retire(worker)
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            now = time.monotonic()
+            for worker in list(self._workers.values()):
+                if worker.draining:
+                    continue
+                alive = worker.process.is_alive()
+                if alive and now - worker.last_heartbeat < self.heartbeat_timeout:
+                    continue
+                print(f"Worker {worker.index} {'is unresponsive' if alive else 'died'}, replacing it")
+                if alive:
+                    worker.process.kill()
+                self._retire(worker)
+                self._spawn()
+                self.replaced += 1
+
+    def _retire(self, worker: _Worker):
+        """Forget a departed worker; re-queue (once) or fail the searches it held."""
+        worker.exited = True
+        self._workers.pop(worker.index, None)
+        if self.on_report is not None:
+            self.on_report(f"worker-{worker.index}", None)
+        for task_id in worker.assigned:
+            entry = self._pending.get(task_id)
+            if entry is None or entry[0].done():
+                continue
+            future, args, attempts = entry
+            if attempts < 2:
+                self._pending[task_id] = (future, args, attempts + 1)
+                self._backlog.appendleft(task_id)
+                self.requeued += 1
+            else:
+                future.set_exception(Exception("Worker process failed during the search"))
+        worker.assigned.clear()
+        self._dispatch()
+
+    def _read_results(self, worker: _Worker):
+        """Forward the worker's messages to the event loop until it exits and its queue is empty."""
+        while True:
+            try:
+                message = worker.results.get(timeout=1)
+            except queue.Empty:
+                if worker.exited or not worker.process.is_alive():
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            try:
+                self._loop.call_soon_threadsafe(self._handle, worker, message)
+            except RuntimeError:  # event loop closed
+                return
+            if message[0] == "exited":
+                return
+
+    def _handle(self, worker: _Worker, message: Tuple):
+        worker.last_heartbeat = time.monotonic()
+        kind = message[0]
+        if kind == "ready":
+            worker.ready = True
+        elif kind == "heartbeat":
+            if self.on_report is not None and message[2] is not None and not worker.exited:
+                self.on_report(f"worker-{worker.index}", message[2])
+        elif kind == "done":
+            task_id, ok, payload = message[1], message[2], message[3]
+            worker.assigned.discard(task_id)
+            worker.completed += 1
+            entry = self._pending.get(task_id)
+            if entry is not None and not entry[0].done():
+                if ok:
+                    self.completed += 1
+                    entry[0].set_result(payload)
+                else:
+                    self.failed += 1
+                    entry[0].set_exception(_decode_error(*payload))
+        self._dispatch()
+
+
+def fleet_from_env(engine: str, **kwargs) -> Optional[WorkerFleet]:
+    """
+    WorkerFleet from FLEET_WORKERS (0, the default, runs searches in the API
+    process), FLEET_WORKER_CONCURRENCY, FLEET_HEARTBEAT_TIMEOUT,
+    FLEET_DRAIN_TIMEOUT and FLEET_TASK_TIMEOUT.
+    """
+    workers = int(os.getenv("FLEET_WORKERS", "0"))
+    if workers <= 0:
+        return None
+    return WorkerFleet(
+        engine,
+        workers=workers,
+        concurrency=int(os.getenv("FLEET_WORKER_CONCURRENCY", "4")),
+        heartbeat_timeout=float(os.getenv("FLEET_HEARTBEAT_TIMEOUT", "30")),
+        drain_timeout=float(os.getenv("FLEET_DRAIN_TIMEOUT", "60")),
+        task_timeout=float(os.getenv("FLEET_TASK_TIMEOUT", "180")),
+        **kwargs,
+    )